@@ -5,3 +5,12 @@ from django.apps import AppConfig
 class AcademicsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'academics'
+
+    def ready(self):
+        from repairportal import compiled, search
+        from . import signals  # noqa: F401
+        from .models import AcademicQuestion
+        from .serializers import AcademicQuestionSerializer
+
+        search.register(AcademicQuestion, ['title', 'description'])
+        compiled.register(AcademicQuestionSerializer)
@@ -0,0 +1,294 @@
+"""
+Automatic assignment of pending academic questions to teachers.
+
+The dispatcher keeps, per process, a priority queue of pending questions for
+every subject and an open-assignment counter for every teacher. Questions are
+enqueued when they are created and handed to the least loaded teacher of
+their subject who is under capacity; a teacher who answers or closes a
+question frees a slot and is immediately offered the next queued question.
+
+The queues are built from the database and then maintained from signals,
+so dispatching never scans the question table. Rebuilding them every
+``RESYNC_SECONDS`` happens in a background thread (or in the
+``dispatch_questions`` command): the hooks, which run in requests, only
+apply their own change. Assignment itself is
+a conditional ``UPDATE`` on ``status='pending'``, which keeps several
+processes (or a teacher assigning manually) from claiming the same question.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Open (assigned but unanswered) questions a teacher may hold at once.
+    'TEACHER_CAPACITY': 3,
+    # Seconds of waiting that one unit of session fee is worth when ordering
+    # a subject's queue.
+    'FEE_WEIGHT_SECONDS': 600,
+    # Rebuild the in-memory state from the database after this many seconds
+    # to pick up assignments made by other processes.
+    'RESYNC_SECONDS': 300,
+}
+
+# Subject every teacher can take, whatever their declared expertise.
+CATCH_ALL_SUBJECT = 'other'
+
+
+def get_setting(name):
+    return getattr(settings, 'ACADEMIC_DISPATCH', {}).get(name, DEFAULTS[name])
+
+
+def parse_subjects(expertise):
+    """Map a teacher's free-text expertise ("Physics, maths") to subject keys."""
+    from .models import AcademicQuestion
+
+    lookup = {}
+    for key, label in AcademicQuestion.SUBJECT_CHOICES:
+        lookup[key] = key
+        lookup[label.lower()] = key
+    subjects = {CATCH_ALL_SUBJECT}
+    for item in (expertise or '').split(','):
+        name = item.strip().lower()
+        key = lookup.get(name) or lookup.get(name.replace(' ', '_'))
+        if key:
+            subjects.add(key)
+    return subjects
+
+
+class QuestionDispatcher:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._queues = defaultdict(list)  # subject -> heap of (priority, question id)
+        self._queued = {}  # question id -> subject, for lazy removal from the heaps
+        self._load = defaultdict(int)  # teacher id -> open assignments
+        self._teacher_subjects = {}  # teacher id -> set of subjects
+        self._subject_teachers = defaultdict(set)  # subject -> teacher ids
+        self._synced_at = None
+        self._sync_lock = threading.Lock()
+        self._resync_thread = None
+        self._created_during_sync = None  # (question id, subject, priority) created while a sync reads
+        self.assigned_count = 0
+
+    def priority(self, created_at, session_fee):
+        """Lower sorts first: older questions and higher fees are served first."""
+        fee = float(session_fee or 0)
+        return created_at.timestamp() - fee * get_setting('FEE_WEIGHT_SECONDS')
+
+    # State loading
+
+    def sync(self):
+        """
+        Rebuild queues, teacher subjects and loads from the database. The
+        queries run without holding the lock, so hooks are not blocked
+        meanwhile; questions created during them are queued again once the
+        new state is in place, other changes are picked up by the next sync.
+        """
+        from django.contrib.auth import get_user_model
+        from .models import AcademicQuestion
+
+        User = get_user_model()
+        with self._sync_lock:
+            with self._lock:
+                self._created_during_sync = []
+
+            queues, queued = defaultdict(list), {}
+            pending = AcademicQuestion.objects.filter(
+                status='pending', teacher__isnull=True
+            ).values_list('pk', 'subject', 'created_at', 'session_fee')
+            for pk, subject, created_at, session_fee in pending.iterator():
+                queued[pk] = subject
+                queues[subject].append((self.priority(created_at, session_fee), pk))
+            for heap in queues.values():
+                heapq.heapify(heap)
+
+            teacher_subjects, subject_teachers = {}, defaultdict(set)
+            teachers = User.objects.filter(role='teacher', is_active=True).values_list('pk', 'profile__expertise')
+            for pk, expertise in teachers.iterator():
+                teacher_subjects[pk] = parse_subjects(expertise)
+                for subject in teacher_subjects[pk]:
+                    subject_teachers[subject].add(pk)
+
+            load = defaultdict(int)
+            open_counts = AcademicQuestion.objects.filter(
+                status='assigned', teacher__isnull=False
+            ).values('teacher').annotate(open=Count('pk'))
+            for row in open_counts:
+                load[row['teacher']] = row['open']
+
+            with self._lock:
+                self._queues, self._queued, self._load = queues, queued, load
+                self._teacher_subjects, self._subject_teachers = teacher_subjects, subject_teachers
+                created, self._created_during_sync = self._created_during_sync, None
+                for pk, subject, priority in created:
+                    if pk not in self._queued:
+                        self._push(pk, subject, priority)
+                self._synced_at = time.monotonic()
+
+    def ensure_synced(self):
+        """Start a resync in the background if the state is stale; never waits for it."""
+        with self._lock:
+            stale = self._synced_at is None or time.monotonic() - self._synced_at > get_setting('RESYNC_SECONDS')
+            if not stale or self._resync_thread is not None:
+                return
+            self._resync_thread = threading.Thread(target=self._resync, name='question-dispatch-resync', daemon=True)
+            self._resync_thread.start()
+
+    def _resync(self):
+        try:
+            self.sync()
+            # Questions loaded by the sync may have waited for a teacher
+            for subject in list(self._queues):
+                self.dispatch_subject(subject)
+        finally:
+            connection.close()
+            with self._lock:
+                self._resync_thread = None
+
+    # Event hooks
+
+    def question_created(self, question):
+        self.ensure_synced()
+        with self._lock:
+            if question.status == 'pending' and question.teacher_id is None:
+                priority = self.priority(question.created_at, question.session_fee)
+                self._push(question.pk, question.subject, priority)
+                if self._created_during_sync is not None:
+                    self._created_during_sync.append((question.pk, question.subject, priority))
+        self.dispatch_subject(question.subject)
+
+    def question_assigned(self, question_id, teacher_id):
+        """Record an assignment made by the dispatcher or manually."""
+        with self._lock:
+            self._queued.pop(question_id, None)
+            self._load[teacher_id] += 1
+
+    def question_released(self, teacher_id):
+        """A teacher answered or closed one of their open questions."""
+        self.ensure_synced()
+        with self._lock:
+            if self._load[teacher_id] > 0:
+                self._load[teacher_id] -= 1
+        self.dispatch_teacher(teacher_id)
+
+    def question_removed(self, question_id):
+        with self._lock:
+            self._queued.pop(question_id, None)
+
+    def teacher_updated(self, teacher_id, expertise, is_active=True):
+        if not is_active:
+            with self._lock:
+                self._drop_teacher(teacher_id)
+            return
+        self.ensure_synced()
+        with self._lock:
+            self._drop_teacher(teacher_id)
+            self._set_teacher_subjects(teacher_id, parse_subjects(expertise))
+        self.dispatch_teacher(teacher_id)
+
+    # Dispatching
+
+    def dispatch_subject(self, subject):
+        """Assign queued questions of ``subject`` while some teacher has capacity."""
+        assigned = 0
+        with self._lock:
+            while True:
+                teacher_id = self._least_loaded_teacher(subject)
+                if teacher_id is None or self._peek(subject) is None:
+                    return assigned
+                _, question_id = heapq.heappop(self._queues[subject])
+                self._queued.pop(question_id, None)
+                assigned += self._assign(question_id, teacher_id)
+
+    def dispatch_teacher(self, teacher_id):
+        """Offer queued questions from the teacher's subjects until they are full."""
+        assigned = 0
+        with self._lock:
+            while self._load[teacher_id] < get_setting('TEACHER_CAPACITY'):
+                heads = [
+                    (self._queues[subject][0][0], subject)
+                    for subject in self._teacher_subjects.get(teacher_id, ())
+                    if self._peek(subject) is not None
+                ]
+                if not heads:
+                    break
+                _, question_id = heapq.heappop(self._queues[min(heads)[1]])
+                self._queued.pop(question_id, None)
+                assigned += self._assign(question_id, teacher_id)
+        return assigned
+
+    def dispatch_all(self):
+        self.ensure_synced()
+        return sum(self.dispatch_subject(subject) for subject in list(self._queues))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': dict(Counter(self._queued.values())),
+                'teacher_load': dict(self._load),
+                'assigned': self.assigned_count,
+            }
+
+    # Internals
+
+    def _assign(self, question_id, teacher_id):
+        """Claim the question for the teacher unless someone else got it first."""
+        from .models import AcademicQuestion
+        from .signals import question_status_changed
+
+        updated = AcademicQuestion.objects.filter(
+            pk=question_id, status='pending', teacher__isnull=True
+        ).update(teacher_id=teacher_id, status='assigned', updated_at=timezone.now())
+        if not updated:
+            return False
+        self.assigned_count += 1
+        question_status_changed.send(
+            sender=AcademicQuestion,
+            question_id=question_id,
+            teacher_id=teacher_id,
+            old_status='pending',
+            new_status='assigned',
+        )
+        return True
+
+    def _push(self, question_id, subject, priority):
+        self._queued[question_id] = subject
+        heapq.heappush(self._queues[subject], (priority, question_id))
+
+    def _peek(self, subject):
+        """Return the id at the head of the subject's queue, dropping stale entries."""
+        heap = self._queues.get(subject)
+        while heap:
+            question_id = heap[0][1]
+            if self._queued.get(question_id) == subject:
+                return question_id
+            heapq.heappop(heap)
+        return None
+
+    def _least_loaded_teacher(self, subject):
+        capacity = get_setting('TEACHER_CAPACITY')
+        candidates = [
+            (self._load[teacher_id], teacher_id)
+            for teacher_id in self._subject_teachers.get(subject, ())
+            if self._load[teacher_id] < capacity
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def _set_teacher_subjects(self, teacher_id, subjects):
+        self._teacher_subjects[teacher_id] = subjects
+        for subject in subjects:
+            self._subject_teachers[subject].add(teacher_id)
+
+    def _drop_teacher(self, teacher_id):
+        for subject in self._teacher_subjects.pop(teacher_id, ()):
+            self._subject_teachers[subject].discard(teacher_id)
+
+
+dispatcher = QuestionDispatcher()
@@ -0,0 +1,65 @@
+"""
+Status transitions of academic questions.
+
+Every transition is a single conditional ``UPDATE`` that only touches the
+changed columns and only applies if the question is still in one of the
+expected statuses, so concurrent requests cannot both win the same
+transition. ``question_status_changed`` is sent once the change commits.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AcademicQuestion
+from .signals import question_status_changed
+
+
+def transition_question(question, new_status, from_statuses, **changes):
+    """
+    Move ``question`` to ``new_status`` if it is in ``from_statuses``.
+    ``changes`` are extra column values (e.g. ``teacher=user``) written by the
+    same statement. Returns whether this call performed the transition.
+    """
+    old_status = question.status
+    updated = AcademicQuestion.objects.filter(
+        pk=question.pk, status__in=from_statuses
+    ).update(status=new_status, updated_at=timezone.now(), **changes)
+    if not updated:
+        return False
+
+    question.status = new_status
+    for field, value in changes.items():
+        setattr(question, field, value)
+    question_id, teacher_id = question.pk, question.teacher_id
+    transaction.on_commit(lambda: question_status_changed.send(
+        sender=AcademicQuestion,
+        question_id=question_id,
+        teacher_id=teacher_id,
+        old_status=old_status,
+        new_status=new_status,
+    ))
+    return True
+
+
+def close_stale_questions(answered_before, batch_size=1000):
+    """
+    Close every question that has been ``answered`` since before
+    ``answered_before``, in batches of one ``UPDATE`` each. Returns the
+    number of questions closed.
+    """
+    closed = 0
+    stale = AcademicQuestion.objects.filter(status='answered', updated_at__lt=answered_before)
+    while True:
+        batch = list(stale.values_list('pk', 'teacher_id')[:batch_size])
+        if not batch:
+            return closed
+        closed += AcademicQuestion.objects.filter(
+            pk__in=[pk for pk, _ in batch], status='answered'
+        ).update(status='closed', updated_at=timezone.now())
+        for question_id, teacher_id in batch:
+            question_status_changed.send(
+                sender=AcademicQuestion,
+                question_id=question_id,
+                teacher_id=teacher_id,
+                old_status='answered',
+                new_status='closed',
+            )
@@ -0,0 +1,58 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from academics.recommendations import TfidfIndex
+
+
+class Command(BaseCommand):
+    help = 'Measure related-question query time against corpus size on synthetic data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--words', type=int, default=40, help='Words per synthetic question.')
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Zipf-like word frequencies, as in natural text
+        words = [self.word(i) for i in range(options['vocabulary'])]
+        weights = [1.0 / (rank + 1) for rank in range(len(words))]
+
+        def document():
+            return ' '.join(rng.choices(words, weights=weights, k=options['words']))
+
+        self.stdout.write(f"{'questions':>10} {'build s':>9} {'p50 ms':>8} {'p95 ms':>8} {'nnz':>12}")
+        for size in options['sizes']:
+            corpus = [(pk, document()) for pk in range(1, size + 1)]
+            started = time.perf_counter()
+            index = TfidfIndex.build(corpus)
+            build_time = time.perf_counter() - started
+
+            timings = []
+            for _ in range(options['queries']):
+                vector = index.transform([document()])
+                started = time.perf_counter()
+                index.top_k(vector, k=options['k'])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"{size:>10} {build_time:>9.2f} {statistics.median(timings):>8.2f} "
+                f"{p95:>8.2f} {index.matrix.nnz:>12}"
+            )
+
+    @staticmethod
+    def word(number):
+        """Spell ``number`` in base 26 so synthetic terms survive tokenisation."""
+        letters = 'qu'
+        while True:
+            number, remainder = divmod(number, 26)
+            letters += chr(ord('a') + remainder)
+            if not number:
+                return letters
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from academics.similarity import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash/LSH near-duplicate index of academic questions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} question(s) in {elapsed:.1f}s."))
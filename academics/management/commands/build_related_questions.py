@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import AcademicQuestion
+from academics.recommendations import build_subject_index, update_subject_index
+
+
+class Command(BaseCommand):
+    help = 'Build the per-subject TF-IDF indexes behind the related-questions endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('subjects', nargs='*', help='Subjects to build (default: all).')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only add questions answered since the last build.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        choices = [key for key, _ in AcademicQuestion.SUBJECT_CHOICES]
+        subjects = options['subjects'] or choices
+        unknown = set(subjects) - set(choices)
+        if unknown:
+            raise CommandError(f"Unknown subject(s): {', '.join(sorted(unknown))}")
+
+        for subject in subjects:
+            started = time.perf_counter()
+            if options['incremental']:
+                count = update_subject_index(subject)
+                verb = 'Added'
+            else:
+                count = build_subject_index(subject, batch_size=options['batch_size'])
+                verb = 'Indexed'
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{subject}: {verb} {count} question(s) in {elapsed:.2f}s")
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from academics.lifecycle import close_stale_questions
+
+
+class Command(BaseCommand):
+    help = 'Close academic questions that have stayed answered for too long.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=14,
+            help='Close questions answered more than this many days ago.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        closed = close_stale_questions(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed} stale question(s)."))
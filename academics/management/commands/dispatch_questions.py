@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from academics.dispatch import dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Assign pending academic questions to teachers with free capacity.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, resyncing and rebalancing every --interval seconds.',
+        )
+        parser.add_argument('--interval', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        while True:
+            dispatcher.sync()
+            assigned = dispatcher.dispatch_all()
+            stats = dispatcher.stats()
+            self.stdout.write(
+                f"Assigned {assigned} question(s); "
+                f"{sum(stats['queued'].values())} still queued."
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
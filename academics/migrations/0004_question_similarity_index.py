@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academics", "0003_academicquestion_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionSignature",
+            fields=[
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="academics.academicquestion",
+                    ),
+                ),
+                ("signature", models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QuestionLSHBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField(db_index=True)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lsh_buckets",
+                        to="academics.academicquestion",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def keep_latest_accepted_answer(apps, schema_editor):
+    """Un-accept all but the newest accepted answer of each question."""
+    AcademicAnswer = apps.get_model("academics", "AcademicAnswer")
+    seen = set()
+    duplicates = []
+    accepted = AcademicAnswer.objects.filter(is_accepted=True).order_by(
+        "question_id", "-created_at", "-pk"
+    )
+    for pk, question_id in accepted.values_list("pk", "question_id").iterator():
+        if question_id in seen:
+            duplicates.append(pk)
+        seen.add(question_id)
+    AcademicAnswer.objects.filter(pk__in=duplicates).update(is_accepted=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academics", "0004_question_similarity_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_accepted_answer, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="academicanswer",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_accepted", True)),
+                fields=("question",),
+                name="unique_accepted_answer_per_question",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academics", "0005_unique_accepted_answer"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="academicquestion",
+            index=models.Index(
+                fields=["created_at", "id"], name="question_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="academicquestion",
+            index=models.Index(
+                fields=["updated_at", "id"], name="question_updated_idx"
+            ),
+        ),
+    ]
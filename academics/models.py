@@ -46,6 +46,13 @@ class AcademicQuestion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        # Keys of the orderings offered by the list endpoint
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='question_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='question_updated_idx'),
+        ]
+    
     def __str__(self):
         return self.title
 
@@ -78,6 +85,34 @@ class AcademicAnswer(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['question'],
+                condition=models.Q(is_accepted=True),
+                name='unique_accepted_answer_per_question',
+            ),
+        ]
     
     def __str__(self):
         return f"Answer to: {self.question.title}"
+
+
+class QuestionSignature(models.Model):
+    """MinHash signature of a question's title and description"""
+    
+    question = models.OneToOneField(AcademicQuestion, on_delete=models.CASCADE,
+                                    primary_key=True, related_name='signature')
+    signature = models.BinaryField()
+    
+    def __str__(self):
+        return f"Signature of {self.question_id}"
+
+
+class QuestionLSHBucket(models.Model):
+    """LSH band bucket of a question signature, used to find near-duplicates"""
+    
+    question = models.ForeignKey(AcademicQuestion, on_delete=models.CASCADE, related_name='lsh_buckets')
+    bucket = models.BigIntegerField(db_index=True)
+    
+    def __str__(self):
+        return f"Bucket {self.bucket} of {self.question_id}"
@@ -0,0 +1,223 @@
+"""
+TF-IDF "related questions" for academic questions.
+
+An offline batch job (``build_related_questions``) turns the answered
+questions of every subject into a sparse TF-IDF matrix whose rows are
+L2-normalised, and saves it under ``RECOMMENDATION_INDEX_DIR``. Cosine
+similarity against such a matrix is a single sparse matrix-vector product,
+so the ``related`` action only has to vectorise one question, walk the
+posting lists of its terms and pick the top ``k`` scores. Later runs with ``--incremental`` append newly answered
+questions using the existing vocabulary and IDF weights instead of
+rebuilding the subject.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+ANSWERED_STATUSES = ('answered', 'closed')
+
+_WORD_RE = re.compile(r'[^\W\d_]{2,}', re.UNICODE)
+STOP_WORDS = frozenset("""
+    a an and are as at be but by can do does for from had has have how i if in
+    into is it its me my no not of on or so that the their them then there
+    these they this to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text):
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def _document_text(title, description):
+    return f'{title} {title} {description}'  # titles are short but carry the topic
+
+
+class TfidfIndex:
+    """Row-normalised TF-IDF matrix over a fixed vocabulary."""
+
+    def __init__(self, ids, matrix, idf, vocabulary, built_at=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = matrix.tocsr()
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.vocabulary = vocabulary
+        self.built_at = built_at if built_at is not None else time.time()
+        self._positions = {int(pk): row for row, pk in enumerate(self.ids)}
+        self._postings = None
+
+    @classmethod
+    def build(cls, documents, batch_size=5000, built_at=None):
+        """Fit the vocabulary and IDF on ``(id, text)`` pairs and vectorise them."""
+        built_at = built_at if built_at is not None else time.time()
+        ids, counts, document_frequency = [], [], Counter()
+        for pk, text in documents:
+            terms = Counter(tokenize(text))
+            ids.append(pk)
+            counts.append(terms)
+            document_frequency.update(terms.keys())
+
+        vocabulary = {term: column for column, term in enumerate(sorted(document_frequency))}
+        total = len(ids)
+        idf = np.ones(len(vocabulary), dtype=np.float64)
+        for term, column in vocabulary.items():
+            idf[column] = math.log((1 + total) / (1 + document_frequency[term])) + 1
+
+        index = cls(ids=[], matrix=sparse.csr_matrix((0, len(vocabulary))), idf=idf, vocabulary=vocabulary)
+        blocks = [
+            index._vectorize(counts[start:start + batch_size])
+            for start in range(0, total, batch_size)
+        ]
+        matrix = sparse.vstack(blocks).tocsr() if blocks else index.matrix
+        return cls(ids, matrix, idf, vocabulary, built_at=built_at)
+
+    def transform(self, texts):
+        return self._vectorize([Counter(tokenize(text)) for text in texts])
+
+    def extend(self, documents, built_at=None):
+        """Append ``(id, text)`` pairs, re-vectorising ids that are already indexed."""
+        built_at = built_at if built_at is not None else time.time()
+        documents = list(documents)
+        if not documents:
+            return 0
+        new_ids = {pk for pk, _ in documents}
+        keep = np.array([pk not in new_ids for pk in self.ids.tolist()], dtype=bool)
+        vectors = self.transform([text for _, text in documents])
+        self.matrix = sparse.vstack([self.matrix[keep], vectors]).tocsr()
+        self.ids = np.concatenate([self.ids[keep], np.array([pk for pk, _ in documents], dtype=np.int64)])
+        self._positions = {int(pk): row for row, pk in enumerate(self.ids)}
+        self._postings = None
+        self.built_at = built_at
+        return len(documents)
+
+    def vector_for(self, pk, text):
+        """The stored row of ``pk``, or a fresh vector for questions not indexed yet."""
+        row = self._positions.get(pk)
+        if row is not None:
+            return self.matrix[row]
+        return self.transform([text])
+
+    def top_k(self, vector, k=5, exclude=None):
+        """Return ``(id, cosine similarity)`` pairs of the ``k`` closest rows."""
+        if not self.ids.size:
+            return []
+        if self._postings is None:
+            # Column-major copy: each column is the posting list of one term,
+            # so scoring only touches the rows that share a term with the query
+            self._postings = self.matrix.tocsc()
+        vector = vector.tocsr()
+        scores = self._postings[:, vector.indices] @ vector.data
+        if exclude is not None and exclude in self._positions:
+            scores[self._positions[exclude]] = 0.0
+        k = min(k, scores.size)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(self.ids[row]), float(scores[row])) for row in ranked if scores[row] > 0]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            ids=self.ids,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            idf=self.idf,
+            terms=np.array(terms, dtype=str),
+            built_at=np.array(self.built_at),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            matrix = sparse.csr_matrix(
+                (data['data'], data['indices'], data['indptr']), shape=tuple(data['shape'])
+            )
+            vocabulary = {str(term): column for column, term in enumerate(data['terms'])}
+            return cls(data['ids'], matrix, data['idf'], vocabulary, built_at=float(data['built_at']))
+
+    def _vectorize(self, counts):
+        rows, columns, values = [], [], []
+        for row, terms in enumerate(counts):
+            for term, count in terms.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append((1 + math.log(count)) * self.idf[column])
+        matrix = sparse.csr_matrix((values, (rows, columns)), shape=(len(counts), len(self.vocabulary)))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ matrix
+
+
+def index_path(subject):
+    directory = getattr(settings, 'RECOMMENDATION_INDEX_DIR', os.path.join(settings.BASE_DIR, 'indexes'))
+    return os.path.join(directory, f'related_questions_{subject}.npz')
+
+
+def _answered_documents(subject, changed_since=None):
+    from .models import AcademicQuestion
+
+    questions = AcademicQuestion.objects.filter(subject=subject, status__in=ANSWERED_STATUSES)
+    if changed_since is not None:
+        questions = questions.filter(updated_at__gte=changed_since)
+    for pk, title, description in questions.values_list('pk', 'title', 'description').iterator(chunk_size=2000):
+        yield pk, _document_text(title, description)
+
+
+def build_subject_index(subject, batch_size=5000):
+    index = TfidfIndex.build(_answered_documents(subject), batch_size=batch_size)
+    index.save(index_path(subject))
+    return len(index.ids)
+
+
+def update_subject_index(subject):
+    """Add questions answered since the last build; builds from scratch if there is none."""
+    path = index_path(subject)
+    if not os.path.exists(path):
+        return build_subject_index(subject)
+    started = time.time()
+    index = TfidfIndex.load(path)
+    since = datetime.fromtimestamp(index.built_at, tz=dt_timezone.utc)
+    added = index.extend(_answered_documents(subject, changed_since=since), built_at=started)
+    index.save(path)
+    return added
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_index(subject):
+    """Load a subject's index, reusing the in-process copy until the file changes."""
+    path = index_path(subject)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(subject)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, TfidfIndex.load(path))
+            _cache[subject] = cached
+        return cached[1]
+
+
+def related_questions(question, k=5):
+    """Return ``(question id, similarity)`` pairs of answered questions like ``question``."""
+    index = get_index(question.subject)
+    if index is None:
+        return []
+    vector = index.vector_for(question.pk, _document_text(question.title, question.description))
+    return index.top_k(vector, k=k, exclude=question.pk)
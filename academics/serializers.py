@@ -1,9 +1,16 @@
 
-from rest_framework import serializers
+from rest_framework import exceptions, serializers, status
+from repairportal.fieldsets import FieldsetSerializerMixin
+from repairportal.search import SearchResultSerializerMixin
+from uploads.serializers import UploadedFileMixin
 from .models import AcademicQuestion, AcademicQuestionMedia, AcademicAnswer
+from .similarity import find_answered_duplicates
 
 
-class AcademicQuestionMediaSerializer(serializers.ModelSerializer):
+class AcademicQuestionMediaSerializer(FieldsetSerializerMixin, UploadedFileMixin, serializers.ModelSerializer):
+    upload_target = 'academic_media'
+    upload_filled_fields = ('file_type',)
+    
     class Meta:
         model = AcademicQuestionMedia
         fields = ['id', 'question', 'file', 'file_type', 'uploaded_at']
@@ -16,8 +23,9 @@ class AcademicQuestionMediaSerializer(serializers.ModelSerializer):
         return value
 
 
-class AcademicAnswerSerializer(serializers.ModelSerializer):
+class AcademicAnswerSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     teacher_name = serializers.ReadOnlyField(source='teacher.full_name')
+    select_related_fields = {'teacher_name': 'teacher'}
     
     class Meta:
         model = AcademicAnswer
@@ -30,21 +38,76 @@ class AcademicAnswerSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AcademicQuestionSerializer(serializers.ModelSerializer):
+class SimilarQuestionsFound(exceptions.APIException):
+    """
+    Raised by question validation with the answered duplicates in
+    ``matches``; the view serializes them, as ``detail`` would turn every
+    value into a string.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Similar questions already have accepted answers. Set ignore_similar to ask anyway.'
+    default_code = 'similar_questions'
+    
+    def __init__(self, matches):
+        super().__init__()
+        self.matches = matches
+
+
+class AcademicQuestionSerializer(FieldsetSerializerMixin, SearchResultSerializerMixin, serializers.ModelSerializer):
     media = AcademicQuestionMediaSerializer(many=True, read_only=True)
     answers = AcademicAnswerSerializer(many=True, read_only=True)
     student_name = serializers.ReadOnlyField(source='student.full_name')
     teacher_name = serializers.ReadOnlyField(source='teacher.full_name')
+    ignore_similar = serializers.BooleanField(write_only=True, required=False, default=False)
+    expandable_fields = ('media', 'answers')
+    select_related_fields = {'student_name': 'student', 'teacher_name': 'teacher'}
+    prefetch_related_fields = {'media': 'media', 'answers': 'answers__teacher'}
     
     class Meta:
         model = AcademicQuestion
         fields = [
             'id', 'title', 'description', 'student', 'student_name', 'teacher', 
             'teacher_name', 'subject', 'status', 'session_fee', 'created_at', 
-            'updated_at', 'media', 'answers'
+            'updated_at', 'media', 'answers', 'ignore_similar'
         ]
         read_only_fields = ['student', 'created_at', 'updated_at']
     
+    def validate(self, attrs):
+        """Point students at already-answered duplicates before creating a new question"""
+        ignore_similar = attrs.pop('ignore_similar', False)
+        if self.instance is None and not ignore_similar:
+            view = self.context.get('view')
+            duplicates = find_answered_duplicates(
+                attrs.get('title', ''), attrs.get('description', ''),
+                visible=view.get_queryset() if view is not None else None,
+            )
+            if duplicates:
+                raise SimilarQuestionsFound(duplicates)
+        return attrs
+    
     def create(self, validated_data):
         validated_data['student'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class SimilarQuestionSerializer(serializers.ModelSerializer):
+    """Already-answered question returned by duplicate detection"""
+    similarity = serializers.FloatField(read_only=True)
+    accepted_answer = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AcademicQuestion
+        fields = ['id', 'title', 'subject', 'similarity', 'accepted_answer']
+    
+    def get_accepted_answer(self, obj):
+        accepted = getattr(obj, 'accepted_answers', None)
+        if not accepted:
+            return None
+        return AcademicAnswerSerializer(accepted[0], context=self.context).data
+    
+    @classmethod
+    def from_matches(cls, matches, **kwargs):
+        """Serialize ``(question, similarity)`` pairs from ``find_similar``"""
+        for question, similarity in matches:
+            question.similarity = round(similarity, 3)
+        return cls([question for question, _ in matches], many=True, **kwargs).data
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from users import caching, leaderboards, stats
+from users.models import Profile
+from .dispatch import dispatcher, get_setting
+from .models import AcademicQuestion
+from .similarity import index_question
+
+User = get_user_model()
+
+# Sent whenever a question moves through its workflow (assign, answer,
+# accept, close, auto-dispatch) with ``question_id``, ``teacher_id``,
+# ``old_status`` and ``new_status``. Workflow transitions may be done with
+# queryset updates, so receivers must not rely on ``post_save``.
+question_status_changed = Signal()
+
+
+@receiver(post_save, sender=AcademicQuestion)
+def enqueue_new_question(sender, instance, created, raw=False, **kwargs):
+    """Queue newly asked questions for automatic assignment"""
+    if created and not raw and get_setting('ENABLED'):
+        transaction.on_commit(lambda: dispatcher.question_created(instance))
+
+
+@receiver(post_save, sender=AcademicQuestion)
+def update_similarity_index(sender, instance, raw=False, **kwargs):
+    """Keep the question's MinHash signature and LSH buckets current"""
+    if not raw:
+        index_question(instance)
+
+
+@receiver(post_delete, sender=AcademicQuestion)
+def dequeue_deleted_question(sender, instance, **kwargs):
+    if not get_setting('ENABLED'):
+        return
+    dispatcher.question_removed(instance.pk)
+    if instance.status == 'assigned' and instance.teacher_id:
+        dispatcher.question_released(instance.teacher_id)
+
+
+@receiver(post_delete, sender=AcademicQuestion)
+def uncount_deleted_session(sender, instance, **kwargs):
+    stats.question_status_changed(instance.teacher_id, instance.status, None)
+    if instance.teacher_id is not None and instance.status in stats.FINISHED_SESSION_STATUSES:
+        leaderboards.remove_completion(instance.teacher_id, 'subject', instance.subject)
+
+
+@receiver(question_status_changed)
+def track_teacher_load(sender, question_id, teacher_id, old_status, new_status, **kwargs):
+    """Keep the dispatcher's per-teacher capacity counters in step with the workflow"""
+    if not get_setting('ENABLED') or teacher_id is None:
+        return
+    if new_status == 'assigned':
+        dispatcher.question_assigned(question_id, teacher_id)
+    elif old_status == 'assigned':
+        dispatcher.question_released(teacher_id)
+
+
+@receiver(question_status_changed)
+def count_completed_session(sender, question_id, teacher_id, old_status, new_status, **kwargs):
+    """Credit (or take back) the teacher's completed sessions and subject leaderboard as questions finish or reopen"""
+    stats.question_status_changed(teacher_id, old_status, new_status)
+    finished = stats.FINISHED_SESSION_STATUSES
+    if teacher_id is None or (old_status in finished) == (new_status in finished):
+        return
+    subject = AcademicQuestion.objects.filter(pk=question_id).values_list('subject', flat=True).first()
+    if not subject:
+        return
+    if new_status in finished:
+        leaderboards.record_completion(teacher_id, 'subject', subject)
+    else:
+        leaderboards.remove_completion(teacher_id, 'subject', subject)
+
+
+@receiver(post_save, sender=Profile)
+def update_teacher_subjects(sender, instance, raw=False, **kwargs):
+    if raw or not get_setting('ENABLED'):
+        return
+    user = instance.user
+    if user.role == 'teacher':
+        dispatcher.teacher_updated(user.pk, instance.expertise, is_active=user.is_active)
+
+
+@receiver(post_save, sender=User)
+def update_teacher_availability(sender, instance, created, raw=False, **kwargs):
+    """Take deactivated teachers (or users who stop being teachers) out of rotation"""
+    if raw or created or not get_setting('ENABLED'):
+        return
+    if instance.role != 'teacher' or not instance.is_active:
+        dispatcher.teacher_updated(instance.pk, '', is_active=False)
+
+
+@receiver([post_save, post_delete], sender=AcademicQuestion)
+def invalidate_participant_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_user(instance.student_id, instance.teacher_id)
+
+
+@receiver(question_status_changed)
+def invalidate_teacher_responses(sender, question_id, teacher_id, **kwargs):
+    """Workflow transitions are queryset updates and do not send ``post_save``"""
+    caching.bump_user(teacher_id)
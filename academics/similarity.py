@@ -0,0 +1,180 @@
+"""
+Near-duplicate detection for academic questions with MinHash and LSH.
+
+Every question's title and description are reduced to a set of word
+shingles and summarised by a MinHash signature. The signature is split into
+bands and each band is hashed into a bucket; questions sharing any bucket are
+candidates, and only those candidates are compared by estimated Jaccard
+similarity. A lookup is therefore one indexed ``IN`` query on the bucket
+column plus a handful of signature comparisons, whatever the number of
+questions stored.
+"""
+import hashlib
+import random
+import re
+import struct
+
+from django.db import transaction
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+# Candidates below this estimated Jaccard similarity are not reported.
+SIMILARITY_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+_SIGNATURE_FORMAT = f'<{NUM_PERMUTATIONS}I'
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def shingles(text):
+    """Word unigrams and bigrams of the normalised text."""
+    words = _WORD_RE.findall(text.lower())
+    result = set(words)
+    result.update(f'{a} {b}' for a, b in zip(words, words[1:]))
+    return result
+
+
+def compute_signature(title, description):
+    values = [_hash64(shingle.encode()) for shingle in shingles(f'{title} {description}')]
+    if not values:
+        return (_MAX_HASH,) * NUM_PERMUTATIONS
+    return tuple(
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in values)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def pack(signature):
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack(data):
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
+
+
+def band_buckets(signature):
+    """One bucket key per band; the band number is mixed in so keys never collide across bands."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        key = _hash64(struct.pack(f'<H{ROWS_PER_BAND}I', band, *rows))
+        # Fold into the signed 64-bit range of BigIntegerField
+        buckets.append(key - (1 << 64) if key >= (1 << 63) else key)
+    return buckets
+
+
+def estimate_similarity(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERMUTATIONS
+
+
+def index_question(question):
+    """Store (or refresh) the signature and LSH buckets of ``question``."""
+    from .models import QuestionSignature, QuestionLSHBucket
+
+    signature = compute_signature(question.title, question.description)
+    packed = pack(signature)
+    stored = QuestionSignature.objects.filter(question=question).values_list('signature', flat=True).first()
+    if stored is not None and bytes(stored) == packed:
+        return
+    with transaction.atomic():
+        QuestionSignature.objects.update_or_create(question=question, defaults={'signature': packed})
+        QuestionLSHBucket.objects.filter(question=question).delete()
+        QuestionLSHBucket.objects.bulk_create(
+            QuestionLSHBucket(question=question, bucket=bucket) for bucket in band_buckets(signature)
+        )
+
+
+def rebuild_index(batch_size=1000):
+    """Recompute signatures and buckets for every question."""
+    from .models import AcademicQuestion, QuestionSignature, QuestionLSHBucket
+
+    QuestionLSHBucket.objects.all().delete()
+    QuestionSignature.objects.all().delete()
+    rows = AcademicQuestion.objects.values_list('pk', 'title', 'description').order_by('pk')
+    signatures, buckets, count = [], [], 0
+    for pk, title, description in rows.iterator(chunk_size=batch_size):
+        signature = compute_signature(title, description)
+        signatures.append(QuestionSignature(question_id=pk, signature=pack(signature)))
+        buckets.extend(QuestionLSHBucket(question_id=pk, bucket=bucket) for bucket in band_buckets(signature))
+        count += 1
+        if len(signatures) >= batch_size:
+            QuestionSignature.objects.bulk_create(signatures)
+            QuestionLSHBucket.objects.bulk_create(buckets)
+            signatures, buckets = [], []
+    QuestionSignature.objects.bulk_create(signatures)
+    QuestionLSHBucket.objects.bulk_create(buckets)
+    return count
+
+
+def find_similar(title, description, queryset=None, threshold=SIMILARITY_THRESHOLD, limit=5, exclude=None):
+    """
+    Return ``(question, similarity)`` pairs for stored questions that look
+    like the given text, most similar first. ``queryset`` narrows the
+    candidates (for example to answered questions).
+    """
+    from .models import AcademicQuestion, QuestionLSHBucket, QuestionSignature
+
+    signature = compute_signature(title, description)
+    candidates = QuestionLSHBucket.objects.filter(bucket__in=band_buckets(signature))
+    if exclude is not None:
+        candidates = candidates.exclude(question_id=exclude)
+    candidate_ids = set(candidates.values_list('question_id', flat=True))
+    if not candidate_ids:
+        return []
+
+    scored = []
+    for question_id, stored in QuestionSignature.objects.filter(question_id__in=candidate_ids).values_list(
+            'question_id', 'signature'):
+        similarity = estimate_similarity(signature, unpack(stored))
+        if similarity >= threshold:
+            scored.append((similarity, question_id))
+    if not scored:
+        return []
+
+    queryset = AcademicQuestion.objects.all() if queryset is None else queryset
+    questions = queryset.in_bulk([question_id for _, question_id in scored])
+    scored.sort(reverse=True)
+    return [(questions[pk], similarity) for similarity, pk in scored if pk in questions][:limit]
+
+
+def with_accepted_answers(queryset):
+    """Prefetch each question's accepted answer as ``accepted_answers``."""
+    from django.db.models import Prefetch
+    from .models import AcademicAnswer
+
+    return queryset.prefetch_related(
+        Prefetch(
+            'answers',
+            queryset=AcademicAnswer.objects.filter(is_accepted=True).select_related('teacher'),
+            to_attr='accepted_answers',
+        )
+    )
+
+
+def answered_questions():
+    """Questions with an accepted answer."""
+    from .models import AcademicQuestion
+
+    return with_accepted_answers(AcademicQuestion.objects.filter(answers__is_accepted=True).distinct())
+
+
+def find_answered_duplicates(title, description, limit=5, exclude=None, visible=None):
+    """
+    Like ``find_similar`` but only returns questions that already have an
+    accepted answer, and only among ``visible`` questions when given.
+    """
+    queryset = answered_questions()
+    if visible is not None:
+        queryset = queryset.filter(pk__in=visible.values('pk'))
+    return find_similar(title, description, queryset=queryset, limit=limit, exclude=exclude)
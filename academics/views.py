@@ -2,19 +2,36 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from .lifecycle import transition_question
 from .models import AcademicQuestion, AcademicQuestionMedia, AcademicAnswer
-from .serializers import AcademicQuestionSerializer, AcademicQuestionMediaSerializer, AcademicAnswerSerializer
+from .serializers import (
+    AcademicQuestionSerializer, AcademicQuestionMediaSerializer, AcademicAnswerSerializer,
+    SimilarQuestionSerializer, SimilarQuestionsFound,
+)
+from .recommendations import ANSWERED_STATUSES, related_questions
+from .similarity import find_answered_duplicates, with_accepted_answers
+from repairportal.compiled import CompiledListMixin
+from repairportal.fieldsets import FieldsetViewMixin
+from repairportal.sqlite import writer
+from repairportal.sqlite.writer import QueuedWritesMixin
+from repairportal.search import FullTextSearchFilter
+from users.caching import bump_user
+from users.models import Profile
 from users.permissions import IsAdminUser, IsTeacher, IsStudent
 
 
-class AcademicQuestionViewSet(viewsets.ModelViewSet):
+class AcademicQuestionViewSet(QueuedWritesMixin, FieldsetViewMixin, CompiledListMixin, viewsets.ModelViewSet):
     serializer_class = AcademicQuestionSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'subject']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at']
+    # Never read from a replica (see repairportal.routing)
+    primary_actions = ('assign', 'update_status')
     
     def get_queryset(self):
         user = self.request.user
@@ -46,6 +63,20 @@ class AcademicQuestionViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except SimilarQuestionsFound as error:
+            return Response(
+                {
+                    'detail': error.detail,
+                    'similar_questions': SimilarQuestionSerializer.from_matches(
+                        error.matches, context=self.get_serializer_context()
+                    ),
+                },
+                status=error.status_code
+            )
+    
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
         """Endpoint for teachers to assign themselves to a question"""
@@ -63,9 +94,11 @@ class AcademicQuestionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        question.teacher = request.user
-        question.status = 'assigned'
-        question.save()
+        if not transition_question(question, 'assigned', ['pending'], teacher=request.user):
+            return Response(
+                {"detail": "This question is already assigned."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response(
             {"detail": f"Question '{question.title}' assigned to you successfully."},
@@ -92,13 +125,45 @@ class AcademicQuestionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        question.status = new_status
-        question.save()
+        transition_question(
+            question, new_status,
+            [choice for choice, _ in AcademicQuestion.STATUS_CHOICES if choice != new_status]
+        )
         
         return Response(
             {"detail": f"Question status updated to: {new_status}"},
             status=status.HTTP_200_OK
         )
+    
+    @action(detail=False, methods=['get'])
+    def similar(self, request):
+        """Find already-answered questions that look like the given title and description"""
+        title = request.query_params.get('title', '')
+        description = request.query_params.get('description', '')
+        if not title and not description:
+            return Response(
+                {"detail": "Provide a title or description to compare."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Only questions the list endpoint would show this user
+        matches = find_answered_duplicates(title, description, visible=self.get_queryset())
+        return Response(SimilarQuestionSerializer.from_matches(matches, context={'request': request}))
+    
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        """Closest previously answered questions in the same subject"""
+        question = self.get_object()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 5)), 20))
+        except ValueError:
+            limit = 5
+        
+        scored = related_questions(question, k=limit)
+        answered = with_accepted_answers(AcademicQuestion.objects.filter(status__in=ANSWERED_STATUSES))
+        questions = answered.in_bulk([question_id for question_id, _ in scored])
+        matches = [(questions[question_id], score) for question_id, score in scored if question_id in questions]
+        return Response(SimilarQuestionSerializer.from_matches(matches, context={'request': request}))
 
 
 class AcademicQuestionMediaViewSet(viewsets.ModelViewSet):
@@ -127,7 +192,7 @@ class AcademicQuestionMediaViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class AcademicAnswerViewSet(viewsets.ModelViewSet):
+class AcademicAnswerViewSet(QueuedWritesMixin, FieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = AcademicAnswerSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -141,7 +206,7 @@ class AcademicAnswerViewSet(viewsets.ModelViewSet):
             return AcademicAnswer.objects.filter(teacher=user)
         # Students can see answers to their questions
         elif user.role == 'student':
-            return AcademicAnswer.objects.filter(question__student=user)
+            return AcademicAnswer.objects.filter(question__student=user).select_related('question')
         # Default empty queryset
         return AcademicAnswer.objects.none()
     
@@ -152,44 +217,57 @@ class AcademicAnswerViewSet(viewsets.ModelViewSet):
         )
         
         # Only the assigned teacher can answer the question
-        if question.teacher != self.request.user:
+        if question.teacher_id != self.request.user.pk:
             raise permissions.exceptions.PermissionDenied(
                 "You are not assigned to this question and cannot answer it."
             )
         
-        answer = serializer.save(teacher=self.request.user)
-        
-        # Update question status to answered when teacher provides an answer
-        if question.status == 'assigned':
-            question.status = 'answered'
-            question.save()
-            
-        # If there's a session fee, update teacher's earnings
-        if question.session_fee and answer.teacher and hasattr(answer.teacher, 'profile'):
-            profile = answer.teacher.profile
-            profile.total_earnings += float(question.session_fee)
-            profile.save()
+        def save():
+            with transaction.atomic():
+                serializer.save(teacher=self.request.user)
+                
+                # The first answer moves the question to answered and credits the
+                # session fee to the teacher, exactly once
+                if transition_question(question, 'answered', ['assigned']) and question.session_fee:
+                    Profile.objects.filter(user_id=question.teacher_id).update(
+                        total_earnings=F('total_earnings') + question.session_fee
+                    )
+                    bump_user(question.teacher_id)
+        
+        writer.run(save)
     
     @action(detail=True, methods=['post'])
     def accept_answer(self, request, pk=None):
         """Endpoint for students to accept a teacher's answer"""
         answer = self.get_object()
+        question = answer.question
         
         # Only the student who asked the question can accept the answer
-        if answer.question.student != request.user:
+        if question.student_id != request.user.pk:
             return Response(
                 {"detail": "Only the student who asked the question can accept an answer."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Mark the answer as accepted
-        answer.is_accepted = True
-        answer.save()
-        
-        # Close the question
-        question = answer.question
-        question.status = 'closed'
-        question.save()
+        try:
+            with transaction.atomic():
+                # The partial unique index on accepted answers rejects a second one
+                accepted = AcademicAnswer.objects.filter(
+                    pk=answer.pk, is_accepted=False
+                ).update(is_accepted=True)
+                if not accepted:
+                    return Response(
+                        {"detail": "This answer has already been accepted."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                # Close the question
+                transition_question(question, 'closed', ['pending', 'assigned', 'answered'])
+        except IntegrityError:
+            return Response(
+                {"detail": "This question already has an accepted answer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response(
             {"detail": "Answer accepted successfully."},
@@ -5,3 +5,9 @@ from django.apps import AppConfig
 class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat'
+
+    def ready(self):
+        from repairportal import compiled
+        from .serializers import MessageSerializer
+
+        compiled.register(MessageSerializer)
@@ -3,6 +3,7 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from repairportal.sqlite import writer
 from .models import ChatRoom, Message
 
 User = get_user_model()
@@ -91,8 +92,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except ChatRoom.DoesNotExist:
             return False
     
-    @database_sync_to_async
-    def save_message(self, room_id, sender, content, attachment=None):
+    async def save_message(self, room_id, sender, content, attachment=None):
+        return await writer.run_async(self.create_message, room_id, sender, content, attachment)
+    
+    def create_message(self, room_id, sender, content, attachment=None):
         room = ChatRoom.objects.get(pk=room_id)
         message = Message(
             room=room,
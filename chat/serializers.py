@@ -1,6 +1,7 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from repairportal.fieldsets import FieldsetSerializerMixin
 from .models import ChatRoom, Message
 
 User = get_user_model()
@@ -12,7 +13,7 @@ class UserBasicSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'full_name', 'role']
 
 
-class ChatRoomSerializer(serializers.ModelSerializer):
+class ChatRoomSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     participants = UserBasicSerializer(many=True, read_only=True)
     participant_ids = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -20,6 +21,8 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         write_only=True,
         source='participants'
     )
+    expandable_fields = ('participants',)
+    prefetch_related_fields = {'participants': 'participants'}
     
     class Meta:
         model = ChatRoom
@@ -47,9 +50,10 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         return room
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     sender_name = serializers.ReadOnlyField(source='sender.full_name')
     sender_role = serializers.ReadOnlyField(source='sender.role')
+    select_related_fields = {'sender_name': 'sender', 'sender_role': 'sender'}
     
     class Meta:
         model = Message
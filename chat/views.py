@@ -4,12 +4,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from repairportal.compiled import CompiledListMixin
+from repairportal.fieldsets import FieldsetViewMixin
+from repairportal.sqlite.writer import QueuedWritesMixin
 from .models import ChatRoom, Message
 from .serializers import ChatRoomSerializer, MessageSerializer
 from users.permissions import IsAdminUser
 
 
-class ChatRoomViewSet(viewsets.ModelViewSet):
+class ChatRoomViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = ChatRoomSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
@@ -53,9 +56,10 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         )
 
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(QueuedWritesMixin, FieldsetViewMixin, CompiledListMixin, viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('pk',)
     
     def get_queryset(self):
         user = self.request.user
@@ -65,13 +69,11 @@ class MessageViewSet(viewsets.ModelViewSet):
     def unread(self, request):
         """Get all unread messages for the current user"""
         user = request.user
-        unread_messages = Message.objects.filter(
-            room__participants=user,
-            is_read=False
-        ).exclude(sender=user)
+        unread_messages = self.filter_queryset(self.get_queryset()).filter(is_read=False).exclude(sender=user)
         
-        serializer = self.get_serializer(unread_messages, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(unread_messages)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
@@ -0,0 +1,141 @@
+"""
+Shared response cache for near-static read endpoints.
+
+Every tracked model has a version stamp in the cache: a unique version and
+the time of the last change, replaced on each ``post_save``/``post_delete``
+once the transaction commits. A cached response is keyed by the request and
+the stamps of the models it is built from, so a change makes every
+dependent entry unreachable without having to find it.
+
+``cached_response`` derives ``ETag`` and ``Last-Modified`` from the stamps
+alone, so conditional requests are answered with ``304`` before any
+response body (or database row) is read. Code that changes tracked rows
+with ``QuerySet.update()`` must call ``bump()`` itself.
+
+Stamps are only replaced in the cache of the process that made the change.
+With a per-process cache (the ``LocMemCache`` used without ``REDIS_URL``)
+other workers keep serving, and answering ``304`` for, their old responses
+until ``TIMEOUT`` runs out, so deployments with several workers need a shared
+cache; ``manage.py check --deploy`` warns otherwise.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import checks
+from .routing import use_primary
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    # How long a cached response is kept; stamps make it unreachable sooner
+    # when the data changes.
+    'TIMEOUT': 60 * 10,
+    # Cache-Control max-age sent to clients.
+    'MAX_AGE': 60,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'HTTP_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('CACHE_ALIAS')]
+
+
+def stamp_key(model):
+    return f'model_stamp:{model._meta.label_lower}'
+
+
+def _new_stamp():
+    return time.time_ns(), time.time()
+
+
+# model -> fields whose changes replace its stamp, None for all of them
+_tracked_fields = {}
+
+
+def track(model, fields=None):
+    """
+    Replace ``model``'s stamp whenever one of its rows is saved or deleted.
+    With ``fields``, saves limited to other fields (``update_fields``) keep it.
+    """
+    if not _tracked_fields:
+        checks.requires_shared_cache('Response caching', lambda: get_setting('CACHE_ALIAS'))
+    _tracked_fields[model] = set(fields) if fields is not None else None
+    post_save.connect(_bump_instance, sender=model, dispatch_uid=f'model_stamp_save_{model._meta.label}')
+    post_delete.connect(_bump_instance, sender=model, dispatch_uid=f'model_stamp_delete_{model._meta.label}')
+
+
+def _bump_instance(sender, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    fields = _tracked_fields.get(sender)
+    if fields is None or update_fields is None or fields & set(update_fields):
+        bump(sender)
+
+
+def bump(model):
+    transaction.on_commit(lambda: get_cache().set(stamp_key(model), _new_stamp(), None))
+
+
+def get_stamps(models):
+    """``(version, modified)`` of every model, creating missing stamps."""
+    cache = get_cache()
+    keys = [stamp_key(model) for model in models]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, _new_stamp(), None)
+            stamps[key] = cache.get(key)
+    return [stamps[key] for key in keys]
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in parse_etags(if_none_match)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def cached_response(request, models, build):
+    """
+    Serve a GET from the cache, calling ``build()`` for the ``Response`` on a
+    miss. ``models`` are all models whose rows the response is built from.
+    Only successful responses are cached.
+    """
+    stamps = get_stamps(models)
+    fingerprint = hashlib.blake2b(
+        repr((request.get_full_path(), request.get_host(), request.accepted_renderer.format, stamps)).encode(),
+        digest_size=16,
+    ).hexdigest()
+    etag = quote_etag(fingerprint)
+    last_modified = max(modified for _, modified in stamps)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': f"private, max-age={get_setting('MAX_AGE')}",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    key = f'response:{fingerprint}'
+    data = cache.get(key)
+    if data is None:
+        # A lagging replica would cache stale data under the fresh stamps
+        with use_primary():
+            response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        cache.set(key, data, get_setting('TIMEOUT'))
+    return Response(data, headers=headers)
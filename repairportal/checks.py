@@ -0,0 +1,37 @@
+"""
+Deployment checks for state that several worker processes must share.
+
+Features that keep such state in a cache (token revocations, response cache
+stamps, ...) register it with ``requires_shared_cache``; ``manage.py check
+--deploy`` then warns when that cache is local to each process, as the
+default ``LocMemCache`` without ``REDIS_URL`` is.
+"""
+from django.conf import settings
+from django.core import checks
+
+PER_PROCESS_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_shared_cache_users = []  # (feature, function returning the cache alias)
+
+
+def requires_shared_cache(feature, get_alias):
+    """Warn on deployment when the cache ``feature`` uses (``get_alias()``) is per process."""
+    _shared_cache_users.append((feature, get_alias))
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    warnings = []
+    for feature, get_alias in _shared_cache_users:
+        alias = get_alias()
+        if settings.CACHES.get(alias, {}).get('BACKEND') in PER_PROCESS_BACKENDS:
+            warnings.append(checks.Warning(
+                f"{feature} keeps state in the '{alias}' cache, which is local to each process.",
+                hint="Workers will not see each other's changes; set REDIS_URL or use another shared cache.",
+                obj=feature,
+                id='repairportal.W001',
+            ))
+    return warnings
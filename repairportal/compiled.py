@@ -0,0 +1,361 @@
+"""
+Compiled read path for list endpoints.
+
+DRF serializes a row by loading a model instance, walking every field's
+``source`` through it (``student.full_name`` loads the student) and calling
+the field's ``to_representation``. For a serializer passed to
+``register()``, all of that is worked out once at startup: each field
+becomes a ``values_list()`` column plus, where needed, a converter, and
+``CompiledListMixin.list`` turns the page's rows into response dicts with a
+function generated for the exact set of fields being returned.
+
+The output is the same as the serializer's: ``None`` stays ``None``, a
+field read through a null relation is left out, file fields become
+absolute URLs, and search annotations are appended like
+``SearchResultSerializerMixin`` does. ``SerializerMethodField``s are called
+with a row object holding the columns of the model named in the
+serializer's ``row_sources``.
+
+Anything else the compiler cannot follow (nested serializers, many-to-many
+or reverse relations, properties, method fields without ``row_sources``, a
+custom ``to_representation``) makes the request fall back to the
+serializer; ``why_not_compiled()`` tells which field is to blame.
+"""
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .search import SearchResultSerializerMixin
+
+_registry = {}
+
+# Row functions kept per serializer; ?fields= lets clients ask for any subset
+MAX_FUNCTIONS = 256
+
+# Fields whose to_representation returns database values unchanged
+IDENTITY_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+# Classes whose to_representation the compiled code reproduces
+KNOWN_REPRESENTATIONS = (
+    serializers.Field,
+    serializers.BaseSerializer,
+    serializers.Serializer,
+    serializers.ModelSerializer,
+    SearchResultSerializerMixin,
+)
+
+
+class Unsupported(Exception):
+    pass
+
+
+class FieldPlan:
+    """How to produce one field from a row."""
+
+    def __init__(self, name, paths, guards=(), convert=None, prepare=None, missing=None, proxy=None):
+        self.name = name
+        self.paths = tuple(paths)
+        # Paths of nullable relations on the way to the value; a null one means the field is missing
+        self.guards = tuple(guards)
+        # convert(value), or convert(value, prepare(request)) with prepare called once per page
+        self.convert = convert
+        self.prepare = prepare
+        # What to do when a guard is null: ('skip',), ('null',) or ('default', value)
+        self.missing = missing
+        # Row object type passed to a method field
+        self.proxy = proxy
+
+
+def _resolve(model, attrs):
+    """``(values path, nullable relation paths, model field)`` of a source, or ``Unsupported``."""
+    guards = []
+    for position, attr in enumerate(attrs):
+        if attr == 'pk':
+            field = model._meta.pk
+        else:
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise Unsupported(f"'{attr}' is not a model field")
+        if not field.concrete or field.many_to_many or field.one_to_many:
+            raise Unsupported(f"'{attr}' is not a column of {model.__name__}")
+        if position < len(attrs) - 1:
+            if not field.is_relation:
+                raise Unsupported(f"'{attr}' is not a relation")
+            if field.null:
+                guards.append('__'.join(attrs[:position + 1]))
+            model = field.related_model
+    return '__'.join(attrs), guards, field
+
+
+def _missing(field):
+    """What DRF does when the source cannot be read (see ``Field.get_attribute``)."""
+    if field.default is not empty:
+        return ('default', field.get_default())
+    if field.allow_null:
+        return ('null',)
+    if not field.required:
+        return ('skip',)
+    raise Unsupported('a required field behind a nullable relation')
+
+
+def _file_converter(field, model_field):
+    storage = model_field.storage
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+
+    def convert(value, prepared):
+        if not value:
+            return None
+        if not use_url:
+            return value
+        url, absolute = prepared
+        return absolute(url(value)) if absolute is not None else url(value)
+
+    def prepare(request):
+        # Bound once per page: the default storage is a lazy object
+        return storage.url, request.build_absolute_uri if request is not None else None
+
+    return convert, prepare
+
+
+def _datetime_converter(field):
+    """``DateTimeField.to_representation`` with the field's time zone looked up once per page."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation, None
+
+    def convert(value, field_timezone):
+        if field_timezone is None or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def prepare(request):
+        return field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    return convert, prepare
+
+
+def plan_field(serializer, name, field):
+    model = serializer.Meta.model
+    if isinstance(field, serializers.SerializerMethodField):
+        sources = getattr(serializer, 'row_sources', {}).get(name)
+        if sources is None:
+            raise Unsupported('method field without row_sources')
+        for source in sources:
+            _resolve(model, [source])
+        proxy = namedtuple(f'{name}_row', sources)
+        return FieldPlan(name, sources, proxy=proxy)
+    if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+        raise Unsupported('nested or many-valued')
+    if field.source == '*':
+        raise Unsupported("source='*'")
+
+    path, guards, model_field = _resolve(model, field.source_attrs)
+    missing = _missing(field) if guards else None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None or not model_field.is_relation:
+            raise Unsupported('primary key field')
+        return FieldPlan(name, [path], guards, missing=missing)
+    if model_field.is_relation:
+        raise Unsupported('related object')
+    if isinstance(field, serializers.FileField):
+        if not isinstance(model_field, models.FileField):
+            raise Unsupported('file field')
+        return FieldPlan(name, [path], guards, *_file_converter(field, model_field), missing=missing)
+    if isinstance(field, serializers.DateTimeField):
+        return FieldPlan(name, [path], guards, *_datetime_converter(field), missing=missing)
+    if isinstance(field, serializers.ChoiceField):
+        identity = all(isinstance(key, str) for key in field.choices)
+        return FieldPlan(name, [path], guards, None if identity else field.to_representation, missing=missing)
+    if isinstance(field, IDENTITY_FIELDS):
+        return FieldPlan(name, [path], guards, missing=missing)
+    return FieldPlan(name, [path], guards, field.to_representation, missing=missing)
+
+
+class CompiledSerializer:
+    """Field plans of a registered serializer and the row functions generated from them."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.plans = {}
+        self.unsupported = {}
+        self.reason = None
+        self._functions = {}
+
+        custom = [
+            klass.__name__ for klass in serializer_class.__mro__
+            if 'to_representation' in vars(klass) and klass not in KNOWN_REPRESENTATIONS
+        ]
+        if custom:
+            self.reason = f"{custom[0]} overrides to_representation"
+            return
+        serializer = serializer_class()
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                self.plans[name] = plan_field(serializer, name, field)
+            except Unsupported as exc:
+                self.unsupported[name] = str(exc)
+
+    def search_annotations(self, queryset):
+        if not issubclass(self.serializer_class, SearchResultSerializerMixin):
+            return ()
+        annotations = queryset.query.annotations
+        if 'search_rank' not in annotations:
+            return ()
+        return tuple(name for name in self.serializer_class.search_annotations if name in annotations)
+
+    def why_not_compiled(self, names):
+        """Why the fields ``names`` cannot be compiled, or ``None``."""
+        if self.reason:
+            return self.reason
+        for name in names:
+            if name in self.unsupported:
+                return f"{name}: {self.unsupported[name]}"
+        return None
+
+    def reader(self, serializer, queryset, extra_paths=()):
+        """
+        ``(rows, build)`` for the readable fields of ``serializer``: ``rows``
+        is ``queryset`` as named ``values_list()`` rows (including
+        ``extra_paths``), ``build(rows, request)`` their representations.
+        ``None`` when a field needs the serializer.
+        """
+        names = tuple(name for name, field in serializer.fields.items() if not field.write_only)
+        if self.why_not_compiled(names):
+            return None
+        annotations = self.search_annotations(queryset)
+        key = (names, annotations, tuple(extra_paths))
+        generated = self._functions.get(key)
+        if generated is None:
+            if len(self._functions) >= MAX_FUNCTIONS:
+                self._functions.clear()
+            generated = self._functions[key] = self._generate(names, annotations, extra_paths)
+        paths, function, method_names = generated
+        calls = tuple(serializer.fields[name].to_representation for name in method_names)
+        rows = queryset.prefetch_related(None).values_list(*paths, named=True)
+        return rows, lambda page, request: function(page, request, calls)
+
+    def _generate(self, names, annotations, extra_paths):
+        paths = []
+        positions = {}
+
+        def column(path):
+            if path not in positions:
+                positions[path] = len(paths)
+                paths.append(path)
+            return f'row[{positions[path]}]'
+
+        namespace = {}
+        method_names = []
+        prelude = ['def build(rows, request, calls):']
+        lines = [
+            '    result = []',
+            '    append = result.append',
+            '    for row in rows:',
+            '        data = {}',
+        ]
+        for index, name in enumerate(names):
+            plan = self.plans[name]
+            key = repr(name)
+            if plan.proxy is not None:
+                namespace[f'proxy{index}'] = plan.proxy
+                arguments = ', '.join(column(path) for path in plan.paths)
+                lines.append(f'        data[{key}] = calls[{len(method_names)}](proxy{index}({arguments}))')
+                method_names.append(name)
+                continue
+
+            value = column(plan.paths[0])
+            if plan.convert is None:
+                statement = f'data[{key}] = {value}'
+            else:
+                namespace[f'convert{index}'] = plan.convert
+                arguments = 'value'
+                if plan.prepare is not None:
+                    namespace[f'prepare{index}'] = plan.prepare
+                    prelude.append(f'    prepared{index} = prepare{index}(request)')
+                    arguments = f'value, prepared{index}'
+                statement = f'value = {value}; data[{key}] = None if value is None else convert{index}({arguments})'
+            if not plan.guards:
+                lines.append(f'        {statement}')
+                continue
+            condition = ' or '.join(f'{column(guard)} is None' for guard in plan.guards)
+            lines.append(f'        if {condition}:')
+            if plan.missing[0] == 'skip':
+                lines.append('            pass')
+            elif plan.missing[0] == 'null':
+                lines.append(f'            data[{key}] = None')
+            else:
+                namespace[f'default{index}'] = plan.missing[1]
+                lines.append(f'            data[{key}] = default{index}')
+            lines.append('        else:')
+            lines.append(f'            {statement}')
+        for name in annotations:
+            lines.append(f'        data[{name!r}] = {column(name)}')
+        for path in extra_paths:
+            column(path)
+        lines.append('        append(data)')
+        lines.append('    return result')
+
+        source = '\n'.join(prelude + lines)
+        exec(compile(source, f'<compiled {self.serializer_class.__name__}>', 'exec'), namespace)
+        return paths, namespace['build'], tuple(method_names)
+
+
+def register(serializer_class):
+    """Compile ``serializer_class`` for ``CompiledListMixin``; call from ``AppConfig.ready()``."""
+    _registry[serializer_class] = CompiledSerializer(serializer_class)
+    return _registry[serializer_class]
+
+
+def get_compiled(serializer_class):
+    return _registry.get(serializer_class)
+
+
+class CompiledListMixin:
+    """
+    Serves ``list`` through the compiled serializer when one is registered
+    and every requested field compiles, and through the serializer otherwise.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = get_compiled(self.get_serializer_class())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(many=True).child
+        extra_paths = ()
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is not None:
+            # The cursor is read from the rows
+            extra_paths = tuple(field.lstrip('-') for field in get_ordering(request, queryset, self))
+        reader = compiled.reader(serializer, queryset, extra_paths)
+        if reader is None:
+            return self.serialize_list(queryset)
+
+        rows, build = reader
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(build(page, request))
+        return Response(build(rows, request))
+
+    def serialize_list(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
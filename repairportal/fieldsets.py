@@ -0,0 +1,96 @@
+"""
+Sparse fieldsets and on-demand expansion for read endpoints.
+
+``?fields=id,title`` limits a response to the listed fields and
+``?expand=media`` adds nested data that lists leave out by default. A
+serializer lists those heavy fields in ``expandable_fields``; they are still
+part of single-object responses unless ``fields`` says otherwise. Only the
+top-level serializer of a ``GET`` request is affected, writes always see
+every field. Responses cached regardless of the query string pass
+``sparse_fieldsets=False`` in the serializer context.
+
+Serializers also declare the joins and prefetches their fields need
+(``select_related_fields``, ``prefetch_related_fields``) and
+``FieldsetViewMixin`` applies just the ones needed by the fields being
+returned (in ``filter_queryset``, as views override ``get_queryset``), so a
+page costs the same number of queries whatever its size and no query is
+made for data that is left out.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def query_param_set(request, name):
+    """Comma separated names of a query parameter, or ``None`` when it is absent."""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def as_tuple(paths):
+    return (paths,) if isinstance(paths, str) else tuple(paths)
+
+
+class FieldsetSerializerMixin:
+    """
+    Honors ``?fields=`` and ``?expand=``. ``expandable_fields`` are left out of
+    lists unless expanded; ``select_related_fields`` and
+    ``prefetch_related_fields`` map a field to the relations it reads.
+    """
+    expandable_fields = ()
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    @classmethod
+    def selected_fields(cls, request, names, many):
+        """The subset of field ``names`` to return for ``request``."""
+        names = set(names)
+        requested = query_param_set(request, 'fields')
+        expanded = (query_param_set(request, 'expand') or set()) & set(cls.expandable_fields)
+        selected = names if requested is None else names & requested
+        if many:
+            selected = selected - set(cls.expandable_fields)
+        return selected | (names & expanded)
+
+    @classmethod
+    def prune_queryset(cls, queryset, request, many):
+        """Join and prefetch only what the returned fields read."""
+        names = cls.Meta.fields
+        if request.method in SAFE_METHODS:
+            names = cls.selected_fields(request, names, many)
+        joins = [path for name in names for path in as_tuple(cls.select_related_fields.get(name, ()))]
+        prefetches = [path for name in names for path in as_tuple(cls.prefetch_related_fields.get(name, ()))]
+        if joins:
+            queryset = queryset.select_related(*joins)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self.context.get('sparse_fieldsets', True):
+            return fields
+        if not self._is_top_level():
+            return fields
+        many = isinstance(self.parent, serializers.ListSerializer)
+        selected = self.selected_fields(request, fields, many)
+        return {name: field for name, field in fields.items() if name in selected}
+
+    def _is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+class FieldsetViewMixin:
+    """Prunes the filtered queryset to the fields the serializer will return."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request is None or not hasattr(serializer_class, 'prune_queryset'):
+            return queryset
+        return serializer_class.prune_queryset(queryset, self.request, many=not getattr(self, 'detail', False))
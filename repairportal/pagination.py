@@ -0,0 +1,180 @@
+"""
+Cursor pagination used by every list endpoint.
+
+The sort key is the view's ``cursor_ordering`` (newest first by primary key
+unless it says otherwise), the ordering requested through ``OrderingFilter``,
+or the relevance of a full-text search, always ending with the primary key.
+The cursor carries the values of every key field of the last row, so the
+next page is ``WHERE (key) > (cursor) ORDER BY key LIMIT page_size + 1``:
+no offset, and rows sharing a value of a leading field (equal names, ranks
+or scores) are neither skipped nor repeated. How cheap that scan is depends
+on an index matching the whole key; the primary key orderings and the
+directory name have one, orderings on other fields scan and sort.
+
+Key fields should be non-null. Keys that change while a client pages
+(``view_count``, leaderboard scores) can move a row across the cursor, so it
+is missed or seen twice; the order of rows that do not change is stable.
+
+``?page_size=`` is capped at ``MAX_PAGE_SIZE``. Totals are opt-in:
+``?count=1`` adds ``count``, counted only when asked for and only up to
+``MAX_COUNT`` rows (``count_capped`` tells whether the limit was hit).
+"""
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+DEFAULTS = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'MAX_COUNT': 10000,
+}
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def get_setting(name):
+    return getattr(settings, 'PAGINATION', {}).get(name, DEFAULTS[name])
+
+
+def with_tiebreaker(ordering):
+    """``ordering`` ending with the primary key, in the direction of its first field."""
+    ordering = tuple(ordering)
+    if any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+        return ordering
+    return ordering + ('-pk' if ordering[0].startswith('-') else 'pk',)
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def after_position(ordering, position):
+    """``Q`` of the rows that follow ``position``, the key values of a row, in ``ordering``."""
+    after = Q(pk__in=[])
+    equal = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        if value is None:
+            # Nulls only equal each other; no row follows them on this field
+            equal[f'{name}__isnull'] = True
+            continue
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        after |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return after
+
+
+class CursorPagination(pagination.CursorPagination):
+    ordering = ('-pk',)
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+
+    def __init__(self):
+        self.page_size = get_setting('PAGE_SIZE')
+        self.max_page_size = get_setting('MAX_PAGE_SIZE')
+        self.count_queryset = None
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            # Best matches first, unless the client asked for another ordering
+            self.ordering = ('search_rank', '-pk')
+        else:
+            self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return with_tiebreaker(super().get_ordering(request, queryset, view))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # As in DRF, but the cursor position is the whole key of a row
+        if request.query_params.get(self.count_query_param, '').lower() in TRUE_VALUES:
+            self.count_queryset = queryset
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(after_position(ordering, current_position))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=tuple(position))
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position, separators=(',', ':')))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Values of every field of ``ordering``, as strings."""
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return tuple(values)
+
+    def get_count(self):
+        """Rows of the whole list, counting no further than ``MAX_COUNT``."""
+        limit = get_setting('MAX_COUNT')
+        count = self.count_queryset.order_by()[:limit + 1].count()
+        return min(count, limit), count > limit
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count_queryset is not None:
+            count, capped = self.get_count()
+            response.data = {'count': count, 'count_capped': capped, **response.data}
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        schema['properties']['count_capped'] = {'type': 'boolean', 'example': False}
+        return schema
@@ -0,0 +1,166 @@
+"""
+Read replicas.
+
+``ReplicaRouter`` sends reads to one of ``REPLICAS`` only while serving a
+safe-method (``GET``/``HEAD``/``OPTIONS``) request to a DRF view, as marked
+by ``ReplicaRoutingMiddleware``. Everything else reads from the primary
+(``default``): writes and unsafe requests, non-API views such as the admin,
+websocket consumers, management commands and background workers. Viewsets
+list actions that must always see the latest data in ``primary_actions``.
+
+Read-your-writes: once a request has written, the rest of it reads from
+the primary and its user is pinned to the primary for ``PIN_SECONDS``
+(through the shared cache, so it holds across workers). The pin should be
+longer than the replicas' worst replication lag.
+
+Responses kept in a shared cache are built on the primary (see
+``use_primary``), or a lagging replica could store stale data under a fresh
+version stamp.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'PIN_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+_state = contextvars.ContextVar('database_routing', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'DATABASE_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+def _pin_key(user_id):
+    return f'db_pin:{user_id}'
+
+
+def pin(user_id):
+    caches[get_setting('CACHE_ALIAS')].set(_pin_key(user_id), True, get_setting('PIN_SECONDS'))
+
+
+def is_pinned(user_id):
+    return bool(caches[get_setting('CACHE_ALIAS')].get(_pin_key(user_id)))
+
+
+class RequestRouting:
+    """Where the reads of one request go."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica_allowed = False
+        self.primary_only = 0
+        self.wrote = False
+        self._replica = None
+
+    def user(self):
+        """The user once DRF (or the auth middleware) has resolved it, else ``None``."""
+        # Resolving the auth middleware's lazy user would itself query the database
+        user = self.request.__dict__.get('user')
+        if isinstance(user, SimpleLazyObject):
+            return None if user._wrapped is empty else user._wrapped
+        return user
+
+    def user_id(self):
+        user = self.user()
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
+
+    def read_alias(self):
+        if not self.replica_allowed or self.primary_only or self.wrote:
+            return PRIMARY
+        if self._replica is None:
+            user = self.user()
+            if user is None:
+                # Not authenticated yet, so a pin can't be checked
+                return PRIMARY
+            if user.is_authenticated and is_pinned(user.pk):
+                self.replica_allowed = False
+                return PRIMARY
+            replicas = get_setting('REPLICAS')
+            if not replicas:
+                return PRIMARY
+            # One replica per request, so its reads see a single point in time
+            self._replica = random.choice(replicas)
+        return self._replica
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, whatever the request."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    state.primary_only += 1
+    try:
+        yield
+    finally:
+        state.primary_only -= 1
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return PRIMARY
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *get_setting('REPLICAS')}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary
+        if db in get_setting('REPLICAS'):
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Marks safe requests to DRF views as allowed to read from a replica."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestRouting(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        user_id = state.user_id()
+        if state.wrote and user_id is not None:
+            pin(user_id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        view_class = getattr(view_func, 'cls', None)
+        if state is None or view_class is None or request.method not in SAFE_METHODS:
+            return None
+        # Viewset routes map methods to actions
+        action = getattr(view_func, 'actions', {}).get(request.method.lower())
+        state.replica_allowed = action not in getattr(view_class, 'primary_actions', ())
+        return None
@@ -0,0 +1,320 @@
+"""
+Full-text search indexes for models.
+
+Apps register the fields they want indexed in their ``AppConfig.ready()``.
+The index is kept in sync through ``post_save``/``post_delete`` signals and is
+queried through ``FullTextSearchFilter``, which ranks results, supports prefix
+matching and annotates each row with a highlighted snippet.
+
+The backend is chosen per database vendor from ``SEARCH_BACKENDS`` so other
+engines can be plugged in; vendors without a dedicated backend fall back to
+``DatabaseSearchBackend``, which has no index and no ranking.
+"""
+import html
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Private-use characters FTS5 puts around matches in snippets; the text is
+# escaped before they are turned into <mark> tags
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+_registry = {}
+_backends = {}
+
+
+def register(model, fields):
+    """Index ``fields`` of ``model`` and keep the index updated on save/delete."""
+    _registry[model] = tuple(fields)
+    post_save.connect(_index_instance, sender=model, dispatch_uid=f'search_index_{model._meta.label}')
+    post_delete.connect(_unindex_instance, sender=model, dispatch_uid=f'search_unindex_{model._meta.label}')
+
+
+def is_registered(model):
+    return model in _registry
+
+
+def get_fields(model):
+    return _registry[model]
+
+
+def get_backend(using='default'):
+    """Return the search backend for the database connection ``using``."""
+    vendor = connections[using].vendor
+    if vendor not in _backends:
+        path = getattr(settings, 'SEARCH_BACKENDS', {}).get(vendor, 'repairportal.search.DatabaseSearchBackend')
+        _backends[vendor] = import_string(path)()
+    return _backends[vendor]
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query or '')
+
+
+def _index_instance(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    get_backend(using).update(connections[using], instance, _registry[sender])
+
+
+def _unindex_instance(sender, instance, using=None, **kwargs):
+    get_backend(using).remove(connections[using], instance)
+
+
+class SnippetField(TextField):
+    """
+    Text of a snippet delimited with ``MARK_START``/``MARK_END``, read as
+    HTML: the indexed text is escaped and the matches wrapped in ``<mark>``.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        escaped = html.escape(value)
+        return escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class DatabaseSearchBackend:
+    """
+    Fallback backend: filters with ``icontains`` on every indexed field.
+    Results are unranked and carry no snippet.
+    """
+
+    def create_index(self, connection, model, fields):
+        pass
+
+    def drop_index(self, connection, model):
+        pass
+
+    def rebuild(self, connection, model, fields):
+        pass
+
+    def update(self, connection, instance, fields):
+        pass
+
+    def remove(self, connection, instance):
+        pass
+
+    def search(self, queryset, query, fields):
+        for term in tokenize(query):
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value(None, output_field=TextField()),
+        )
+
+    def search_with_related(self, queryset, query, fields, related_model, related_fields, link, extra=()):
+        own = self.search(queryset, query, fields).values('pk')
+        related = self.search(related_model._default_manager.all(), query, related_fields).values(link)
+        return queryset.filter(Q(pk__in=own) | Q(pk__in=related)).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value(None, output_field=SnippetField()),
+            **{f'search_{name}': Value(None, output_field=related_model._meta.get_field(name)) for name in extra},
+        )
+
+
+class SQLiteFTS5Backend:
+    """
+    Keeps one FTS5 virtual table per model, keyed by the model's primary key
+    as rowid. Ranking uses FTS5's built-in ``bm25()`` and snippets come from
+    ``snippet()`` (escaped HTML, see ``SnippetField``), so both are computed
+    from the index rather than by scanning the model table.
+    """
+
+    tokenizer = 'unicode61 remove_diacritics 2'
+    prefix_lengths = '2 3 4'
+    snippet_tokens = 12
+    batch_size = 1000
+
+    def table_name(self, model):
+        return f'{model._meta.db_table}_fts'
+
+    def create_index(self, connection, model, fields):
+        table = self.table_name(model)
+        columns = ', '.join(connection.ops.quote_name(field) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {connection.ops.quote_name(table)} "
+                f"USING fts5({columns}, tokenize='{self.tokenizer}', prefix='{self.prefix_lengths}')"
+            )
+
+    def drop_index(self, connection, model):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(self.table_name(model))}')
+
+    def rebuild(self, connection, model, fields):
+        """Repopulate the index for every row of ``model``."""
+        table = connection.ops.quote_name(self.table_name(model))
+        insert = self._insert_sql(connection, model, fields)
+        rows = model._default_manager.using(connection.alias).values_list('pk', *fields).order_by('pk')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+            batch = []
+            for row in rows.iterator(chunk_size=self.batch_size):
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    cursor.executemany(insert, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+
+    def update(self, connection, instance, fields):
+        model = instance._meta.model
+        table = connection.ops.quote_name(self.table_name(model))
+        values = [instance.pk] + [getattr(instance, field) or '' for field in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+            cursor.execute(self._insert_sql(connection, model, fields), values)
+
+    def remove(self, connection, instance):
+        table = connection.ops.quote_name(self.table_name(instance._meta.model))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+
+    def build_match(self, query):
+        """Turn free text into an FTS5 query: every term must match, as a prefix."""
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in tokenize(query))
+
+    def search(self, queryset, query, fields):
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+        model = queryset.model
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(self.table_name(model))
+        pk_column = '%s.%s' % (
+            connection.ops.quote_name(model._meta.db_table),
+            connection.ops.quote_name(model._meta.pk.column),
+        )
+        matching = f'SELECT rowid FROM {table} WHERE {table} MATCH %s'
+        correlated = f'FROM {table} WHERE {table} MATCH %s AND rowid = {pk_column}'
+        snippet = (
+            f"SELECT snippet({table}, -1, '{MARK_START}', '{MARK_END}', '…', {self.snippet_tokens}) {correlated}"
+        )
+        return queryset.filter(pk__in=RawSQL(matching, [match])).annotate(
+            search_rank=RawSQL(f'SELECT bm25({table}) {correlated}', [match], output_field=FloatField()),
+            search_snippet=RawSQL(snippet, [match], output_field=SnippetField()),
+        ).order_by('search_rank', '-pk')
+
+    def search_with_related(self, queryset, query, fields, related_model, related_fields, link, extra=()):
+        """
+        Like ``search``, but rows also match through the rows of
+        ``related_model`` whose ``link`` foreign key points at them, and each
+        row is ranked by its best match. ``bm25()`` scores of two indexes do
+        not compare, so each is divided by the best score of its index: the
+        best match of either is -1, weaker ones are closer to 0. The
+        ``extra`` fields of the related row that matched best are annotated
+        as ``search_<field>``, null when the row matched itself.
+        """
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+        model = queryset.model
+        qn = connections[queryset.db].ops.quote_name
+        table = qn(self.table_name(model))
+        related_table = qn(self.table_name(related_model))
+        rows = qn(related_model._meta.db_table)
+        row_pk = f'{rows}.{qn(related_model._meta.pk.column)}'
+        row_link = f'{rows}.{qn(related_model._meta.get_field(link).column)}'
+        pk_column = '%s.%s' % (qn(model._meta.db_table), qn(model._meta.pk.column))
+
+        def score(fts):
+            best = f'SELECT bm25({fts}) FROM {fts} WHERE {fts} MATCH %s ORDER BY bm25({fts}) LIMIT 1'
+            return f'-COALESCE(bm25({fts}) / NULLIF(({best}), 0), 1)'
+
+        def snippet(fts):
+            return f"snippet({fts}, -1, '{MARK_START}', '{MARK_END}', '…', {self.snippet_tokens})"
+
+        own_extra = ''.join(f', NULL AS extra_{name}' for name in extra)
+        related_extra = ''.join(f', {rows}.{qn(related_model._meta.get_field(name).column)}' for name in extra)
+        # The related rows of the outer row first (CROSS JOIN keeps that order),
+        # then each is checked against the index by rowid
+        matches = (
+            f'SELECT {score(table)} AS score, 0 AS source, {snippet(table)} AS excerpt{own_extra} '
+            f'FROM {table} WHERE {table} MATCH %s AND rowid = {pk_column} '
+            f'UNION ALL SELECT {score(related_table)}, 1, {snippet(related_table)}{related_extra} '
+            f'FROM {rows} CROSS JOIN {related_table} ON {related_table}.rowid = {row_pk} '
+            f'WHERE {row_link} = {pk_column} AND {related_table} MATCH %s'
+        )
+        params = [match] * 4
+
+        def best(column, output_field):
+            return RawSQL(f'SELECT {column} FROM ({matches}) ORDER BY score, source LIMIT 1', params, output_field)
+
+        matching = (
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+            f'UNION SELECT {row_link} FROM {related_table} JOIN {rows} ON {row_pk} = {related_table}.rowid '
+            f'WHERE {related_table} MATCH %s'
+        )
+        return queryset.filter(pk__in=RawSQL(matching, [match, match])).annotate(
+            search_rank=best('score', FloatField()),
+            search_snippet=best('excerpt', SnippetField()),
+            **{
+                f'search_{name}': best(f'extra_{name}', related_model._meta.get_field(name))
+                for name in extra
+            },
+        ).order_by('search_rank', '-pk')
+
+    def _insert_sql(self, connection, model, fields):
+        table = connection.ops.quote_name(self.table_name(model))
+        columns = ', '.join(['rowid'] + [connection.ops.quote_name(field) for field in fields])
+        placeholders = ', '.join(['%s'] * (len(fields) + 1))
+        return f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+
+
+def create_index_migration(app_label, model_name, fields):
+    """
+    Return ``(forwards, backwards)`` functions for a ``RunPython`` migration
+    that creates and fills the search index of a model.
+    """
+    def forwards(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        connection = schema_editor.connection
+        backend = get_backend(connection.alias)
+        backend.create_index(connection, model, fields)
+        backend.rebuild(connection, model, fields)
+
+    def backwards(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        get_backend(schema_editor.connection.alias).drop_index(schema_editor.connection, model)
+
+    return forwards, backwards
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for ``SearchFilter`` that queries the search index of
+    registered models. Results are ordered by relevance unless the client asks
+    for another ordering, and carry ``search_rank``/``search_snippet``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not tokenize(query) or not is_registered(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        backend = get_backend(queryset.db)
+        return backend.search(queryset, query, get_fields(queryset.model))
+
+
+class SearchResultSerializerMixin:
+    """Adds the rank, highlighted snippet and other ``search_annotations`` to rows returned by a search."""
+    search_annotations = ('search_rank', 'search_snippet')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_rank'):
+            for name in self.search_annotations:
+                if hasattr(instance, name):
+                    data[name] = getattr(instance, name)
+        return data
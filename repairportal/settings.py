@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'channels',
     'drf_yasg',
@@ -34,6 +35,7 @@ INSTALLED_APPS = [
     'academics',
     'chat',
     'resources',
+    'uploads',
 ]
 
 MIDDLEWARE = [
@@ -43,6 +45,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'repairportal.routing.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,6 +81,155 @@ DATABASES = {
     }
 }
 
+# Read replicas of the primary, as comma separated SQLite paths kept in sync
+# by replication (or `manage.py simulate_replication_lag` in development).
+# Safe API reads go to a replica, see repairportal/routing.py.
+for index, path in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# High-concurrency SQLite mode: WAL journaling and a single writer thread per
+# process, see repairportal/sqlite/__init__.py.
+if os.environ.get('SQLITE_HIGH_CONCURRENCY'):
+    for database in DATABASES.values():
+        database['ENGINE'] = 'repairportal.sqlite'
+
+SQLITE_CONCURRENCY = {
+    'BUSY_TIMEOUT_MS': 5000,
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'SYNCHRONOUS': 'NORMAL',
+    'QUEUE_WRITES': True,
+    'MAX_BATCH': 100,
+}
+
+DATABASE_ROUTERS = ['repairportal.routing.ReplicaRouter']
+
+DATABASE_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    # Seconds a user reads from the primary after writing; keep it above
+    # the replicas' worst lag.
+    'PIN_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+# Full-text search backend per database vendor (see repairportal/search.py).
+# Vendors without an entry fall back to unranked icontains filtering.
+SEARCH_BACKENDS = {
+    'sqlite': 'repairportal.search.SQLiteFTS5Backend',
+}
+
+# Automatic assignment of academic questions (see academics/dispatch.py)
+ACADEMIC_DISPATCH = {
+    'ENABLED': True,
+    'TEACHER_CAPACITY': 3,
+    'FEE_WEIGHT_SECONDS': 600,
+    'RESYNC_SECONDS': 300,
+}
+
+# Bayesian prior used to score leaderboards (see users/leaderboards.py)
+LEADERBOARDS = {
+    'PRIOR_MEAN': 3.5,
+    'PRIOR_WEIGHT': 5,
+}
+
+# Where offline recommendation jobs store their matrices
+RECOMMENDATION_INDEX_DIR = os.path.join(BASE_DIR, 'indexes')
+
+# Caches. The response cache stamps, the per-user response cache version
+# counters and token revocations are kept here, so deployments with several
+# workers need a shared backend (set REDIS_URL); `check --deploy` warns
+# otherwise.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+USER_RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 15,
+    'METRICS_FLUSH_EVERY': 100,
+}
+
+# Response cache for near-static catalog endpoints, see repairportal.caching
+HTTP_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 10,
+    'MAX_AGE': 60,
+}
+
+# Buffered resource view counts, see resources.counters
+RESOURCE_VIEW_COUNTS = {
+    'CACHE_ALIAS': 'default',
+    'FLUSH_SECONDS': 10,
+    'MAX_PENDING': 1000,
+    'DEDUP_SECONDS': 30 * 60,
+}
+
+# Trending resources, see resources.trending
+RESOURCE_TRENDING = {
+    'WINDOW_MINUTES': 60,
+    'HALF_LIFE_HOURS': 6,
+    'TOP_K': 50,
+}
+
+# Co-view recommendations, see resources.recommendations
+RESOURCE_RECOMMENDATIONS = {
+    'NEIGHBORS': 20,
+    'MAX_USER_RESOURCES': 200,
+    'MIN_COVIEWS': 2,
+    'BLOCK_SIZE': 2000,
+    'BLOCK_PRODUCTS': 20_000_000,
+}
+
+# Resource preview generation, see resources.thumbnails
+RESOURCE_THUMBNAILS = {
+    'WORKERS': 2,
+    'TIMEOUT': 60,
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+# Text extraction of resource files for search, see resources.content
+RESOURCE_CONTENT = {
+    'WORKERS': 2,
+    'TIMEOUT': 120,
+    'CHUNK_CHARS': 2000,
+    'MAX_PAGES': 500,
+}
+
+# Resumable chunked uploads, see uploads.transfer
+UPLOADS = {
+    'PART_DIR': 'upload_parts',
+    'READ_SIZE': 64 * 1024,
+    'MAX_CHUNK_SIZE': 8 * 1024 * 1024,
+    'EXPIRY_HOURS': 24,
+    'MAX_SIZES': {
+        'resource': 20 * 1024 * 1024,
+        'resource.video': 100 * 1024 * 1024,
+        'repair_media': 10 * 1024 * 1024,
+        'academic_media': 10 * 1024 * 1024,
+    },
+    'HASH_STATES': 256,
+    'LOCK_SECONDS': 10 * 60,
+}
+
+# Cohort provisioning jobs started by the API, see users.provisioning
+USER_PROVISIONING = {
+    'JOB_DIR': 'provisioning_jobs',
+}
+
 # Channel layers for websocket
 CHANNEL_LAYERS = {
     'default': {
@@ -124,11 +276,19 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'repairportal.pagination.CursorPagination',
+}
+
+# Page sizes of list endpoints, see repairportal.pagination
+PAGINATION = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'MAX_COUNT': 10000,
 }
 
 # JWT settings
@@ -147,6 +307,24 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.ClaimsTokenRefreshSerializer',
+}
+
+# Bloom filter in front of refresh-token blacklist lookups, see users.blacklist
+REFRESH_TOKEN_BLOOM = {
+    'FALSE_POSITIVE_RATE': 0.01,
+    'MIN_CAPACITY': 10000,
+    'SYNC_SECONDS': 5,
+    'REBUILD_SECONDS': 3600,
+    'SYNC_OVERLAP_ROWS': 1000,
+}
+
+# Principals built from access-token claims, see users.authentication
+JWT_PRINCIPAL_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'MAX_SIZE': 10000,
+    'TTL': 60,
 }
 
 # CORS settings
@@ -0,0 +1,38 @@
+"""
+High-concurrency SQLite deployment mode.
+
+Set ``ENGINE`` to ``'repairportal.sqlite'`` (``SQLITE_HIGH_CONCURRENCY=1`` in
+the environment does so in settings) and every connection is opened with
+WAL journaling, a ``busy_timeout``, a memory-mapped read window and
+``synchronous=NORMAL``. With WAL, readers never wait for the writer and the
+writer never waits for readers; ``synchronous=NORMAL`` only syncs at
+checkpoints, which WAL makes safe against corruption (a power loss can
+drop the last commits, not damage the file).
+
+SQLite still allows one writer at a time, so writes of a process are
+funneled through a single writer thread (``writer.write_queue``) that
+commits whatever queued up while the previous commit ran as one
+transaction, each write in its own savepoint. Only the database writes are
+queued: saves and deletes of viewsets with ``QueuedWritesMixin`` and chat
+messages, while requests are parsed, validated and rendered on their own
+threads, so the write lock is never held for request work. Transactions
+start with ``BEGIN IMMEDIATE`` so writers of other processes wait for the
+lock (up to ``BUSY_TIMEOUT_MS``) instead of failing with "database is
+locked" when a transaction that has read tries to write.
+"""
+from django.conf import settings
+
+ENGINE = 'repairportal.sqlite'
+
+DEFAULTS = {
+    'BUSY_TIMEOUT_MS': 5000,
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'SYNCHRONOUS': 'NORMAL',
+    'QUEUE_WRITES': True,
+    # Writes committed together at most.
+    'MAX_BATCH': 100,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'SQLITE_CONCURRENCY', {}).get(name, DEFAULTS[name])
@@ -0,0 +1,20 @@
+from django.db.backends.sqlite3 import base
+
+from . import get_setting
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f"PRAGMA busy_timeout = {int(get_setting('BUSY_TIMEOUT_MS'))}")
+        conn.execute(f"PRAGMA mmap_size = {int(get_setting('MMAP_SIZE'))}")
+        conn.execute(f"PRAGMA synchronous = {get_setting('SYNCHRONOUS')}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Take the write lock up front: a deferred transaction that has read
+        # fails at once, busy_timeout or not, when it writes after another
+        # connection committed.
+        self.cursor().execute('BEGIN IMMEDIATE')
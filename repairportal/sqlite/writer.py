@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from . import ENGINE, get_setting
+
+
+def enabled():
+    """Whether writes are queued: the primary uses the high-concurrency engine and ``QUEUE_WRITES`` is on."""
+    return settings.DATABASES[DEFAULT_DB_ALIAS]['ENGINE'] == ENGINE and get_setting('QUEUE_WRITES')
+
+
+class WriteQueue:
+    """
+    Runs write functions on one thread, committing the writes queued while
+    the previous batch committed (up to ``MAX_BATCH``) in one transaction.
+    Each write runs in a savepoint, so a failing one is rolled back alone
+    and its exception raised to its caller; callers get their result once
+    the batch has committed. Functions run in a copy of the caller's context.
+    """
+
+    def __init__(self, name='sqlite-writer'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._jobs = queue.SimpleQueue()
+        self._thread = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, function, *args, **kwargs):
+        """Queue ``function(*args, **kwargs)``; returns a ``Future`` of its result."""
+        future = Future()
+        call = functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+        self._jobs.put((call, future))
+        self._ensure_writer()
+        return future
+
+    def run(self, function, *args, **kwargs):
+        """Call ``function`` on the writer thread and wait for its committed result."""
+        if self.is_writer() or connection.in_atomic_block:
+            # Already the writer, or inside a transaction the write must join
+            return function(*args, **kwargs)
+        return self.submit(function, *args, **kwargs).result()
+
+    def is_writer(self):
+        return threading.current_thread() is self._thread
+
+    def stop(self):
+        """Let the writer finish the queued writes and exit."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                batch = [self._jobs.get()]
+                while batch[-1] is not None and len(batch) < get_setting('MAX_BATCH'):
+                    try:
+                        batch.append(self._jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = batch[-1] is None
+                jobs = [job for job in batch if job is not None]
+                if jobs:
+                    self._commit(jobs)
+                if stopping:
+                    return
+        finally:
+            connections.close_all()
+
+    def _commit(self, jobs):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for call, future in jobs:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, call(), None))
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+        except Exception as error:
+            # The commit itself failed, nothing of the batch was written
+            connection.close_if_unusable_or_obsolete()
+            for _, future in jobs:
+                if future.running():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        self.writes += len(outcomes)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+write_queue = WriteQueue()
+
+
+def run(function, *args, **kwargs):
+    """Call ``function`` through the write queue when it is enabled, directly otherwise."""
+    if not enabled():
+        return function(*args, **kwargs)
+    return write_queue.run(function, *args, **kwargs)
+
+
+async def run_async(function, *args, **kwargs):
+    """Await ``function`` on the write queue when it is enabled, on the database thread otherwise."""
+    if not enabled():
+        return await database_sync_to_async(function)(*args, **kwargs)
+    return await asyncio.wrap_future(write_queue.submit(function, *args, **kwargs))
+
+
+class QueuedWritesMixin:
+    """
+    Saves and deletes of a viewset go through the write queue; parsing,
+    permissions, validation and rendering stay on the request thread.
+    Viewsets that override ``perform_create`` wrap their own writes in ``run``.
+    """
+
+    def perform_create(self, serializer):
+        run(super().perform_create, serializer)
+
+    def perform_update(self, serializer):
+        run(super().perform_update, serializer)
+
+    def perform_destroy(self, instance):
+        run(super().perform_destroy, instance)
@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/academics/', include('academics.urls')),
     path('api/chat/', include('chat.urls')),
     path('api/resources/', include('resources.urls')),
+    path('api/uploads/', include('uploads.urls')),
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('api/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
@@ -5,3 +5,12 @@ from django.apps import AppConfig
 class RepairsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'repairs'
+
+    def ready(self):
+        from repairportal import compiled, search
+        from . import signals  # noqa: F401
+        from .models import RepairRequest
+        from .serializers import RepairRequestSerializer
+
+        search.register(RepairRequest, ['title', 'description', 'device_model'])
+        compiled.register(RepairRequestSerializer)
@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from academics.models import AcademicQuestion
+from academics.serializers import AcademicQuestionSerializer
+from chat.models import ChatRoom, Message
+from chat.serializers import MessageSerializer
+from repairportal import compiled
+from repairs.models import RepairRequest
+from repairs.serializers import RepairRequestSerializer
+from resources.models import Resource, ResourceCategory
+from resources.serializers import ResourceSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare list serialization through DRF and through the compiled serializers on synthetic rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows of each model.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the fastest counts.')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        with transaction.atomic():
+            users = self.populate(options['rows'])
+            cases = [
+                ('repairs', RepairRequestSerializer, RepairRequest.objects.all()),
+                ('questions', AcademicQuestionSerializer, AcademicQuestion.objects.all()),
+                ('messages', MessageSerializer, Message.objects.filter(sender__in=users)),
+                ('resources', ResourceSerializer, Resource.objects.all()),
+            ]
+            self.stdout.write(f"{'':<12}{'serializer':>12}{'compiled':>12}{'speedup':>10}")
+            for label, serializer_class, queryset in cases:
+                self.compare(label, serializer_class, queryset.order_by('-pk'), request, options['repeat'])
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        now = timezone.now()
+        student = User.objects.create_user(
+            email='benchmark-student@example.com', password=None, full_name='Benchmark Student', role='student'
+        )
+        staff = User.objects.create_user(
+            email='benchmark-staff@example.com', password=None, full_name='Benchmark Staff', role='technician'
+        )
+        category = ResourceCategory.objects.create(name='Benchmark')
+        room = ChatRoom.objects.create(name='Benchmark')
+        RepairRequest.objects.bulk_create([
+            RepairRequest(
+                student=student, technician=staff if i % 2 else None, title=f'Repair {i}',
+                description='Screen flickers after the update. ' * 4, device_type='laptop',
+                device_model='X1', estimated_cost=Decimal('49.90') if i % 3 else None,
+            )
+            for i in range(count)
+        ])
+        AcademicQuestion.objects.bulk_create([
+            AcademicQuestion(
+                student=student, teacher=staff if i % 2 else None, title=f'Question {i}',
+                description='How does the integral change? ' * 4, subject='mathematics',
+                session_fee=Decimal('15.00'),
+            )
+            for i in range(count)
+        ])
+        Message.objects.bulk_create([
+            Message(room=room, sender=student if i % 2 else staff, content=f'Message {i}',
+                    attachment='chat_attachments/photo.jpg' if i % 5 == 0 else '')
+            for i in range(count)
+        ])
+        Resource.objects.bulk_create([
+            Resource(
+                title=f'Resource {i}', description='Step by step guide. ' * 4, file=f'resources/guide-{i}.pdf',
+                resource_type='pdf', category=category, uploaded_by=staff, view_count=i,
+                created_at=now - timedelta(minutes=i),
+                thumbnail_variants={'small': {'name': f'resource_thumbnails/{i}-small.webp', 'width': 160,
+                                              'height': 120, 'size': 2048}},
+            )
+            for i in range(count)
+        ])
+        return [student, staff]
+
+    def compare(self, label, serializer_class, queryset, request, repeat):
+        compiled_serializer = compiled.get_compiled(serializer_class) or compiled.register(serializer_class)
+        context = {'request': request}
+
+        def serialize():
+            instances = list(serializer_class.prune_queryset(queryset, request, many=True))
+            return serializer_class(instances, many=True, context=context).data
+
+        def compile_rows():
+            serializer = serializer_class(many=True, context=context).child
+            reader = compiled_serializer.reader(serializer, queryset)
+            if reader is None:
+                fields = [name for name, field in serializer.fields.items() if not field.write_only]
+                raise CommandError(f'{label}: {compiled_serializer.why_not_compiled(fields)}')
+            rows, build = reader
+            return build(list(rows), request)
+
+        expected, actual = serialize(), compile_rows()
+        if [dict(item) for item in expected] != actual:
+            raise CommandError(f'{label}: the compiled output differs from the serializer')
+        slow, fast = self.best(serialize, repeat), self.best(compile_rows, repeat)
+        self.stdout.write(
+            f"{label:<12}{slow * 1000:>10.1f}ms{fast * 1000:>10.1f}ms{slow / fast:>9.1f}x  {len(actual)} rows"
+        )
+
+    def best(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
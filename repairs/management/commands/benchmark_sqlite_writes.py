@@ -0,0 +1,143 @@
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from chat.models import ChatRoom, Message
+from repairportal.sqlite import ENGINE
+from repairportal.sqlite.writer import WriteQueue
+
+User = get_user_model()
+
+MODES = (
+    ('sqlite3', 'django.db.backends.sqlite3', False),
+    ('wal', ENGINE, False),
+    ('wal+queue', ENGINE, True),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure chat message write throughput of many concurrent clients, and the latency of readers '
+        'meanwhile, on the default SQLite backend and in the high-concurrency mode.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help='Concurrent writing clients.')
+        parser.add_argument('--writes', type=int, default=50, help='Messages written by each client.')
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes the clients are spread over.')
+        parser.add_argument('--readers', type=int, default=4, help='Clients reading the room meanwhile.')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        original = database['ENGINE'], database['NAME']
+        self.stdout.write(
+            f"{'':<11}{'writes/s':>10}{'failed':>8}{'batch':>7}{'reads/s':>10}{'read p99':>10}{'read max':>10}"
+        )
+        try:
+            for label, engine, queued in MODES:
+                with tempfile.TemporaryDirectory() as directory:
+                    self.use_database(engine, Path(directory, 'benchmark.sqlite3'))
+                    call_command('migrate', verbosity=0)
+                    self.measure(label, queued, options)
+        finally:
+            self.use_database(*original)
+
+    def use_database(self, engine, name):
+        connections['default'].close()
+        # A fresh wrapper picks up the engine; connections.settings shares its dicts with settings.DATABASES
+        del connections['default']
+        connections.settings['default'].update(ENGINE=engine, NAME=name)
+
+    def measure(self, label, queued, options):
+        users = [
+            User.objects.create_user(email=f'client-{i}@example.com', password=None, full_name=f'Client {i}')
+            for i in range(options['clients'])
+        ]
+        room = ChatRoom.objects.create(name='Benchmark')
+        room.participants.add(*users)
+        connections.close_all()
+
+        # Worker processes, like REST workers, each with its own write queue
+        context = multiprocessing.get_context('fork')
+        results = context.SimpleQueue()
+        workers = [
+            context.Process(target=self.write, args=(users[i::options['processes']], room, queued, options, results))
+            for i in range(options['processes'])
+        ]
+        latencies = []
+        writing = threading.Event()
+        writing.set()
+        readers = [threading.Thread(target=self.read, args=(room, writing, latencies)) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        # Fork before any thread holds a lock the children would inherit
+        for process in workers:
+            process.start()
+        for thread in readers:
+            thread.start()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+
+        failed, writes, batches = map(sum, zip(*(results.get() for _ in workers)))
+        written = Message.objects.filter(room=room).count()
+        batch = f'{writes / batches:.1f}' if batches else '-'
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        self.stdout.write(
+            f'{label:<11}{written / elapsed:>10.0f}{failed:>8}{batch:>7}{len(latencies) / elapsed:>10.0f}'
+            f'{p99 * 1000:>8.1f}ms{(latencies[-1] if latencies else 0) * 1000:>8.1f}ms'
+        )
+
+    def write(self, users, room, queued, options, results):
+        """Run one client thread per user; reports ``(failed, queued writes, batches)``."""
+        write_queue = WriteQueue() if queued else None
+        failed = []
+
+        def save(user, index):
+            # As ChatConsumer: find the room, then write the message and its signals
+            with transaction.atomic():
+                Message.objects.create(room=ChatRoom.objects.get(pk=room.pk), sender=user, content=f'Message {index}')
+
+        def client(user):
+            try:
+                for index in range(options['writes']):
+                    try:
+                        if write_queue is not None:
+                            write_queue.run(save, user, index)
+                        else:
+                            save(user, index)
+                    except OperationalError:
+                        failed.append(index)
+            finally:
+                connections.close_all()
+
+        clients = [threading.Thread(target=client, args=(user,)) for user in users]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        if write_queue is None:
+            results.put((len(failed), 0, 0))
+        else:
+            write_queue.stop()
+            results.put((len(failed), write_queue.writes, write_queue.batches))
+
+    def read(self, room, writing, latencies):
+        try:
+            while writing.is_set():
+                started = time.perf_counter()
+                list(Message.objects.filter(room=room).order_by('-pk')[:20])
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from repairportal import routing
+
+
+class LaggingReplicas:
+    """
+    Copies an SQLite primary to replica files through a queue of snapshots,
+    each applied ``lag`` seconds after it was taken, like asynchronous
+    replication. Snapshots are kept in memory until they are due.
+    """
+
+    def __init__(self, primary, replicas, lag):
+        self.primary = primary
+        self.replicas = replicas
+        self.lag = lag
+        self.pending = deque()
+
+    def snapshot(self):
+        memory = sqlite3.connect(':memory:')
+        # URIs for the in-memory test database, plain paths otherwise
+        source = sqlite3.connect(self.primary, uri=True)
+        try:
+            source.backup(memory)
+        finally:
+            source.close()
+        self.pending.append((time.monotonic(), memory))
+
+    def apply_due(self):
+        """Bring the replicas to the newest snapshot that is ``lag`` old, if any."""
+        now, due = time.monotonic(), None
+        while self.pending and now - self.pending[0][0] >= self.lag:
+            if due is not None:
+                due.close()
+            due = self.pending.popleft()[1]
+        if due is None:
+            return False
+        try:
+            for path in self.replicas:
+                target = sqlite3.connect(path)
+                try:
+                    due.backup(target)
+                finally:
+                    target.close()
+        finally:
+            due.close()
+        return True
+
+    def sync(self):
+        """Bring the replicas up to date right away, dropping pending snapshots."""
+        while self.pending:
+            self.pending.popleft()[1].close()
+        lag, self.lag = self.lag, 0
+        try:
+            self.snapshot()
+            self.apply_due()
+        finally:
+            self.lag = lag
+
+
+class Command(BaseCommand):
+    help = 'Replicate the SQLite primary to the configured replicas (SQLITE_REPLICAS) with a delay.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=1.0, help='Seconds a replica trails the primary.')
+        parser.add_argument('--interval', type=float, default=0.2, help='Seconds between snapshots.')
+
+    def handle(self, *args, **options):
+        aliases = routing.get_setting('REPLICAS')
+        if not aliases:
+            raise CommandError('No replicas are configured; set SQLITE_REPLICAS.')
+        databases = [settings.DATABASES[alias] for alias in ['default', *aliases]]
+        if any(database['ENGINE'] != 'django.db.backends.sqlite3' for database in databases):
+            raise CommandError('Replication can only be simulated between SQLite databases.')
+        replicas = LaggingReplicas(str(databases[0]['NAME']), [str(db['NAME']) for db in databases[1:]], options['lag'])
+        replicas.sync()
+        self.stdout.write(f"Replicating to {', '.join(aliases)} {options['lag']}s behind, Ctrl-C to stop.")
+        try:
+            while True:
+                time.sleep(options['interval'])
+                replicas.snapshot()
+                replicas.apply_due()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from repairportal.search import create_index_migration
+
+create_search_index, drop_search_index = create_index_migration(
+    "repairs", "RepairRequest", ["title", "description", "device_model"]
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("repairs", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("repairs", "0003_repairrequest_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="repairrequest",
+            name="comment_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="repairrequest",
+            name="media_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("repairs", "0004_repair_thread_versions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="repairrequest",
+            index=models.Index(fields=["created_at", "id"], name="repair_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="repairrequest",
+            index=models.Index(fields=["updated_at", "id"], name="repair_updated_idx"),
+        ),
+    ]
@@ -44,9 +44,32 @@ class RepairRequest(models.Model):
     final_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped whenever a comment or media item of this repair changes; used as
+    # the ETag source of the per-repair feeds.
+    comment_version = models.PositiveIntegerField(default=0, editable=False)
+    media_version = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Only ever changed with F() updates, so a save() of an instance loaded
+    # before one of them must not write its stale values back
+    COUNTER_FIELDS = ('comment_version', 'media_version')
+    
+    class Meta:
+        # Keys of the orderings offered by the list endpoint
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='repair_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='repair_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 class RepairMedia(models.Model):
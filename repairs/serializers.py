@@ -1,9 +1,15 @@
 
 from rest_framework import serializers
+from repairportal.fieldsets import FieldsetSerializerMixin
+from repairportal.search import SearchResultSerializerMixin
+from uploads.serializers import UploadedFileMixin
 from .models import RepairRequest, RepairMedia, RepairComment
 
 
-class RepairMediaSerializer(serializers.ModelSerializer):
+class RepairMediaSerializer(FieldsetSerializerMixin, UploadedFileMixin, serializers.ModelSerializer):
+    upload_target = 'repair_media'
+    upload_filled_fields = ('file_type',)
+    
     class Meta:
         model = RepairMedia
         fields = ['id', 'repair_request', 'file', 'file_type', 'uploaded_at']
@@ -16,9 +22,10 @@ class RepairMediaSerializer(serializers.ModelSerializer):
         return value
 
 
-class RepairCommentSerializer(serializers.ModelSerializer):
+class RepairCommentSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.ReadOnlyField(source='user.full_name')
     user_role = serializers.ReadOnlyField(source='user.role')
+    select_related_fields = {'user_name': 'user', 'user_role': 'user'}
     
     class Meta:
         model = RepairComment
@@ -30,11 +37,14 @@ class RepairCommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class RepairRequestSerializer(serializers.ModelSerializer):
+class RepairRequestSerializer(FieldsetSerializerMixin, SearchResultSerializerMixin, serializers.ModelSerializer):
     media = RepairMediaSerializer(many=True, read_only=True)
     comments = RepairCommentSerializer(many=True, read_only=True)
     student_name = serializers.ReadOnlyField(source='student.full_name')
     technician_name = serializers.ReadOnlyField(source='technician.full_name')
+    expandable_fields = ('media', 'comments')
+    select_related_fields = {'student_name': 'student', 'technician_name': 'technician'}
+    prefetch_related_fields = {'media': 'media', 'comments': 'comments__user'}
     
     class Meta:
         model = RepairRequest
@@ -0,0 +1,63 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from users import caching, leaderboards, stats
+from .models import RepairRequest, RepairMedia, RepairComment
+
+# Sent whenever a repair request moves through its workflow (assign, status
+# updates) with ``repair_request_id``, ``technician_id``, ``old_status`` and
+# ``new_status``.
+repair_status_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=RepairComment)
+def bump_comment_version(sender, instance, raw=False, **kwargs):
+    """Invalidate the ETag of the repair's comment feed"""
+    if raw:
+        return
+    RepairRequest.objects.filter(pk=instance.repair_request_id).update(
+        comment_version=F('comment_version') + 1
+    )
+
+
+@receiver([post_save, post_delete], sender=RepairMedia)
+def bump_media_version(sender, instance, raw=False, **kwargs):
+    """Invalidate the ETag of the repair's media feed"""
+    if raw:
+        return
+    RepairRequest.objects.filter(pk=instance.repair_request_id).update(
+        media_version=F('media_version') + 1
+    )
+
+
+@receiver(repair_status_changed)
+def count_completed_repair(sender, repair_request_id, technician_id, old_status, new_status, **kwargs):
+    """Credit (or take back) the technician's completed repairs and device-category leaderboard"""
+    stats.repair_status_changed(technician_id, old_status, new_status)
+    if technician_id is None or (old_status == 'completed') == (new_status == 'completed'):
+        return
+    device_type = RepairRequest.objects.filter(pk=repair_request_id).values_list('device_type', flat=True).first()
+    if not device_type:
+        return
+    if new_status == 'completed':
+        leaderboards.record_completion(technician_id, 'device', device_type)
+    else:
+        leaderboards.remove_completion(technician_id, 'device', device_type)
+
+
+@receiver(post_delete, sender=RepairRequest)
+def uncount_deleted_repair(sender, instance, **kwargs):
+    stats.repair_status_changed(instance.technician_id, instance.status, None)
+    if instance.technician_id is not None and instance.status == 'completed':
+        leaderboards.remove_completion(instance.technician_id, 'device', instance.device_type)
+
+
+@receiver([post_save, post_delete], sender=RepairRequest)
+def invalidate_participant_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_user(instance.student_id, instance.technician_id)
+
+
+@receiver(repair_status_changed)
+def invalidate_technician_responses(sender, repair_request_id, technician_id, **kwargs):
+    caching.bump_user(technician_id)
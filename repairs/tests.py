@@ -0,0 +1,109 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from repairportal import routing
+from .management.commands.simulate_replication_lag import LaggingReplicas
+from .models import RepairRequest
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+LAG = 0.5
+
+
+@override_settings(DATABASE_ROUTING={'REPLICAS': [REPLICA], 'PIN_SECONDS': LAG * 2, 'CACHE_ALIAS': 'default'})
+class ReplicaRoutingTests(TransactionTestCase):
+    """Read-your-writes against a replica that trails the test database by ``LAG`` seconds"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test databases are set up: the replica is a copy
+        # made by LaggingReplicas, not a database of its own to create or flush
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.replica_path = str(Path(cls.directory.name, 'replica.sqlite3'))
+        configured = connections.configure_settings({
+            'default': connections.settings['default'],
+            REPLICA: {'ENGINE': connections.settings['default']['ENGINE'], 'NAME': cls.replica_path},
+        })
+        connections.settings[REPLICA] = configured[REPLICA]
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        connections.settings.pop(REPLICA)
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches[routing.get_setting('CACHE_ALIAS')].clear()
+        self.student = User.objects.create_user(
+            email='student-a@example.com', password=None, full_name='Student A', role='student'
+        )
+        self.admin = User.objects.create_user(
+            email='admin-b@example.com', password=None, full_name='Admin B', role='admin', is_staff=True
+        )
+        self.technician = User.objects.create_user(
+            email='technician@example.com', password=None, full_name='Technician', role='technician'
+        )
+        self.replicas = LaggingReplicas(connections['default'].settings_dict['NAME'], [self.replica_path], LAG)
+        self.replicas.sync()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def lists(self, user, repair_id):
+        response = self.client_for(user).get('/api/repairs/requests/')
+        self.assertEqual(response.status_code, 200)
+        return any(item['id'] == repair_id for item in response.data['results'])
+
+    def replica_queries(self, function):
+        """``(queries run on the replica, result)`` of calling ``function``."""
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connections[REPLICA].execute_wrapper(count):
+            result = function()
+        return len(queries), result
+
+    def test_author_reads_own_write_until_replica_catches_up(self):
+        created = self.client_for(self.student).post('/api/repairs/requests/', {
+            'title': 'Cracked screen', 'description': 'Dropped it.', 'device_type': 'tablet', 'device_model': 'T7',
+        }, format='json')
+        self.assertEqual(created.status_code, 201)
+        self.replicas.snapshot()
+        repair_id = created.data['id']
+
+        # The author is pinned to the primary; the admin reads the lagging replica
+        queries, seen = self.replica_queries(lambda: self.lists(self.student, repair_id))
+        self.assertEqual(queries, 0)
+        self.assertTrue(seen)
+        queries, seen = self.replica_queries(lambda: self.lists(self.admin, repair_id))
+        self.assertGreater(queries, 0)
+        self.assertFalse(seen)
+
+        # Unsafe requests always go to the primary
+        assigned = self.client_for(self.technician).post(f'/api/repairs/requests/{repair_id}/assign/')
+        self.assertEqual(assigned.status_code, 200)
+        self.assertEqual(RepairRequest.objects.get(pk=repair_id).technician_id, self.technician.pk)
+        self.replicas.snapshot()
+
+        time.sleep(routing.get_setting('PIN_SECONDS'))
+        self.replicas.apply_due()
+        queries, seen = self.replica_queries(lambda: self.lists(self.student, repair_id))
+        self.assertGreater(queries, 0)
+        self.assertTrue(seen)
+        self.assertTrue(self.lists(self.admin, repair_id))
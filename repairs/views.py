@@ -1,20 +1,37 @@
 
+from decimal import Decimal, InvalidOperation
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import RepairRequest, RepairMedia, RepairComment
 from .serializers import RepairRequestSerializer, RepairMediaSerializer, RepairCommentSerializer
+from .signals import repair_status_changed
+from repairportal.compiled import CompiledListMixin
+from repairportal.fieldsets import FieldsetViewMixin
+from repairportal.sqlite import writer
+from repairportal.sqlite.writer import QueuedWritesMixin
+from repairportal.pagination import get_setting as pagination_setting
+from repairportal.search import FullTextSearchFilter
+from users.caching import bump_user
+from users.models import Profile
 from users.permissions import IsAdminUser, IsTechnician, IsStudent
 
 
-class RepairRequestViewSet(viewsets.ModelViewSet):
+class RepairRequestViewSet(QueuedWritesMixin, FieldsetViewMixin, CompiledListMixin, viewsets.ModelViewSet):
     serializer_class = RepairRequestSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'device_type']
     search_fields = ['title', 'description', 'device_model']
     ordering_fields = ['created_at', 'updated_at']
+    # Never read from a replica (see repairportal.routing)
+    primary_actions = ('assign', 'update_status')
     
     def get_queryset(self):
         user = self.request.user
@@ -66,6 +83,13 @@ class RepairRequestViewSet(viewsets.ModelViewSet):
         repair_request.technician = request.user
         repair_request.status = 'assigned'
         repair_request.save()
+        repair_status_changed.send(
+            sender=RepairRequest,
+            repair_request_id=repair_request.pk,
+            technician_id=request.user.pk,
+            old_status='pending',
+            new_status='assigned',
+        )
         
         return Response(
             {"detail": f"Repair request '{repair_request.title}' assigned to you successfully."},
@@ -92,6 +116,7 @@ class RepairRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        old_status = repair_request.status
         repair_request.status = new_status
         
         # If completed, require final cost
@@ -102,15 +127,30 @@ class RepairRequestViewSet(viewsets.ModelViewSet):
                     {"detail": "Final cost is required when marking as completed."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            try:
+                final_cost = Decimal(str(final_cost))
+            except InvalidOperation:
+                return Response(
+                    {"detail": "Final cost must be a number."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             repair_request.final_cost = final_cost
-            
-            # Update technician's total earnings
-            if repair_request.technician and hasattr(repair_request.technician, 'profile'):
-                profile = repair_request.technician.profile
-                profile.total_earnings += float(final_cost)
-                profile.save()
         
-        repair_request.save()
+        with transaction.atomic():
+            repair_request.save()
+            # Credit the technician's earnings in the database, not on a loaded profile
+            if new_status == 'completed':
+                Profile.objects.filter(user_id=repair_request.technician_id).update(
+                    total_earnings=F('total_earnings') + repair_request.final_cost
+                )
+                bump_user(repair_request.technician_id)
+        repair_status_changed.send(
+            sender=RepairRequest,
+            repair_request_id=repair_request.pk,
+            technician_id=repair_request.technician_id,
+            old_status=old_status,
+            new_status=new_status,
+        )
         
         return Response(
             {"detail": f"Repair request status updated to: {new_status}"},
@@ -118,15 +158,70 @@ class RepairRequestViewSet(viewsets.ModelViewSet):
         )
 
 
-class RepairMediaViewSet(viewsets.ModelViewSet):
+class RepairThreadFeedMixin:
+    """
+    Incremental per-repair feed for the list endpoint.
+
+    ``?repair_request=<id>`` restricts the list to one repair, ``after_id``
+    only returns newer rows (at most ``MAX_PAGE_SIZE``; ask again from the
+    last id for more), and the response carries an ETag derived from
+    the repair's ``version_field`` so an unchanged thread is answered with
+    ``304 Not Modified`` without reading its rows.
+    """
+    version_field = None
+    
+    def list(self, request, *args, **kwargs):
+        if 'repair_request' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        
+        repair_request_id = self._get_int_param('repair_request')
+        after_id = self._get_int_param('after_id', default=0)
+        
+        # Only admins, the student who created the request or the assigned technician can read the thread
+        user = request.user
+        visible = Q() if user.is_staff or user.role == 'admin' else Q(student=user) | Q(technician=user)
+        version = RepairRequest.objects.filter(
+            visible,
+            pk=repair_request_id
+        ).values_list(self.version_field, flat=True).first()
+        if version is None:
+            raise Http404
+        
+        etag = quote_etag(f'{self.version_field}-{repair_request_id}-{version}-{after_id}')
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            repair_request_id=repair_request_id,
+            pk__gt=after_id
+        ).order_by('pk')[:pagination_setting('MAX_PAGE_SIZE')]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, headers={'ETag': etag})
+    
+    def _get_int_param(self, name, default=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "A valid integer is required."})
+
+
+class RepairMediaViewSet(RepairThreadFeedMixin, viewsets.ModelViewSet):
     serializer_class = RepairMediaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_field = 'media_version'
     
     def get_queryset(self):
+        user = self.request.user
+        # Admin can see all media
+        if user.is_staff or user.role == 'admin':
+            return RepairMedia.objects.all()
         return RepairMedia.objects.filter(
-            repair_request__student=self.request.user
+            repair_request__student=user
         ) | RepairMedia.objects.filter(
-            repair_request__technician=self.request.user
+            repair_request__technician=user
         )
     
     def perform_create(self, serializer):
@@ -144,15 +239,21 @@ class RepairMediaViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class RepairCommentViewSet(viewsets.ModelViewSet):
+class RepairCommentViewSet(QueuedWritesMixin, RepairThreadFeedMixin, FieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = RepairCommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('pk',)
+    version_field = 'comment_version'
     
     def get_queryset(self):
+        user = self.request.user
+        # Admin can see all comments
+        if user.is_staff or user.role == 'admin':
+            return RepairComment.objects.all()
         return RepairComment.objects.filter(
-            repair_request__student=self.request.user
+            repair_request__student=user
         ) | RepairComment.objects.filter(
-            repair_request__technician=self.request.user
+            repair_request__technician=user
         )
     
     def perform_create(self, serializer):
@@ -167,4 +268,4 @@ class RepairCommentViewSet(viewsets.ModelViewSet):
                 "You don't have permission to comment on this repair request."
             )
         
-        serializer.save(user=self.request.user)
+        writer.run(serializer.save, user=self.request.user)
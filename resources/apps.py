@@ -5,3 +5,18 @@ from django.apps import AppConfig
 class ResourcesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resources'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from repairportal import caching, compiled, search
+        from . import signals  # noqa: F401
+        from .models import Resource, ResourceCategory, ResourceContentChunk
+        from .serializers import ResourceSerializer
+
+        caching.track(Resource)
+        caching.track(ResourceCategory)
+        # Resources are served with their uploader's name
+        caching.track(get_user_model(), fields=['full_name'])
+        search.register(Resource, ['title', 'description'])
+        search.register(ResourceContentChunk, ['text'])
+        compiled.register(ResourceSerializer)
@@ -0,0 +1,211 @@
+"""
+Searchable text of resource files.
+
+A background pool extracts the text of ``pdf``, ``article`` and ``guide``
+files and stores it as ``ResourceContentChunk`` rows of at most
+``CHUNK_CHARS`` characters, which are indexed through ``repairportal.search``
+like any other registered model. PDFs are split by page (with ``pdftotext``
+from poppler, when installed) so results can point at the page that
+matched; HTML is reduced to its text and other files are read as UTF-8.
+
+``content_source`` records the file the chunks were made from, so only new
+or replaced files are extracted again. ``ContentSearchFilter`` ranks
+resources by their best match in the title, description or contents, in
+one query over both search indexes.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.db import transaction
+
+from repairportal import caching, search
+from .workers import ResourceWorkerPool
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'TIMEOUT': 120,
+    'CHUNK_CHARS': 2000,
+    'MAX_PAGES': 500,
+}
+
+INDEXED_TYPES = ('pdf', 'article', 'guide')
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+def get_setting(name):
+    return getattr(settings, 'RESOURCE_CONTENT', {}).get(name, DEFAULTS[name])
+
+
+def content_source(resource):
+    """Name of the file whose text should be indexed for ``resource``, or ``''``."""
+    if resource.file and resource.resource_type in INDEXED_TYPES:
+        return resource.file.name
+    return ''
+
+
+def needs_indexing(resource):
+    return resource.content_source != content_source(resource)
+
+
+class TextExtractor(HTMLParser):
+    """Visible text of an HTML document, one line per block element."""
+
+    skipped = {'script', 'style', 'head', 'template', 'noscript'}
+    blocks = {'p', 'div', 'br', 'li', 'tr', 'section', 'article', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped:
+            self._skipping += 1
+        elif tag in self.blocks:
+            self.parts.append('\n\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped:
+            self._skipping = max(0, self._skipping - 1)
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+    def text(self):
+        return ''.join(self.parts)
+
+
+def _extract_pdf(path):
+    if not shutil.which('pdftotext'):
+        return None
+    result = subprocess.run(
+        ['pdftotext', '-enc', 'UTF-8', '-l', str(get_setting('MAX_PAGES')), path, '-'],
+        check=True, capture_output=True, timeout=get_setting('TIMEOUT'),
+    )
+    # pdftotext ends every page with a form feed
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+    return [(number, text) for number, text in enumerate(pages, start=1) if text.strip()]
+
+
+def extract_pages(resource):
+    """
+    ``(page, text)`` pairs of the resource's file, with ``page`` ``None`` for
+    unpaged documents. ``None`` when the text cannot be extracted here, e.g.
+    because ``pdftotext`` is missing, so the file is tried again later.
+    """
+    name = resource.file.name
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'source' + os.path.splitext(name)[1])
+        with resource.file.storage.open(name, 'rb') as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        with open(path, 'rb') as source:
+            head = source.read(1024)
+
+        if head.startswith(b'%PDF-'):
+            try:
+                return _extract_pdf(path)
+            except (subprocess.SubprocessError, OSError):
+                return None
+        if resource.resource_type == 'pdf' or b'\x00' in head:
+            return []  # not a PDF, or not text
+
+        with open(path, 'rb') as source:
+            text = source.read().decode('utf-8', errors='replace')
+    if name.lower().endswith(HTML_EXTENSIONS) or text.lstrip()[:1] == '<':
+        extractor = TextExtractor()
+        extractor.feed(text)
+        extractor.close()
+        text = extractor.text()
+    return [(None, text)]
+
+
+def chunk_pages(pages):
+    """Split pages into ``(page, text)`` chunks of at most ``CHUNK_CHARS``, at paragraph or word breaks."""
+    limit = get_setting('CHUNK_CHARS')
+    for page, text in pages:
+        current = ''
+        for paragraph in PARAGRAPH_RE.split(text):
+            paragraph = ' '.join(paragraph.split())
+            while len(paragraph) > limit:
+                cut = paragraph.rfind(' ', 0, limit)
+                cut = cut if cut > 0 else limit
+                if current:
+                    yield page, current
+                    current = ''
+                yield page, paragraph[:cut]
+                paragraph = paragraph[cut:].lstrip()
+            if not paragraph:
+                continue
+            if current and len(current) + len(paragraph) + 1 > limit:
+                yield page, current
+                current = ''
+            current = f'{current}\n{paragraph}' if current else paragraph
+        if current:
+            yield page, current
+
+
+def index(resource):
+    """Replace the content chunks of ``resource``; ``False`` if its text cannot be extracted yet."""
+    from .models import Resource, ResourceContentChunk
+
+    source = content_source(resource)
+    pages = extract_pages(resource) if source else []
+    if pages is None:
+        return False
+
+    with transaction.atomic():
+        # Chunks are saved one by one so the search index follows through its signals
+        resource.content_chunks.all().delete()
+        for position, (page, text) in enumerate(chunk_pages(pages)):
+            ResourceContentChunk.objects.create(resource=resource, page=page, position=position, text=text)
+        # update() keeps this from re-triggering post_save and leaves updated_at alone
+        updated = Resource.objects.filter(
+            pk=resource.pk, file=resource.file.name, resource_type=resource.resource_type
+        ).update(content_source=source)
+        if not updated:
+            # The file changed meanwhile; the job queued for the new one takes over
+            transaction.set_rollback(True)
+            return False
+        caching.bump(Resource)
+    return True
+
+
+def index_if_needed(resource_id, force=False):
+    from .models import Resource
+
+    resource = Resource.objects.filter(pk=resource_id).first()
+    if resource is None or not (force or needs_indexing(resource)):
+        return False
+    return index(resource)
+
+
+content_pool = ResourceWorkerPool('resource-content', index_if_needed, lambda: get_setting('WORKERS'))
+
+
+class ContentSearchFilter(search.FullTextSearchFilter):
+    """
+    Searches resources by title and description and by the text of their
+    files. Each resource is ranked by its best match; ``search_snippet`` and
+    ``search_page`` come from that match (``search_page`` is null for matches
+    outside paged documents).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        from .models import ResourceContentChunk
+
+        query = request.query_params.get(self.search_param, '')
+        if not search.tokenize(query) or not search.is_registered(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+
+        backend = search.get_backend(queryset.db)
+        return backend.search_with_related(
+            queryset, query, search.get_fields(queryset.model),
+            ResourceContentChunk, search.get_fields(ResourceContentChunk), 'resource', extra=('page',),
+        )
@@ -0,0 +1,189 @@
+"""
+Buffered resource view counting.
+
+``increment_view`` used to rewrite the whole resource row per view, so popular
+resources saw a storm of writes to one row and lost increments between
+concurrent read-modify-write cycles. Views are now added to a per-process
+buffer and written by a background thread every ``FLUSH_SECONDS`` (or as soon
+as ``MAX_PENDING`` views are waiting) as ``UPDATE ... SET view_count = view_count + n`` statements, one
+per distinct ``n``, that touch no other column.
+
+Repeated views of a resource by the same user within ``DEDUP_SECONDS`` are
+counted once; the window is tracked with ``cache.add`` so it holds across
+workers when the cache is shared. Counts still in a buffer when a process
+dies are lost, which bounds the error to one flush interval per process.
+
+Each counted view is also written as a ``ResourceViewEvent`` in the same
+flush, as input of the co-view recommendations, and folded into the trending
+scores (see ``resources.trending``).
+
+Flushes do not replace the ``Resource`` stamp of the response cache (see
+``repairportal.caching``): that would drop every cached catalog response
+each ``FLUSH_SECONDS``. Cached responses show view counts up to the cache
+``TIMEOUT`` old, until a real change to the resources replaces the stamp.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'FLUSH_SECONDS': 10,
+    'MAX_PENDING': 1000,
+    'DEDUP_SECONDS': 30 * 60,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'RESOURCE_VIEW_COUNTS', {}).get(name, DEFAULTS[name])
+
+
+class ViewCountBuffer:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()  # resource id -> views not yet written
+        self._events = []  # (resource id, viewer, time) of those views
+        self._oldest_pending = None
+        self._flusher = None
+        self._wake = threading.Event()  # set when the buffer is full
+        self.recorded = 0
+        self.deduplicated = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+        self.last_flush_lag = None
+        self.last_flush_duration = None
+
+    def record(self, resource_id, viewer):
+        """Count a view of ``resource_id`` by ``viewer`` unless it is a repeat within the window."""
+        cache = caches[get_setting('CACHE_ALIAS')]
+        if not cache.add(f'resource_view:{resource_id}:{viewer}', 1, get_setting('DEDUP_SECONDS')):
+            with self._lock:
+                self.deduplicated += 1
+            return False
+        with self._lock:
+            self._pending[resource_id] += 1
+            self._events.append((resource_id, viewer, timezone.now()))
+            self.recorded += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            full = sum(self._pending.values()) >= get_setting('MAX_PENDING')
+        self._ensure_flusher()
+        if full:
+            # Flush in the background thread: a failing flush must not fail the view
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write buffered views to the database; returns the number of views written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                events, self._events = self._events, []
+                oldest, self._oldest_pending = self._oldest_pending, None
+            if not pending:
+                return 0
+
+            started = time.monotonic()
+            by_increment = defaultdict(list)
+            for resource_id, count in pending.items():
+                by_increment[count].append(resource_id)
+            try:
+                from django.contrib.auth import get_user_model
+                from .models import Resource, ResourceViewEvent
+                from .trending import record_views
+
+                with transaction.atomic():
+                    for count, resource_ids in by_increment.items():
+                        Resource.objects.filter(pk__in=resource_ids).update(view_count=F('view_count') + count)
+                    # Resources and viewers deleted since the view are skipped by the
+                    # update but would break the foreign keys of their events
+                    alive = set(Resource.objects.filter(pk__in=pending).values_list('pk', flat=True))
+                    viewers = set(get_user_model().objects.filter(
+                        pk__in={viewer for _, viewer, _ in events}
+                    ).values_list('pk', flat=True))
+                    events = [
+                        (resource_id, viewer, viewed_at)
+                        for resource_id, viewer, viewed_at in events if resource_id in alive and viewer in viewers
+                    ]
+                    ResourceViewEvent.objects.bulk_create([
+                        ResourceViewEvent(resource_id=resource_id, user_id=viewer, viewed_at=viewed_at)
+                        for resource_id, viewer, viewed_at in events
+                    ], batch_size=1000)
+                    record_views(events)
+            except Exception as error:
+                # Keep the views for the next attempt, but not events that broke a
+                # constraint: they would fail every flush after this one
+                with self._lock:
+                    self.failed_flushes += 1
+                    self._pending.update(pending)
+                    if not isinstance(error, IntegrityError):
+                        self._events[:0] = events
+                    if self._oldest_pending is None or oldest < self._oldest_pending:
+                        self._oldest_pending = oldest
+                raise
+
+            finished = time.monotonic()
+            written = sum(pending.values())
+            with self._lock:
+                self.flushed += written
+                self.flushes += 1
+                self.last_flush_at = time.time()
+                self.last_flush_lag = finished - oldest
+                self.last_flush_duration = finished - started
+            return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': sum(self._pending.values()),
+                'pending_resources': len(self._pending),
+                'oldest_pending_seconds': (
+                    time.monotonic() - self._oldest_pending if self._oldest_pending is not None else None
+                ),
+                'recorded': self.recorded,
+                'deduplicated': self.deduplicated,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes,
+                'last_flush_at': self.last_flush_at,
+                'last_flush_lag_seconds': self.last_flush_lag,
+                'last_flush_duration_seconds': self.last_flush_duration,
+            }
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='resource-view-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(get_setting('FLUSH_SECONDS'))
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The views stay buffered and are retried at the next interval
+                logger.exception("Flushing resource view counts failed")
+            finally:
+                close_old_connections()
+
+
+view_counts = ViewCountBuffer()
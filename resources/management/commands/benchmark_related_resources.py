@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from resources.recommendations import CoViewIndex
+
+
+class Command(BaseCommand):
+    help = 'Measure co-view neighbor computation on synthetic view events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=100_000)
+        parser.add_argument('--events', type=int, default=10_000_000)
+        parser.add_argument('--users', type=int, default=500_000)
+        parser.add_argument('--topics', type=int, default=2000, help='Clusters of resources users stick to.')
+        parser.add_argument('--batch', type=int, default=100_000, help='Events in the incremental update.')
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--block-size', type=int, default=None)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        started = time.perf_counter()
+        users, items = self.events(rng, options['events'], options)
+        event_ids = np.arange(1, options['events'] + 1)
+        batch = options['events'] - options['batch']
+        self.report('generate events', started, f"{options['events']} events")
+
+        started = time.perf_counter()
+        index = CoViewIndex.build(users[:batch], items[:batch], event_ids[:batch])
+        self.report('build incidence', started, f"{index.incidence.nnz} user/resource pairs")
+
+        started = time.perf_counter()
+        neighbors = rows = 0
+        for block, sources, _, _ in index.neighbors(k=options['k'], block_size=options['block_size']):
+            neighbors += sources.size
+            rows += block.size
+        self.report('all neighbor lists', started, f"{rows} resources, {neighbors} neighbors")
+
+        started = time.perf_counter()
+        columns = index.extend(users[batch:], items[batch:], event_ids[batch:])
+        self.report('extend', started, f"{options['batch']} events touch {columns.size} resources")
+
+        started = time.perf_counter()
+        for _ in index.neighbors(columns, k=options['k'], block_size=options['block_size']):
+            pass
+        self.report('touched neighbor lists', started, f"{columns.size} resources")
+
+    def events(self, rng, count, options):
+        """Users with Zipf-like activity who mostly view resources of their own topic."""
+        resources, topics = options['resources'], options['topics']
+        user_weights = 1.0 / np.arange(1, options['users'] + 1) ** 0.8
+        users = rng.choice(options['users'], size=count, p=user_weights / user_weights.sum())
+        per_topic = resources // topics
+        rank_weights = 1.0 / np.arange(1, per_topic + 1)
+        ranks = rng.choice(per_topic, size=count, p=rank_weights / rank_weights.sum())
+        user_topics = rng.integers(0, topics, size=options['users'])
+        topic = np.where(rng.random(count) < 0.8, user_topics[users], rng.integers(0, topics, size=count))
+        return users, topic * per_topic + ranks
+
+    def report(self, step, started, detail):
+        self.stdout.write(f"{step:<24} {time.perf_counter() - started:>8.2f}s  {detail}")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resources.recommendations import build_related_resources
+
+
+class Command(BaseCommand):
+    help = 'Update the "also viewed" neighbor lists of resources from new view events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from every view event.')
+        parser.add_argument('--block-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        events, recomputed, written = build_related_resources(
+            full=options['full'], block_size=options['block_size']
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {events} view event(s), recomputed {recomputed} resource(s) "
+            f"and wrote {written} neighbor(s) in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from resources.models import Resource
+from resources.thumbnails import generate_if_needed, get_setting
+
+
+class Command(BaseCommand):
+    help = 'Generate preview thumbnails for resources that have none or whose file changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate previews of every resource.')
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        resource_ids = list(Resource.objects.values_list('pk', flat=True))
+        workers = options['workers'] or get_setting('WORKERS')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda pk: generate_if_needed(pk, force=options['all']), resource_ids))
+        generated = sum(results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated previews for {generated} resources; {len(results) - generated} were up to date "
+            f"or could not be previewed."
+        ))
@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from resources.content import get_setting, index_if_needed
+from resources.models import Resource
+
+
+class Command(BaseCommand):
+    help = 'Extract the searchable text of resources that are new, changed or not extracted yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Extract the text of every resource again.')
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        resource_ids = list(Resource.objects.values_list('pk', flat=True))
+        workers = options['workers'] or get_setting('WORKERS')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda pk: index_if_needed(pk, force=options['all']), resource_ids))
+        indexed = sum(results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed the contents of {indexed} resources; {len(results) - indexed} were up to date "
+            f"or could not be extracted."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resource",
+            name="thumbnail_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
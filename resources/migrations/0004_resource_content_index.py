@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from repairportal.search import create_index_migration
+
+create_resource_index, drop_resource_index = create_index_migration(
+    "resources", "Resource", ["title", "description"]
+)
+create_chunk_index, drop_chunk_index = create_index_migration(
+    "resources", "ResourceContentChunk", ["text"]
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0003_resource_thumbnail_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resource",
+            name="content_source",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.CreateModel(
+            name="ResourceContentChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("page", models.PositiveIntegerField(blank=True, null=True)),
+                ("position", models.PositiveIntegerField()),
+                ("text", models.TextField()),
+                (
+                    "resource",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="content_chunks",
+                        to="resources.resource",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["resource", "position"],
+                "unique_together": {("resource", "position")},
+            },
+        ),
+        migrations.RunPython(create_resource_index, drop_resource_index),
+        migrations.RunPython(create_chunk_index, drop_chunk_index),
+    ]
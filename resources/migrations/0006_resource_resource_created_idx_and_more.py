@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0005_resource_coview_recommendations"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="resource",
+            index=models.Index(
+                fields=["created_at", "id"], name="resource_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resource",
+            index=models.Index(
+                fields=["view_count", "id"], name="resource_view_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resource",
+            index=models.Index(fields=["title", "id"], name="resource_title_idx"),
+        ),
+    ]
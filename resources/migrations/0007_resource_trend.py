@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0006_resource_resource_created_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResourceTrend",
+            fields=[
+                (
+                    "resource",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trend",
+                        serialize=False,
+                        to="resources.resource",
+                    ),
+                ),
+                ("log_score", models.FloatField(db_index=True, null=True)),
+            ],
+        ),
+    ]
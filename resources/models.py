@@ -38,9 +38,73 @@ class Resource(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     view_count = models.PositiveIntegerField(default=0)
     is_featured = models.BooleanField(default=False)
+    # Generated preview sizes, see resources.thumbnails
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # File whose text is in content_chunks, see resources.content
+    content_source = models.CharField(max_length=255, blank=True, editable=False)
     
     def __str__(self):
         return self.title
     
     class Meta:
         ordering = ['-created_at']
+        # Keys of the orderings offered by the list endpoint
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='resource_created_idx'),
+            models.Index(fields=['view_count', 'id'], name='resource_view_count_idx'),
+            models.Index(fields=['title', 'id'], name='resource_title_idx'),
+        ]
+
+
+class ResourceContentChunk(models.Model):
+    """A piece of text extracted from a resource's file, indexed for search"""
+    
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='content_chunks')
+    # 1-based page for paged documents, null otherwise
+    page = models.PositiveIntegerField(null=True, blank=True)
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+    
+    def __str__(self):
+        return f"{self.resource.title} #{self.position}"
+    
+    class Meta:
+        ordering = ['resource', 'position']
+        unique_together = ('resource', 'position')
+
+
+class ResourceViewEvent(models.Model):
+    """A counted view of a resource, see resources.recommendations"""
+    
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='view_events')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resource_view_events')
+    viewed_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.user} viewed {self.resource}"
+
+
+class ResourceNeighbor(models.Model):
+    """A resource often viewed by the viewers of another, precomputed from view events"""
+    
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    
+    def __str__(self):
+        return f"{self.resource} -> {self.neighbor}"
+    
+    class Meta:
+        ordering = ['resource', '-score']
+        indexes = [models.Index(fields=['resource', '-score'], name='resource_neighbor_score_idx')]
+
+
+class ResourceTrend(models.Model):
+    """Decayed view score of a resource, see resources.trending"""
+    
+    resource = models.OneToOneField(Resource, on_delete=models.CASCADE, primary_key=True, related_name='trend')
+    # Null until the first views of the resource are folded in
+    log_score = models.FloatField(null=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.resource} trend"
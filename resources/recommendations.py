@@ -0,0 +1,291 @@
+"""
+"Students also viewed" recommendations for resources.
+
+Counted views are stored as ``ResourceViewEvent`` rows (written in batches by
+the view count buffer). A batch job (``build_related_resources``) turns them
+into a sparse users x resources incidence matrix ``X`` and saves it under
+``RECOMMENDATION_INDEX_DIR``. The co-view counts of a block of resources are
+one sparse product, ``X[:, block].T @ X``; they are normalised to cosine
+similarity (co-views divided by the geometric mean of both resources' viewer
+counts) and cut down to each resource's top ``NEIGHBORS`` with a single sort
+per block, then stored as ``ResourceNeighbor`` rows. The full co-occurrence
+matrix is never held in memory.
+
+Later runs only read events newer than the last one seen, add them to ``X``
+and recompute the resources viewed by the users those events came from, i.e.
+every row whose co-view counts changed. Scores of other resources against
+them keep the old viewer counts until the next ``--full`` run.
+"""
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from scipy import sparse
+
+from repairportal import caching
+
+DEFAULTS = {
+    'NEIGHBORS': 20,
+    # Resources per user that count, the most recently viewed ones
+    'MAX_USER_RESOURCES': 200,
+    # Pairs co-viewed by fewer users are ignored as noise
+    'MIN_COVIEWS': 2,
+    # Co-views are computed for at most BLOCK_SIZE resources at a time, and
+    # for fewer when they would take more than BLOCK_PRODUCTS multiplications
+    # (an upper bound of the block's non-zeros, which decides peak memory).
+    'BLOCK_SIZE': 2000,
+    'BLOCK_PRODUCTS': 20_000_000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'RESOURCE_RECOMMENDATIONS', {}).get(name, DEFAULTS[name])
+
+
+def index_path():
+    directory = getattr(settings, 'RECOMMENDATION_INDEX_DIR', os.path.join(settings.BASE_DIR, 'indexes'))
+    return os.path.join(directory, 'resource_coviews.npz')
+
+
+def _top_per_row(rows, values, k):
+    """
+    Positions of the ``k`` largest ``values`` of every row, grouped by row
+    and largest first, with a single sort instead of one per row.
+    """
+    order = np.lexsort((-values, rows))
+    sorted_rows = rows[order]
+    ranks = np.arange(order.size) - np.searchsorted(sorted_rows, sorted_rows)
+    return order[ranks < k]
+
+
+class CoViewIndex:
+    """
+    Which users viewed which resources, as a sparse matrix holding the id of
+    the latest view event of each pair. Only a user's ``MAX_USER_RESOURCES``
+    most recently viewed resources are kept: co-view counts grow with the
+    square of the resources per user, so a few very active users would
+    otherwise dominate both the cost and the results.
+    """
+
+    def __init__(self, user_ids, item_ids, incidence, last_event_id=0, built_at=None):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.incidence = incidence.tocsr()
+        self.last_event_id = int(last_event_id)
+        self.built_at = built_at if built_at is not None else time.time()
+
+    @classmethod
+    def build(cls, users, items, event_ids):
+        """Build from parallel arrays of the user ids, resource ids and ids of view events."""
+        user_ids, rows = np.unique(np.asarray(users, dtype=np.int64), return_inverse=True)
+        item_ids, columns = np.unique(np.asarray(items, dtype=np.int64), return_inverse=True)
+        event_ids = np.asarray(event_ids, dtype=np.int64)
+        index = cls(user_ids, item_ids, sparse.csr_matrix((user_ids.size, item_ids.size), dtype=np.int64))
+        index.incidence = index._latest(rows, columns, event_ids)
+        index.last_event_id = int(event_ids.max()) if event_ids.size else 0
+        return index
+
+    def extend(self, users, items, event_ids):
+        """Add view events; returns the columns of every resource whose co-view counts changed."""
+        event_ids = np.asarray(event_ids, dtype=np.int64)
+        self.built_at = time.time()
+        if not event_ids.size:
+            return np.array([], dtype=np.int64)
+        self.last_event_id = max(self.last_event_id, int(event_ids.max()))
+        self.user_ids, rows = self._positions(self.user_ids, users)
+        self.item_ids, columns = self._positions(self.item_ids, items)
+        previous = self.incidence.copy()
+        previous.resize((self.user_ids.size, self.item_ids.size))
+
+        touched = np.unique(rows)
+        old = previous[touched].tocoo()
+        previous = previous.tocoo()
+        # Only the rows of touched users are merged with the new events
+        mask = np.isin(previous.row, touched)
+        untouched = sparse.csr_matrix(
+            (previous.data[~mask], (previous.row[~mask], previous.col[~mask])), shape=previous.shape
+        )
+        self.incidence = untouched + self._latest(
+            np.concatenate([previous.row[mask], rows]),
+            np.concatenate([previous.col[mask], columns]),
+            np.concatenate([previous.data[mask], event_ids]),
+        )
+        # Resources a touched user viewed before or after: their counts with
+        # the user's new resources changed, and so did those of resources that
+        # fell out of the user's history.
+        return np.union1d(old.col, self.incidence[touched].indices).astype(np.int64)
+
+    def _latest(self, rows, columns, event_ids):
+        """Incidence matrix of the latest event per pair, capped per user."""
+        shape = (self.user_ids.size, self.item_ids.size)
+        pairs = rows * shape[1] + columns
+        # Latest event of each pair: sort by pair, then keep each pair's last entry
+        order = np.lexsort((event_ids, pairs))
+        last = np.r_[pairs[order][1:] != pairs[order][:-1], True]
+        rows, columns, event_ids = rows[order][last], columns[order][last], event_ids[order][last]
+        keep = _top_per_row(rows, event_ids, get_setting('MAX_USER_RESOURCES'))
+        return sparse.csr_matrix((event_ids[keep], (rows[keep], columns[keep])), shape=shape)
+
+    def binary(self):
+        incidence = self.incidence
+        return sparse.csr_matrix(
+            (np.ones(incidence.nnz, dtype=np.float32), incidence.indices, incidence.indptr), shape=incidence.shape
+        )
+
+    @staticmethod
+    def _positions(known, ids):
+        """Positions of ``ids`` in ``known``, appending ids not seen before."""
+        lookup = {int(pk): position for position, pk in enumerate(known)}
+        ids = np.asarray(ids, dtype=np.int64)
+        new = [int(pk) for pk in np.unique(ids) if int(pk) not in lookup]
+        for pk in new:
+            lookup[pk] = len(lookup)
+        known = np.concatenate([known, np.array(new, dtype=np.int64)])
+        return known, np.fromiter((lookup[int(pk)] for pk in ids), dtype=np.int64, count=ids.size)
+
+    def neighbors(self, columns=None, k=None, min_coviews=None, block_size=None):
+        """
+        Yield ``(block, sources, targets, scores)`` per block of ``columns``
+        (default: all): the top ``k`` neighbors of every column in ``block``,
+        best first, as parallel arrays of column positions and scores.
+        """
+        k = k or get_setting('NEIGHBORS')
+        min_coviews = min_coviews or get_setting('MIN_COVIEWS')
+        block_size = block_size or get_setting('BLOCK_SIZE')
+        columns = np.arange(self.item_ids.size) if columns is None else np.asarray(columns, dtype=np.int64)
+        incidence = self.binary()
+        by_item = incidence.tocsc()
+        viewers = np.diff(by_item.indptr).astype(np.float64)
+
+        # Each viewer of a resource adds one product per resource they viewed
+        products = by_item.T @ np.diff(incidence.indptr).astype(np.float64)
+        for block in self._blocks(columns, products[columns], block_size):
+            coviews = (by_item[:, block].T.tocsr() @ incidence).tocsr()
+            rows = np.repeat(np.arange(block.size), np.diff(coviews.indptr))
+            targets, counts = coviews.indices, coviews.data
+            keep = (targets != block[rows]) & (counts >= min_coviews)
+            rows, targets, counts = rows[keep], targets[keep], counts[keep]
+            scores = counts / np.sqrt(viewers[block[rows]] * viewers[targets])
+            keep = _top_per_row(rows, scores, k)
+            yield block, block[rows[keep]], targets[keep], scores[keep]
+
+    @staticmethod
+    def _blocks(columns, products, block_size):
+        budget = get_setting('BLOCK_PRODUCTS')
+        start = 0
+        while start < columns.size:
+            # Largest block within the budget, but at least one resource
+            within = np.searchsorted(np.cumsum(products[start:start + block_size]), budget, side='right')
+            end = start + max(1, int(within))
+            yield columns[start:end]
+            start = end
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            data=self.incidence.data,
+            indices=self.incidence.indices,
+            indptr=self.incidence.indptr,
+            shape=np.array(self.incidence.shape),
+            last_event_id=np.array(self.last_event_id),
+            built_at=np.array(self.built_at),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            incidence = sparse.csr_matrix(
+                (data['data'], data['indices'], data['indptr']), shape=tuple(data['shape'])
+            )
+            return cls(
+                data['user_ids'], data['item_ids'], incidence,
+                last_event_id=int(data['last_event_id']), built_at=float(data['built_at']),
+            )
+
+
+def _events(after=0, chunk_size=50000):
+    """``(users, items, event ids)`` of the view events after ``after``."""
+    from .models import ResourceViewEvent
+
+    # Bounded by the last id, so the array sized by count() cannot overflow
+    last = ResourceViewEvent.objects.filter(pk__gt=after).aggregate(last=Max('pk'))['last'] or after
+    rows = ResourceViewEvent.objects.filter(pk__gt=after, pk__lte=last)
+    events = np.empty((rows.count(), 3), dtype=np.int64)
+    filled = 0
+    while filled < len(events):
+        # One primary key range at a time; only a chunk of tuples is held at once
+        chunk = list(rows.filter(pk__gt=after).order_by('pk').values_list('user_id', 'resource_id', 'pk')[:chunk_size])
+        if not chunk:
+            break
+        events[filled:filled + len(chunk)] = chunk
+        filled += len(chunk)
+        after = chunk[-1][2]
+    events = events[:filled]
+    return events[:, 0], events[:, 1], events[:, 2]
+
+
+def store_neighbors(index, columns=None, block_size=None):
+    """
+    Replace the ``ResourceNeighbor`` rows of ``columns`` (default: all);
+    returns the rows written. Readers see either the old or the new list of
+    a resource: a full rebuild is swapped in by a single transaction, after
+    all of its rows were computed.
+    """
+    from .models import Resource, ResourceNeighbor
+
+    existing = np.fromiter(Resource.objects.values_list('pk', flat=True), dtype=np.int64)
+
+    def blocks():
+        for block, sources, targets, scores in index.neighbors(columns, block_size=block_size):
+            source_ids, target_ids = index.item_ids[sources], index.item_ids[targets]
+            # Resources deleted since they were viewed
+            alive = np.isin(source_ids, existing) & np.isin(target_ids, existing)
+            yield block, [
+                ResourceNeighbor(resource_id=int(source), neighbor_id=int(target), score=float(score))
+                for source, target, score in zip(source_ids[alive], target_ids[alive], scores[alive])
+            ]
+
+    written = 0
+    if columns is None:
+        rows = [row for _, block_rows in blocks() for row in block_rows]
+        with transaction.atomic():
+            ResourceNeighbor.objects.all().delete()
+            ResourceNeighbor.objects.bulk_create(rows, batch_size=5000)
+        written = len(rows)
+    else:
+        for block, rows in blocks():
+            with transaction.atomic():
+                ResourceNeighbor.objects.filter(resource_id__in=index.item_ids[block].tolist()).delete()
+                ResourceNeighbor.objects.bulk_create(rows, batch_size=5000)
+            written += len(rows)
+    caching.bump(ResourceNeighbor)
+    return written
+
+
+def build_related_resources(full=False, block_size=None):
+    """
+    Bring the neighbor lists up to date with the view events; returns
+    ``(events read, resources recomputed, neighbor rows written)``.
+    """
+    path = index_path()
+    if full or not os.path.exists(path):
+        users, items, event_ids = _events()
+        index = CoViewIndex.build(users, items, event_ids)
+        columns = None
+        recomputed = index.item_ids.size
+    else:
+        index = CoViewIndex.load(path)
+        users, items, event_ids = _events(after=index.last_event_id)
+        columns = index.extend(users, items, event_ids)
+        recomputed = columns.size
+    written = store_neighbors(index, columns, block_size=block_size) if recomputed else 0
+    index.save(path)
+    return users.size, recomputed, written
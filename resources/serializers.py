@@ -1,27 +1,52 @@
 
 from rest_framework import serializers
+from django.core.files.storage import default_storage
+from repairportal.fieldsets import FieldsetSerializerMixin
+from repairportal.search import SearchResultSerializerMixin
+from uploads.serializers import UploadedFileMixin
 from .models import Resource, ResourceCategory
 
 
-class ResourceCategorySerializer(serializers.ModelSerializer):
+class ResourceCategorySerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ResourceCategory
         fields = ['id', 'name', 'description']
 
 
-class ResourceSerializer(serializers.ModelSerializer):
+class ResourceSerializer(FieldsetSerializerMixin, UploadedFileMixin, SearchResultSerializerMixin,
+                         serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source='category.name')
     uploaded_by_name = serializers.ReadOnlyField(source='uploaded_by.full_name')
+    thumbnail_variants = serializers.SerializerMethodField()
+    upload_target = 'resource'
+    select_related_fields = {'category_name': 'category', 'uploaded_by_name': 'uploaded_by'}
+    search_annotations = ('search_rank', 'search_snippet', 'search_page')
+    row_sources = {'thumbnail_variants': ('thumbnail_variants',)}
     
     class Meta:
         model = Resource
         fields = [
-            'id', 'title', 'description', 'file', 'thumbnail', 'resource_type',
+            'id', 'title', 'description', 'file', 'thumbnail', 'thumbnail_variants', 'resource_type',
             'category', 'category_name', 'uploaded_by', 'uploaded_by_name',
             'created_at', 'updated_at', 'view_count', 'is_featured'
         ]
         read_only_fields = ['uploaded_by', 'created_at', 'updated_at', 'view_count']
     
+    def get_thumbnail_variants(self, obj):
+        request = self.context.get('request')
+        variants = {}
+        for name, variant in (obj.thumbnail_variants or {}).items():
+            if name == 'source':
+                continue
+            url = default_storage.url(variant['name'])
+            variants[name] = {
+                'url': request.build_absolute_uri(url) if request else url,
+                'width': variant['width'],
+                'height': variant['height'],
+                'size': variant['size'],
+            }
+        return variants
+    
     def create(self, validated_data):
         validated_data['uploaded_by'] = self.context['request'].user
         return super().create(validated_data)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Resource
+from .content import content_pool, needs_indexing
+from .thumbnails import needs_thumbnails, thumbnail_pool
+
+
+@receiver(post_save, sender=Resource)
+def queue_thumbnails(sender, instance, raw=False, **kwargs):
+    """Render previews in the background when the file or manual thumbnail changed"""
+    if not raw and needs_thumbnails(instance):
+        thumbnail_pool.submit(instance.pk)
+
+
+@receiver(post_save, sender=Resource)
+def queue_content_indexing(sender, instance, raw=False, **kwargs):
+    """Extract the text of new or replaced files in the background"""
+    if not raw and needs_indexing(instance):
+        content_pool.submit(instance.pk)
@@ -0,0 +1,171 @@
+"""
+Preview images for resources.
+
+A background pool renders a source image for each resource and scales it to
+the sizes in ``VARIANTS``:
+
+* a manually uploaded ``thumbnail`` is used as is (only scaled),
+* ``pdf`` files: the first page, rendered with ``pdftoppm`` (poppler),
+* ``video`` files: a frame one second in (or the first frame), via ``ffmpeg``,
+* any other file that Pillow can open is scaled directly.
+
+External tools are optional; without them those resources keep no preview
+and are picked up again by ``generate_thumbnails`` once the tool is
+installed. The variants are stored in ``thumbnail_variants`` together with
+the name of the file they were made from, so a resource is only re-rendered
+when its file or manual thumbnail changes. Generated previews are also
+written to ``thumbnail`` so clients that only know that field get a small
+image instead of the full file.
+"""
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from repairportal import caching
+from .workers import ResourceWorkerPool
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'TIMEOUT': 60,
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+# Longest edge of each variant in pixels. ``medium`` is what ``thumbnail``
+# points at for generated previews.
+VARIANTS = {
+    'small': 160,
+    'medium': 480,
+    'large': 960,
+}
+DEFAULT_VARIANT = 'medium'
+GENERATED_PREFIX = 'resource_thumbnails/generated/'
+
+
+def get_setting(name):
+    return getattr(settings, 'RESOURCE_THUMBNAILS', {}).get(name, DEFAULTS[name])
+
+
+def thumbnail_source(resource):
+    """Name of the stored file previews of ``resource`` should be made from."""
+    if resource.thumbnail and not resource.thumbnail.name.startswith(GENERATED_PREFIX):
+        return resource.thumbnail.name
+    return resource.file.name
+
+
+def needs_thumbnails(resource):
+    return bool(resource.file) and (resource.thumbnail_variants or {}).get('source') != thumbnail_source(resource)
+
+
+def _run(command):
+    subprocess.run(command, check=True, capture_output=True, timeout=get_setting('TIMEOUT'))
+
+
+def _render_pdf(path, workdir):
+    if not shutil.which('pdftoppm'):
+        return None
+    prefix = os.path.join(workdir, 'page')
+    size = str(max(VARIANTS.values()))
+    _run(['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile', '-scale-to', size, path, prefix])
+    return Image.open(f'{prefix}.png')
+
+
+def _render_video(path, workdir):
+    if not shutil.which('ffmpeg'):
+        return None
+    output = os.path.join(workdir, 'frame.png')
+    for offset in ('1', '0'):
+        try:
+            _run(['ffmpeg', '-v', 'error', '-y', '-ss', offset, '-i', path, '-frames:v', '1', output])
+        except subprocess.SubprocessError:
+            continue
+        if os.path.exists(output) and os.path.getsize(output):
+            return Image.open(output)
+    return None
+
+
+def render_source(resource, name):
+    """Open ``name`` from storage and turn it into a PIL image, or ``None`` if it cannot be previewed."""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'source' + os.path.splitext(name)[1])
+        with default_storage.open(name, 'rb') as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+        image = None
+        is_manual_thumbnail = name != resource.file.name
+        if not is_manual_thumbnail and resource.resource_type in ('pdf', 'video'):
+            render = _render_pdf if resource.resource_type == 'pdf' else _render_video
+            try:
+                image = render(path, workdir)
+            except (subprocess.SubprocessError, OSError):
+                return None
+        else:
+            try:
+                image = Image.open(path)
+            except (OSError, Image.DecompressionBombError):
+                return None
+        if image is None:
+            return None
+        image.load()
+        return image
+
+
+def _encode(image, longest_edge):
+    variant = image.copy()
+    variant.thumbnail((longest_edge, longest_edge), Image.LANCZOS)
+    if variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA' if 'A' in variant.getbands() else 'RGB')
+    buffer = io.BytesIO()
+    variant.save(buffer, format=get_setting('FORMAT'), quality=get_setting('QUALITY'))
+    return variant.size, buffer.getvalue()
+
+
+def generate(resource):
+    """Render and store the variants of ``resource``; returns ``False`` if it cannot be previewed."""
+    from .models import Resource
+
+    source = thumbnail_source(resource)
+    image = render_source(resource, source)
+    if image is None:
+        return False
+
+    extension = get_setting('FORMAT').lower()
+    variants = {'source': source}
+    for variant_name, longest_edge in VARIANTS.items():
+        (width, height), content = _encode(image, longest_edge)
+        name = default_storage.save(
+            f'{GENERATED_PREFIX}{resource.pk}/{variant_name}.{extension}', ContentFile(content)
+        )
+        variants[variant_name] = {'name': name, 'width': width, 'height': height, 'size': len(content)}
+
+    old_names = [
+        variant['name'] for key, variant in (resource.thumbnail_variants or {}).items() if key != 'source'
+    ]
+    changes = {'thumbnail_variants': variants}
+    if source == resource.file.name:
+        changes['thumbnail'] = variants[DEFAULT_VARIANT]['name']
+    # update() keeps this from re-triggering post_save and leaves updated_at alone
+    Resource.objects.filter(pk=resource.pk).update(**changes)
+    caching.bump(Resource)
+    for name in old_names:
+        default_storage.delete(name)
+    return True
+
+
+def generate_if_needed(resource_id, force=False):
+    from .models import Resource
+
+    resource = Resource.objects.filter(pk=resource_id).first()
+    if resource is None or not (force or needs_thumbnails(resource)):
+        return False
+    return generate(resource)
+
+
+thumbnail_pool = ResourceWorkerPool('resource-thumbnails', generate_if_needed, lambda: get_setting('WORKERS'))
@@ -0,0 +1,102 @@
+"""
+Trending resources.
+
+Every counted view adds to an exponentially decayed score of its resource,
+with a half-life of ``HALF_LIFE_HOURS``.
+
+The score is kept in log space, relative to a fixed origin: a view at time
+``t`` adds ``exp(rate * t)``, so the log score is
+``logaddexp(log_score, rate * t)``. Decaying every score by the same factor
+does not change their order, so scores never need to be recomputed as time
+passes, and the current value is ``exp(log_score - rate * now)``.
+
+Scores are stored in ``ResourceTrend`` so every worker ranks the same views
+and the ranking survives restarts. The view count flush (see
+``resources.counters``) folds in the views it writes with ``record_views``, as
+one ``UPDATE`` per resource computing the ``logaddexp`` in the database, so
+flushes of concurrent workers do not overwrite each other. Rankings therefore
+lag the views by up to one flush interval.
+
+``recent_views`` is the number of view events of the last
+``WINDOW_MINUTES``, counted for the ranked resources only.
+"""
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Exp, Greatest, Least, Ln
+
+DEFAULTS = {
+    'WINDOW_MINUTES': 60,
+    'HALF_LIFE_HOURS': 6,
+    'TOP_K': 50,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'RESOURCE_TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def decay_rate():
+    return math.log(2) / (get_setting('HALF_LIFE_HOURS') * 3600)
+
+
+def logaddexp(a, b):
+    """``log(exp(a) + exp(b))`` without overflowing."""
+    if a == -math.inf:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def db_logaddexp(expression, value):
+    """``logaddexp`` of a float column and ``value``, evaluated by the database."""
+    value = Value(value, output_field=FloatField())
+    high, low = Greatest(expression, value), Least(expression, value)
+    return high + Ln(Value(1.0) + Exp(low - high))
+
+
+def record_views(events):
+    """Fold ``(resource id, viewer, viewed_at)`` events into the stored scores."""
+    from .models import ResourceTrend
+
+    rate = decay_rate()
+    added = defaultdict(lambda: -math.inf)
+    for resource_id, _, viewed_at in events:
+        added[resource_id] = logaddexp(added[resource_id], rate * viewed_at.timestamp())
+    if not added:
+        return
+    ResourceTrend.objects.bulk_create(
+        [ResourceTrend(resource_id=resource_id) for resource_id in added], ignore_conflicts=True
+    )
+    for resource_id, log_score in added.items():
+        ResourceTrend.objects.filter(pk=resource_id).update(log_score=Case(
+            When(log_score__isnull=True, then=Value(log_score)),
+            default=db_logaddexp(F('log_score'), log_score),
+        ))
+
+
+def top(category_id=None, limit=None, at=None):
+    """``(resource id, score, recent views)`` of the top resources, best first."""
+    from .models import ResourceTrend, ResourceViewEvent
+
+    at = time.time() if at is None else at
+    trends = ResourceTrend.objects.filter(log_score__isnull=False).order_by('-log_score')
+    if category_id is not None:
+        trends = trends.filter(resource__category_id=category_id)
+    ranked = list(trends.values_list('resource_id', 'log_score')[:limit])
+
+    since = datetime.fromtimestamp(at, dt_timezone.utc) - timedelta(minutes=get_setting('WINDOW_MINUTES'))
+    recent = dict(
+        ResourceViewEvent.objects.filter(
+            resource_id__in=[resource_id for resource_id, _ in ranked], viewed_at__gte=since
+        ).values('resource_id').annotate(views=Count('id')).values_list('resource_id', 'views')
+    )
+    offset = decay_rate() * at
+    return [
+        (resource_id, math.exp(log_score - offset), recent.get(resource_id, 0))
+        for resource_id, log_score in ranked
+    ]
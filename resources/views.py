@@ -1,17 +1,45 @@
 
+from django.contrib.auth import get_user_model
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Resource, ResourceCategory
+from repairportal.caching import cached_response
+from repairportal.compiled import CompiledListMixin
+from repairportal.fieldsets import FieldsetViewMixin
+from .content import ContentSearchFilter
+from .counters import view_counts
+from .recommendations import get_setting as recommendation_setting
+from . import trending as trending_resources
+from .models import Resource, ResourceCategory, ResourceNeighbor
 from .serializers import ResourceSerializer, ResourceCategorySerializer
 from users.permissions import IsAdminUser
 
+User = get_user_model()
 
-class ResourceCategoryViewSet(viewsets.ModelViewSet):
+
+class CatalogCacheMixin:
+    """
+    Serves ``list`` and ``retrieve`` through the shared response cache,
+    invalidated by the version stamps of ``cache_models``.
+    """
+    cache_models = ()
+    
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return cached_response(request, self.cache_models, lambda: build(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        return cached_response(request, self.cache_models, lambda: build(request, *args, **kwargs))
+
+
+class ResourceCategoryViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = ResourceCategory.objects.all()
     serializer_class = ResourceCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_models = (ResourceCategory,)
     
     def get_permissions(self):
         """
@@ -26,10 +54,11 @@ class ResourceCategoryViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class ResourceViewSet(viewsets.ModelViewSet):
+class ResourceViewSet(CatalogCacheMixin, FieldsetViewMixin, CompiledListMixin, viewsets.ModelViewSet):
     serializer_class = ResourceSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    cache_models = (Resource, ResourceCategory, User)
+    filter_backends = [DjangoFilterBackend, ContentSearchFilter, filters.OrderingFilter]
     filterset_fields = ['resource_type', 'category', 'is_featured']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'view_count', 'title']
@@ -52,20 +81,75 @@ class ResourceViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def increment_view(self, request, pk=None):
-        """Track resource views"""
+        """Track resource views; counts are buffered and written in batches"""
+        resource = self.get_object()
+        counted = view_counts.record(resource.pk, request.user.pk)
+        return Response(
+            {"detail": "View count incremented." if counted else "View already counted.", "counted": counted},
+            status=status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
+    def view_stats(self, request):
+        """Buffered view counts and flush lag of the worker serving the request"""
+        return Response(view_counts.stats())
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Resources with the most recent views, optionally within a ``category``; views count once flushed"""
+        category = request.query_params.get('category')
+        try:
+            category_id = int(category) if category else None
+            limit = min(int(request.query_params.get('limit', 10)), trending_resources.get_setting('TOP_K'))
+        except ValueError:
+            raise ValidationError("category and limit must be integers.")
+        
+        ranked = trending_resources.top(category_id, max(limit, 0))
+        resources = Resource.objects.select_related('category', 'uploaded_by').in_bulk(
+            [resource_id for resource_id, _, _ in ranked]
+        )
+        results = []
+        for resource_id, score, recent_views in ranked:
+            if resource_id in resources:
+                data = self.get_serializer(resources[resource_id]).data
+                data['trending_score'] = score
+                data['recent_views'] = recent_views
+                results.append(data)
+        return Response(results)
+    
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        """Resources most often viewed by the viewers of this one"""
         resource = self.get_object()
-        resource.view_count += 1
-        resource.save()
-        return Response({"detail": "View count incremented."}, status=status.HTTP_200_OK)
+        try:
+            limit = min(int(request.query_params.get('limit', 5)), recommendation_setting('NEIGHBORS'))
+        except ValueError:
+            limit = 5
+        
+        def build():
+            neighbors = ResourceNeighbor.objects.filter(resource=resource).select_related(
+                'neighbor__category', 'neighbor__uploaded_by'
+            )[:max(limit, 0)]
+            results = []
+            for neighbor in neighbors:
+                data = self.get_serializer(neighbor.neighbor).data
+                data['score'] = neighbor.score
+                results.append(data)
+            return Response(results)
+        
+        return cached_response(request, self.cache_models + (ResourceNeighbor,), build)
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured resources"""
-        featured = Resource.objects.filter(is_featured=True)
-        page = self.paginate_queryset(featured)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        def build():
+            featured = Resource.objects.filter(is_featured=True)
+            page = self.paginate_queryset(featured)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
             
-        serializer = self.get_serializer(featured, many=True)
-        return Response(serializer.data)
+            serializer = self.get_serializer(featured, many=True)
+            return Response(serializer.data)
+        
+        return cached_response(request, self.cache_models, build)
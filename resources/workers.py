@@ -0,0 +1,60 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceWorkerPool:
+    """
+    Runs ``process(resource_id)`` on background threads once the current
+    transaction commits. A resource queued again before its turn is processed
+    once. Threads suit this work since the heavy lifting happens in
+    subprocesses and C extensions. Nobody waits for the results, so failures
+    are logged and counted in ``stats()``.
+    """
+
+    def __init__(self, name, process, workers):
+        self.name = name
+        self.process = process
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._queued = set()
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, resource_id):
+        """Queue ``resource_id`` once the current transaction commits, unless it is already queued."""
+        transaction.on_commit(lambda: self._submit(resource_id))
+
+    def _submit(self, resource_id):
+        with self._lock:
+            if resource_id in self._queued:
+                return None
+            self._queued.add(resource_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers(), thread_name_prefix=self.name)
+            return self._executor.submit(self._process, resource_id)
+
+    def _process(self, resource_id):
+        with self._lock:
+            self._queued.discard(resource_id)
+        try:
+            result = self.process(resource_id)
+        except Exception:
+            logger.exception("%s failed for resource %s", self.name, resource_id)
+            with self._lock:
+                self.failed += 1
+            return None
+        finally:
+            close_old_connections()
+        with self._lock:
+            self.processed += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'queued': len(self._queued), 'processed': self.processed, 'failed': self.failed}
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import UploadSession
+
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'target', 'status', 'received', 'size', 'created_at')
+    list_filter = ('target', 'status', 'created_at')
+    search_fields = ('filename', 'owner__email')
+    readonly_fields = ('received', 'kind', 'sha256', 'stored_name', 'created_at')
+
+admin.site.register(UploadSession, UploadSessionAdmin)
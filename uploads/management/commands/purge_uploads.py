@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from uploads.transfer import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired upload sessions with their part files and unattached uploads.'
+
+    def handle(self, *args, **options):
+        count = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} expired upload sessions."))
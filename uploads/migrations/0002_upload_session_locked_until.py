@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("uploads", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadsession",
+            name="locked_until",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import uuid
+
+from django.db import models
+from django.conf import settings
+
+
+class UploadSession(models.Model):
+    """A resumable upload, received in chunks and attached to a model once finalized"""
+    
+    TARGETS = (
+        ('resource', 'Resource'),
+        ('repair_media', 'Repair Media'),
+        ('academic_media', 'Academic Question Media'),
+    )
+    
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20, choices=TARGETS)
+    # Only for resources, where it decides the size and type limits
+    resource_type = models.CharField(max_length=20, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # Detected from the first chunk, see uploads.transfer.sniff
+    kind = models.CharField(max_length=20, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    stored_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    # Set while a request writes or finalizes the upload, see uploads.transfer.upload_lock
+    locked_until = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
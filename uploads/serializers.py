@@ -0,0 +1,114 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from rest_framework import serializers
+from repairportal.fieldsets import FieldsetSerializerMixin
+from . import transfer
+from .models import UploadSession
+
+
+class UploadSessionSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'resource_type', 'filename', 'size', 'received',
+            'kind', 'sha256', 'status', 'created_at', 'expires_at'
+        ]
+        read_only_fields = ['received', 'kind', 'sha256', 'status', 'created_at', 'expires_at']
+    
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError("A file name is required.")
+        return value
+    
+    def validate(self, attrs):
+        target = attrs['target']
+        resource_type = attrs.get('resource_type', '')
+        if target == 'resource':
+            if transfer.limit_key(target, resource_type) not in transfer.ALLOWED_KINDS:
+                raise serializers.ValidationError({'resource_type': "A valid resource type is required."})
+        else:
+            attrs['resource_type'] = ''
+        
+        limit = transfer.max_size(target, resource_type)
+        if attrs['size'] > limit:
+            raise serializers.ValidationError(
+                {'size': f"File size cannot exceed {limit // (1024 * 1024)}MB"}
+            )
+        return attrs
+    
+    def create(self, validated_data):
+        validated_data['owner'] = self.context['request'].user
+        validated_data['expires_at'] = transfer.expiry()
+        return super().create(validated_data)
+
+
+class UploadedFileMixin:
+    """
+    Lets a ``file`` be given as the id of a finalized upload session instead
+    of a multipart upload. ``upload_target`` is the session target accepted,
+    ``upload_filled_fields`` are filled from the session when omitted, each
+    by its function in ``upload_fillers``.
+    """
+    upload_target = None
+    upload_filled_fields = ()
+    upload_fillers = {
+        'file_type': lambda session: transfer.MEDIA_FILE_TYPES.get(session.kind, 'document'),
+    }
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['upload'] = serializers.UUIDField(write_only=True, required=False)
+        for name in self.upload_filled_fields:
+            if name not in self.upload_fillers:
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__}.upload_filled_fields has '{name}', which has no entry in upload_fillers."
+                )
+        for name in ('file',) + tuple(self.upload_filled_fields):
+            fields[name].required = False
+        return fields
+    
+    def validate_upload(self, value):
+        session = UploadSession.objects.filter(
+            pk=value, owner=self.context['request'].user, target=self.upload_target
+        ).first()
+        if session is None:
+            raise serializers.ValidationError("Upload not found.")
+        if session.status != 'complete':
+            raise serializers.ValidationError("This upload is not finalized or was already used.")
+        return session
+    
+    def validate(self, attrs):
+        session = attrs.get('upload')
+        if session is not None:
+            resource_type = attrs.get('resource_type', getattr(self.instance, 'resource_type', ''))
+            if session.resource_type and session.resource_type != resource_type:
+                raise serializers.ValidationError(
+                    {'upload': f"This upload was checked for {session.resource_type} resources."}
+                )
+            attrs['file'] = session.stored_name
+            for name in self.upload_filled_fields:
+                attrs.setdefault(name, self.upload_fillers[name](session))
+        elif self.instance is None:
+            for name in ('file',) + tuple(self.upload_filled_fields):
+                if name not in attrs:
+                    raise serializers.ValidationError({name: "This field is required."})
+        return super().validate(attrs)
+    
+    def create(self, validated_data):
+        session = validated_data.pop('upload', None)
+        with transaction.atomic():
+            self.claim_upload(session)
+            return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        session = validated_data.pop('upload', None)
+        with transaction.atomic():
+            self.claim_upload(session)
+            return super().update(instance, validated_data)
+    
+    def claim_upload(self, session):
+        if session is not None and not transfer.claim(session):
+            raise serializers.ValidationError({'upload': "This upload was already used."})
@@ -0,0 +1,365 @@
+"""
+Resumable chunked uploads.
+
+A client creates an ``UploadSession`` with the file's name and size, then
+sends the bytes in any number of ``PUT`` requests carrying a
+``Content-Range`` header, and finally asks for the upload to be finalized.
+Each chunk is read from the request stream in ``READ_SIZE`` blocks and
+written straight into a part file, so request memory stays the same no
+matter how large the file or the chunk is.
+
+When a connection drops mid-chunk, the bytes that did arrive are kept and
+``received`` tells the client where to resume. The declared size is checked
+against the target's limit when the session is created and the file type is
+sniffed from the first chunk, so an oversized or unsupported file is turned
+down before it is transferred.
+
+Only one request at a time writes or finalizes a session: it claims the row
+with a conditional ``UPDATE`` that sets ``locked_until``, so the claim holds
+across workers without a shared cache, and a claim left by a crashed worker
+expires.
+
+The SHA-256 of the upload is computed as the chunks arrive. The running hash
+lives in the receiving process; a chunk handled by another worker rebuilds it
+by reading the part file once.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from .models import UploadSession
+
+DEFAULTS = {
+    # Relative paths are resolved against BASE_DIR
+    'PART_DIR': 'upload_parts',
+    'READ_SIZE': 64 * 1024,
+    'MAX_CHUNK_SIZE': 8 * 1024 * 1024,
+    'EXPIRY_HOURS': 24,
+    # Keyed by target, or by ``resource.<resource_type>``
+    'MAX_SIZES': {
+        'resource': 20 * 1024 * 1024,
+        'resource.video': 100 * 1024 * 1024,
+        'repair_media': 10 * 1024 * 1024,
+        'academic_media': 10 * 1024 * 1024,
+    },
+    # Process-local running hashes kept for sessions in progress
+    'HASH_STATES': 256,
+    # How long a claim of a request that never released it blocks the upload
+    'LOCK_SECONDS': 10 * 60,
+}
+
+# Kinds of file each target accepts; ``None`` accepts anything.
+ALLOWED_KINDS = {
+    'repair_media': {'image', 'video'},
+    'academic_media': {'image', 'video', 'pdf', 'document', 'text'},
+    'resource.video': {'video'},
+    'resource.pdf': {'pdf'},
+    'resource.article': {'pdf', 'document', 'text', 'image'},
+    'resource.guide': {'pdf', 'document', 'text', 'image'},
+    'resource.other': None,
+}
+
+TARGET_MODELS = {
+    'resource': 'resources.Resource',
+    'repair_media': 'repairs.RepairMedia',
+    'academic_media': 'academics.AcademicQuestionMedia',
+}
+
+# ``file_type`` of the media models for each detected kind
+MEDIA_FILE_TYPES = {
+    'image': 'image',
+    'video': 'video',
+    'pdf': 'document',
+    'document': 'document',
+    'text': 'document',
+}
+
+# The first chunk must carry at least this much of the file for sniffing
+SNIFF_BYTES = 4096
+
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image'),
+    (b'\xff\xd8\xff', 'image'),
+    (b'GIF87a', 'image'),
+    (b'GIF89a', 'image'),
+    (b'%PDF-', 'pdf'),
+    (b'\x1a\x45\xdf\xa3', 'video'),  # Matroska / WebM
+    (b'PK\x03\x04', 'document'),  # Office Open XML, OpenDocument
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'document'),  # legacy Office
+)
+IMAGE_BRANDS = (b'heic', b'heix', b'mif1', b'avif')
+
+
+def get_setting(name):
+    return getattr(settings, 'UPLOADS', {}).get(name, DEFAULTS[name])
+
+
+def limit_key(target, resource_type=''):
+    return f'{target}.{resource_type}' if target == 'resource' else target
+
+
+def max_size(target, resource_type=''):
+    sizes = get_setting('MAX_SIZES')
+    return sizes.get(limit_key(target, resource_type), sizes[target])
+
+
+def expiry():
+    return timezone.now() + timedelta(hours=get_setting('EXPIRY_HOURS'))
+
+
+def sniff(head):
+    """Kind of file (``image``, ``video``, ``pdf``, ``document``, ``text``) from its first bytes, or ``None``."""
+    for magic, kind in SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b'RIFF':
+        return {b'WEBP': 'image', b'AVI ': 'video'}.get(head[8:12])
+    if head[4:8] == b'ftyp':
+        return 'image' if head[8:12] in IMAGE_BRANDS else 'video'
+    if b'\x00' not in head:
+        try:
+            head.decode('utf-8')
+        except UnicodeDecodeError as error:
+            # A multi-byte character cut off at the end is still text
+            if error.start < len(head) - 3:
+                return None
+        return 'text'
+    return None
+
+
+class OffsetMismatch(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The chunk does not start where the upload left off.'
+    default_code = 'offset_mismatch'
+
+
+class UploadBusy(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another chunk of this upload is being received, or it is being finalized.'
+    default_code = 'upload_busy'
+
+
+@contextmanager
+def upload_lock(session, **expected):
+    """
+    Claim the upload in the database, keeping other requests in any worker
+    from writing or finalizing it meanwhile. The claim fails unless the
+    upload is still in progress and its fields have the ``expected`` values.
+    """
+    now = timezone.now()
+    claimed = UploadSession.objects.filter(pk=session.pk, status='uploading', **expected).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ).update(locked_until=now + timedelta(seconds=get_setting('LOCK_SECONDS')))
+    if not claimed:
+        session.refresh_from_db(fields=['received', 'status'])
+        if session.status != 'uploading':
+            raise exceptions.ValidationError('This upload was already finalized.')
+        if session.received != expected.get('received', session.received):
+            raise OffsetMismatch(f'The upload continues at byte {session.received}.')
+        raise UploadBusy()
+    try:
+        yield
+    finally:
+        UploadSession.objects.filter(pk=session.pk).update(locked_until=None)
+
+
+def part_path(session):
+    return os.path.join(settings.BASE_DIR, get_setting('PART_DIR'), f'{session.pk}.part')
+
+
+class PartFile(File):
+    """The finished part file; storages that can move files move it instead of copying."""
+
+    def __init__(self, path):
+        super().__init__(open(path, 'rb'), name=os.path.basename(path))
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+class HashStates:
+    """Running SHA-256 of sessions in progress, keyed by session and offset."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    def take(self, session):
+        """The hash of ``session``'s first ``received`` bytes."""
+        with self._lock:
+            offset, hasher = self._states.pop(session.pk, (None, None))
+        if offset == session.received:
+            return hasher
+        hasher = hashlib.sha256()
+        if session.received:
+            read_size = get_setting('READ_SIZE')
+            remaining = session.received
+            with open(part_path(session), 'rb') as part:
+                while remaining:
+                    block = part.read(min(read_size, remaining))
+                    if not block:
+                        break
+                    hasher.update(block)
+                    remaining -= len(block)
+        return hasher
+
+    def put(self, session, offset, hasher):
+        with self._lock:
+            self._states[session.pk] = (offset, hasher)
+            self._states.move_to_end(session.pk)
+            while len(self._states) > get_setting('HASH_STATES'):
+                self._states.popitem(last=False)
+
+    def discard(self, session):
+        with self._lock:
+            self._states.pop(session.pk, None)
+
+
+hash_states = HashStates()
+
+
+def target_field(session):
+    return apps.get_model(TARGET_MODELS[session.target])._meta.get_field('file')
+
+
+def _read(stream, size):
+    try:
+        return stream.read(size)
+    except OSError:
+        return b''  # the client went away; keep what arrived
+
+
+def _check_kind(session, head):
+    kind = sniff(head)
+    allowed = ALLOWED_KINDS[limit_key(session.target, session.resource_type)]
+    if allowed is not None and kind not in allowed:
+        discard(session)
+        raise exceptions.UnsupportedMediaType(
+            kind or 'unknown',
+            detail='This type of file cannot be uploaded here; the upload was discarded.',
+        )
+    return kind or ''
+
+
+def receive(session, start, length, stream):
+    """
+    Write ``length`` bytes read from ``stream`` at offset ``start``. Returns
+    the new ``received``; bytes that arrived before the client went away are
+    kept even when the chunk is incomplete.
+    """
+    if session.status != 'uploading':
+        raise exceptions.ValidationError('This upload was already finalized.')
+    if length > get_setting('MAX_CHUNK_SIZE'):
+        raise exceptions.ValidationError(
+            f"Chunks cannot exceed {get_setting('MAX_CHUNK_SIZE')} bytes."
+        )
+    if start + length > session.size:
+        raise exceptions.ValidationError('The chunk extends past the declared size of the upload.')
+    if start == 0 and length < min(session.size, SNIFF_BYTES):
+        raise exceptions.ValidationError(f'The first chunk must contain at least {SNIFF_BYTES} bytes.')
+
+    with upload_lock(session, received=start):
+        session.received = start
+        hasher = hash_states.take(session)
+        read_size = get_setting('READ_SIZE')
+        written = 0
+        path = part_path(session)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+            part.seek(start)
+            if start == 0:
+                head = _read(stream, SNIFF_BYTES)
+                session.kind = _check_kind(session, head)
+                part.write(head)
+                hasher.update(head)
+                written = len(head)
+            while written < length:
+                block = _read(stream, min(read_size, length - written))
+                if not block:
+                    break
+                part.write(block)
+                hasher.update(block)
+                written += len(block)
+            part.truncate()
+
+        session.received = start + written
+        UploadSession.objects.filter(pk=session.pk).update(received=session.received, kind=session.kind)
+        hash_states.put(session, session.received, hasher)
+
+    if written < length:
+        raise exceptions.ValidationError(
+            f'The chunk was cut off; the upload continues at byte {session.received}.'
+        )
+    return session.received
+
+
+def finalize(session, checksum=''):
+    """Move the finished part file into the target's storage location."""
+    with upload_lock(session):
+        session.refresh_from_db(fields=['received', 'status'])
+        return _finalize(session, checksum)
+
+
+def _finalize(session, checksum):
+    if session.status != 'uploading':
+        raise exceptions.ValidationError('This upload was already finalized.')
+    if session.received != session.size:
+        raise exceptions.ValidationError(f'{session.size - session.received} bytes have not been received yet.')
+
+    digest = hash_states.take(session).hexdigest()
+    hash_states.discard(session)
+    if checksum and checksum.lower() != digest:
+        discard(session)
+        raise exceptions.ValidationError('The checksum does not match the received file; the upload was discarded.')
+
+    path = part_path(session)
+    if not os.path.exists(path):
+        # Empty files never get a chunk
+        open(path, 'wb').close()
+    field = target_field(session)
+    with PartFile(path) as content:
+        session.stored_name = field.storage.save(field.generate_filename(None, session.filename), content)
+    if os.path.exists(path):
+        os.remove(path)
+
+    session.sha256 = digest
+    session.status = 'complete'
+    session.save(update_fields=['sha256', 'stored_name', 'status'])
+    return session
+
+
+def claim(session):
+    """Mark a complete upload as attached; ``False`` if someone attached it first."""
+    return bool(UploadSession.objects.filter(pk=session.pk, status='complete').update(status='attached'))
+
+
+def discard(session):
+    """Delete a session with its part file, and its stored file unless that was attached."""
+    hash_states.discard(session)
+    path = part_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    if session.stored_name and session.status != 'attached':
+        target_field(session).storage.delete(session.stored_name)
+    session.delete()
+
+
+def purge_expired():
+    """Discard every expired session; returns how many were removed."""
+    expired = UploadSession.objects.filter(expires_at__lt=timezone.now())
+    count = 0
+    for session in expired.iterator():
+        discard(session)
+        count += 1
+    return count
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import UploadSessionViewSet
+
+router = DefaultRouter()
+router.register('sessions', UploadSessionViewSet, basename='upload-session')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,63 @@
+import re
+
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from . import transfer
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads: create a session, ``PUT`` the bytes in chunks with a
+    ``Content-Range: bytes <first>-<last>/<size>`` header, then ``finalize``.
+    A session's ``received`` (also sent as the ``Range`` header) is where the
+    next chunk has to start.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return UploadSession.objects.filter(owner=self.request.user).order_by('-created_at')
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        session = getattr(self, 'session', None)
+        if session is not None and session.received:
+            response['Range'] = f'bytes=0-{session.received - 1}'
+        return super().finalize_response(request, response, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        self.session = self.get_object()
+        return Response(self.get_serializer(self.session).data)
+    
+    def update(self, request, *args, **kwargs):
+        """Receive one chunk; the body is streamed, never parsed."""
+        self.session = self.get_object()
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            raise ValidationError("A Content-Range header of the form 'bytes first-last/size' is required.")
+        first, last, size = (int(value) for value in match.groups())
+        if size != self.session.size:
+            raise ValidationError(f"The upload was declared with a size of {self.session.size} bytes.")
+        length = last - first + 1
+        if length <= 0 or int(request.headers.get('Content-Length') or 0) != length:
+            raise ValidationError("Content-Length must match the Content-Range.")
+        
+        transfer.receive(self.session, first, length, request.stream)
+        return Response(self.get_serializer(self.session).data)
+    
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Finish the upload, optionally checking the client's ``sha256`` of the file."""
+        self.session = self.get_object()
+        transfer.finalize(self.session, request.data.get('sha256', ''))
+        return Response(self.get_serializer(self.session).data)
+    
+    def destroy(self, request, *args, **kwargs):
+        transfer.discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
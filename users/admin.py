@@ -1,7 +1,7 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Profile, Rating
+from .models import User, Profile, ProfileSkill, Rating, LeaderboardEntry
 
 class UserAdmin(BaseUserAdmin):
     list_display = ('email', 'full_name', 'role', 'is_active', 'is_staff')
@@ -23,6 +23,13 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class ProfileAdmin(admin.ModelAdmin):
+    # Saves leave Profile.COUNTER_FIELDS alone, so an edit here would be lost
+    readonly_fields = ('total_earnings',)
+
+
 admin.site.register(User, UserAdmin)
-admin.site.register(Profile)
+admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Rating)
+admin.site.register(LeaderboardEntry)
+admin.site.register(ProfileSkill)
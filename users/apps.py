@@ -5,3 +5,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from repairportal import checks
+        from . import caching, signals  # noqa: F401
+        from .authentication import get_setting
+
+        checks.requires_shared_cache('Token revocation', lambda: get_setting('CACHE_ALIAS'))
+        checks.requires_shared_cache('Per-user response caching', lambda: caching.get_setting('CACHE_ALIAS'))
@@ -0,0 +1,195 @@
+"""
+JWT authentication without a ``User`` lookup per request.
+
+Access tokens carry ``role``, ``is_staff`` and ``full_name`` claims, added
+when the token pair is issued and re-read from the database on every
+refresh. ``ClaimsJWTAuthentication`` turns those claims into a
+``ClaimsUser`` and keeps the result in a bounded, per-process LRU cache with
+a short TTL, so an authenticated request costs no query at all.
+
+Because the database is no longer consulted, users who are deactivated,
+deleted or change role/staff status are revoked explicitly: a signal records
+a "revoked before" timestamp in the shared cache, and tokens issued up to
+that moment are rejected. ``iat`` only has whole seconds, so tokens also
+carry an ``issued_at`` claim with sub-second precision; otherwise a token
+obtained in the same second as the revocation (say, right after renaming
+oneself) would be rejected too. The cache must be shared by all workers
+(``manage.py check --deploy`` warns when it is not), or revocations only
+reach the process that made them. The revoking process evicts its own principals
+immediately; other processes notice once their cached principal expires
+(``TTL`` seconds). Clients whose access token is rejected refresh it, which
+returns a token with up-to-date claims, or fails for inactive users.
+
+A ``ClaimsUser`` has no ``email``, ``is_superuser``, groups or permissions
+(they are empty or false): code that needs them must load the ``User``
+instead of reading them from ``request.user``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .blacklist import BloomRefreshToken
+from .models import ClaimsUser
+
+User = get_user_model()
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'MAX_SIZE': 10000,
+    # Seconds a built principal is reused before the revocation mark is
+    # checked again.
+    'TTL': 60,
+}
+
+CLAIMS = ('role', 'is_staff', 'full_name')
+# Issue time with sub-second precision, compared with revocation times
+ISSUED_AT_CLAIM = 'issued_at'
+
+
+def get_setting(name):
+    return getattr(settings, 'JWT_PRINCIPAL_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[ISSUED_AT_CLAIM] = time.time()
+    return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = BloomRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Issues the new access (and rotated refresh) token with the user's current claims"""
+    token_class = BloomRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+
+        access = refresh.access_token
+        # access_token copies the refresh token's "iat" (and "issued_at", which
+        # add_claims replaces); stamp the real issue time
+        access.set_iat()
+        data = {'access': str(add_claims(access, user))}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(add_claims(refresh, user))
+        return data
+
+
+def _revocation_key(user_id):
+    return f'auth:revoked_before:{user_id}'
+
+
+def revoke_user(user_id):
+    """Reject every token of the user issued up to now, once the transaction commits."""
+    def revoke():
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        caches[get_setting('CACHE_ALIAS')].set(
+            _revocation_key(user_id), time.time(), int(lifetime.total_seconds())
+        )
+        principals.evict_user(user_id)
+
+    transaction.on_commit(revoke)
+
+
+def is_revoked(user_id, issued_at):
+    revoked_before = caches[get_setting('CACHE_ALIAS')].get(_revocation_key(user_id))
+    return revoked_before is not None and issued_at <= revoked_before
+
+
+class PrincipalCache:
+    """Thread-safe LRU of ``ClaimsUser`` objects keyed by token id, with a TTL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # jti -> (expires at, user)
+
+    def get(self, jti):
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[jti]
+                return None
+            self._entries.move_to_end(jti)
+            return entry[1]
+
+    def set(self, jti, user):
+        with self._lock:
+            self._entries[jti] = (time.monotonic() + get_setting('TTL'), user)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > get_setting('MAX_SIZE'):
+                self._entries.popitem(last=False)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            for jti in [jti for jti, (_, user) in self._entries.items() if user.pk == user_id]:
+                del self._entries[jti]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principals = PrincipalCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that builds the user from token claims. Tokens
+    issued before the claims were introduced fall back to the database
+    lookup until they expire.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if any(claim not in validated_token for claim in CLAIMS + (ISSUED_AT_CLAIM,)):
+            return super().get_user(validated_token)
+
+        jti = validated_token[api_settings.JTI_CLAIM]
+        user = principals.get(jti)
+        if user is not None:
+            return user
+        if is_revoked(user_id, validated_token[ISSUED_AT_CLAIM]):
+            raise AuthenticationFailed(_("Token has been revoked"), code='token_revoked')
+        user = ClaimsUser(
+            **{api_settings.USER_ID_FIELD: user_id},
+            role=validated_token['role'],
+            is_staff=validated_token['is_staff'],
+            full_name=validated_token['full_name'],
+            is_active=True,
+        )
+        user._state.adding = False
+        principals.set(jti, user)
+        return user
@@ -0,0 +1,156 @@
+"""
+Refresh-token blacklist checks with a per-process Bloom filter.
+
+With ``token_blacklist`` installed every refresh asks the database whether
+the token's JTI was blacklisted, although almost none are. Each worker keeps
+a Bloom filter of blacklisted JTIs instead: a JTI that is not in the filter
+is certainly not blacklisted and needs no query, and only the small fraction
+of likely positives (real ones plus ``FALSE_POSITIVE_RATE``) are confirmed
+against the database.
+
+The filter is topped up from new ``BlacklistedToken`` rows at most every
+``SYNC_SECONDS`` (one primary-key range query), immediately for tokens
+blacklisted by the same process, and rebuilt from scratch every
+``REBUILD_SECONDS`` so entries removed by ``compact_token_blacklist`` stop
+producing false positives. A token blacklisted by another worker can thus be
+accepted for at most ``SYNC_SECONDS``.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+DEFAULTS = {
+    'FALSE_POSITIVE_RATE': 0.01,
+    # The filter is sized for at least this many entries, and for twice the
+    # current blacklist so it can grow between rebuilds.
+    'MIN_CAPACITY': 10000,
+    'SYNC_SECONDS': 5,
+    'REBUILD_SECONDS': 3600,
+    # Re-read this many ids below the highest one seen, so rows from
+    # transactions that committed out of id order are not missed.
+    'SYNC_OVERLAP_ROWS': 1000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'REFRESH_TOKEN_BLOOM', {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, false_positive_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistFilter:
+    """The process-wide Bloom filter of blacklisted JTIs and its sync state."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._max_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self.checks = 0
+        self.database_checks = 0
+
+    def rebuild(self):
+        rows = BlacklistedToken.objects.values_list('pk', 'token__jti')
+        capacity = max(get_setting('MIN_CAPACITY'), 2 * rows.count())
+        bloom = BloomFilter(capacity, get_setting('FALSE_POSITIVE_RATE'))
+        max_id = 0
+        for pk, jti in rows.iterator(chunk_size=5000):
+            bloom.add(jti)
+            max_id = max(max_id, pk)
+        with self._lock:
+            self._bloom, self._max_id = bloom, max_id
+            self._synced_at = self._built_at = time.monotonic()
+
+    def sync(self):
+        """Add rows blacklisted since the last sync, or rebuild when due."""
+        now = time.monotonic()
+        if self._bloom is None or now - self._built_at > get_setting('REBUILD_SECONDS'):
+            self.rebuild()
+            return
+        if now - self._synced_at < get_setting('SYNC_SECONDS'):
+            return
+        with self._lock:
+            self._synced_at = now
+            since = self._max_id - get_setting('SYNC_OVERLAP_ROWS')
+        rows = list(BlacklistedToken.objects.filter(pk__gt=since).values_list('pk', 'token__jti'))
+        with self._lock:
+            for pk, jti in rows:
+                self._bloom.add(jti)
+                self._max_id = max(self._max_id, pk)
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def might_contain(self, jti):
+        self.sync()
+        self.checks += 1
+        return jti in self._bloom
+
+    def is_blacklisted(self, jti):
+        if not self.might_contain(jti):
+            return False
+        self.database_checks += 1
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class BloomRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check goes through ``blacklist_filter``"""
+
+    def check_blacklist(self):
+        if blacklist_filter.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+def compact(batch_size=5000):
+    """Delete expired outstanding tokens (and their blacklist entries) in batches."""
+    expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
@@ -0,0 +1,164 @@
+"""
+Read-through cache for per-user responses (``me``, ``dashboard``).
+
+Every user has a version counter in the cache, and cached responses are keyed
+by that version, so invalidating everything cached for a user is a single
+``incr``: entries of older versions are simply never read again and expire on
+their own. Signals bump the version whenever the profile, ratings, repairs or
+questions behind a response change. Bumps are deferred until the surrounding
+transaction commits so a concurrent reader can never cache pre-commit data
+under the new version.
+
+``rebuild_profile_stats`` and similar bulk jobs bump a global generation that
+is part of every key instead of touching each user.
+
+The version counters must live in a cache shared by all processes (see
+``CACHES``); with the per-process local-memory cache, a bump made by one
+worker is invisible to the others.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from repairportal.routing import use_primary
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 15,
+    # Process-local hit/miss counts are added to the shared totals this often.
+    'METRICS_FLUSH_EVERY': 100,
+}
+
+GENERATION_KEY = 'user_response:generation'
+METRIC_NAMES = ('hits', 'misses', 'not_modified')
+
+
+def get_setting(name):
+    return getattr(settings, 'USER_RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('CACHE_ALIAS')]
+
+
+def version_key(user_id):
+    return f'user_response:version:{user_id}'
+
+
+def _initial_version():
+    # Starting from the clock rather than 1 keeps a counter that was evicted
+    # and recreated from reusing a version that still has entries cached.
+    return time.time_ns() // 1000
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def get_versions(user_id):
+    """Return ``(generation, user version)``, creating missing counters."""
+    cache = get_cache()
+    key = version_key(user_id)
+    values = cache.get_many([GENERATION_KEY, key])
+    for name in (GENERATION_KEY, key):
+        if name not in values:
+            cache.add(name, _initial_version(), None)
+            values[name] = cache.get(name)
+    return values[GENERATION_KEY], values[key]
+
+
+def bump_user(*user_ids):
+    """Invalidate every cached response of the given users once the transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: [_incr(version_key(user_id)) for user_id in user_ids])
+
+
+def bump_all():
+    """Invalidate the cached responses of every user."""
+    transaction.on_commit(lambda: _incr(GENERATION_KEY))
+
+
+class CacheMetrics:
+    """
+    Hit/miss counters. Counts are kept per process and added to shared
+    counters in the cache every ``METRICS_FLUSH_EVERY`` requests so reading
+    the totals covers all workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(METRIC_NAMES, 0)
+
+    def record(self, name):
+        with self._lock:
+            self._pending[name] += 1
+            if sum(self._pending.values()) < get_setting('METRICS_FLUSH_EVERY'):
+                return
+            pending, self._pending = self._pending, dict.fromkeys(METRIC_NAMES, 0)
+        self._flush(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, dict.fromkeys(METRIC_NAMES, 0)
+        self._flush(pending)
+
+    def snapshot(self):
+        self.flush()
+        cache = get_cache()
+        totals = cache.get_many([f'user_response:metrics:{name}' for name in METRIC_NAMES])
+        counts = {name: totals.get(f'user_response:metrics:{name}', 0) for name in METRIC_NAMES}
+        requests = sum(counts.values())
+        counts['requests'] = requests
+        counts['hit_ratio'] = (counts['hits'] + counts['not_modified']) / requests if requests else None
+        return counts
+
+    def _flush(self, pending):
+        cache = get_cache()
+        for name, count in pending.items():
+            if not count:
+                continue
+            key = f'user_response:metrics:{name}'
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+
+
+metrics = CacheMetrics()
+
+
+def cached_user_response(request, namespace, user_id, build):
+    """
+    Serve the ``namespace`` response of ``user_id`` from the cache, calling
+    ``build()`` for the response data on a miss. The ETag is the version the
+    data was cached under, so revalidation needs no cache read beyond the
+    version counters.
+    """
+    generation, version = get_versions(user_id)
+    etag = quote_etag(f'{namespace}-{user_id}-{generation}.{version}')
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        metrics.record('not_modified')
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    key = f'user_response:{namespace}:{user_id}:{generation}:{version}'
+    data = cache.get(key)
+    if data is None:
+        metrics.record('misses')
+        # A lagging replica would cache stale data under the fresh version
+        with use_primary():
+            data = build()
+        cache.set(key, data, get_setting('TIMEOUT'))
+    else:
+        metrics.record('hits')
+    return Response(data, headers=headers)
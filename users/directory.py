@@ -0,0 +1,64 @@
+"""
+Lookups behind the user directory.
+
+A profile's free-text expertise ("Physics, Arduino repair") is split into
+``ProfileSkill`` rows so "technicians who know X" is an indexed lookup rather
+than a substring scan. Prefix searches are expressed as ranges
+(``value >= "ab" AND value < "ac"``) over case-folded values, which every
+database can answer from the ``full_name_folded`` or skill name index,
+unlike ``LIKE 'ab%'``. Names are folded in Python (see ``fold_name``), as
+SQLite's ``LOWER()`` leaves non-ASCII letters alone.
+"""
+from django.db.models import Q
+
+from .models import ProfileSkill, fold_name
+
+SKILL_MAX_LENGTH = ProfileSkill._meta.get_field('name').max_length
+
+
+def parse_skills(expertise):
+    skills = set()
+    for item in (expertise or '').split(','):
+        name = fold_name(' '.join(item.split()))[:SKILL_MAX_LENGTH]
+        if name:
+            skills.add(name)
+    return skills
+
+
+def sync_skills(profile):
+    """Make the profile's skill rows match its expertise text."""
+    wanted = parse_skills(profile.expertise)
+    current = set(profile.skills.values_list('name', flat=True))
+    if current - wanted:
+        profile.skills.filter(name__in=current - wanted).delete()
+    if wanted - current:
+        ProfileSkill.objects.bulk_create(
+            [ProfileSkill(profile=profile, name=name) for name in wanted - current], ignore_conflicts=True
+        )
+
+
+def skills_for(profiles):
+    """Skill rows for newly bulk-created profiles."""
+    return [ProfileSkill(profile=profile, name=name) for profile in profiles for name in parse_skills(profile.expertise)]
+
+
+def prefix_range(prefix):
+    """``(low, high)`` bounds so that ``low <= value < high`` iff ``value`` starts with ``prefix``."""
+    prefix = fold_name(prefix)
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def name_prefix_filter(prefix):
+    """Users whose full name starts with ``prefix``, case-insensitively."""
+    low, high = prefix_range(prefix)
+    return Q(full_name_folded__gte=low, full_name_folded__lt=high)
+
+
+def skill_prefix_filter(prefix):
+    low, high = prefix_range(prefix)
+    return Q(pk__in=ProfileSkill.objects.filter(name__gte=low, name__lt=high).values('profile__user_id'))
+
+
+def skill_filter(name):
+    name = fold_name(' '.join(name.split()))
+    return Q(pk__in=ProfileSkill.objects.filter(name=name).values('profile__user_id'))
@@ -0,0 +1,29 @@
+import django_filters
+from django.contrib.auth import get_user_model
+
+from .directory import name_prefix_filter, skill_filter, skill_prefix_filter
+
+User = get_user_model()
+
+
+class UserDirectoryFilter(django_filters.FilterSet):
+    role = django_filters.ChoiceFilter(choices=User.ROLE_CHOICES)
+    expertise = django_filters.CharFilter(method='filter_expertise')
+    min_rate = django_filters.NumberFilter(field_name='profile__hourly_rate', lookup_expr='gte')
+    max_rate = django_filters.NumberFilter(field_name='profile__hourly_rate', lookup_expr='lte')
+    q = django_filters.CharFilter(method='filter_prefix')
+    
+    class Meta:
+        model = User
+        fields = ['role', 'expertise', 'min_rate', 'max_rate', 'q']
+    
+    def filter_expertise(self, queryset, name, value):
+        """Users who list ``value`` as one of their skills"""
+        return queryset.filter(skill_filter(value)) if value.strip() else queryset
+    
+    def filter_prefix(self, queryset, name, value):
+        """Full name or one of the skills starts with ``value``"""
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.filter(name_prefix_filter(value) | skill_prefix_filter(value))
@@ -0,0 +1,119 @@
+"""
+Subject leaderboards for teachers and device-category leaderboards for
+technicians.
+
+Each (board, category, user) standing is a ``LeaderboardEntry`` row, and the
+``leaderboard_rank_idx`` index keeps the rows of a board sorted by score, so a
+rating or completion event is a single indexed row update and reading the
+top of a board is a range scan over ``k`` rows.
+
+Scores are Bayesian averages of the user's ratings: every user starts with
+``PRIOR_WEIGHT`` virtual ratings of ``PRIOR_MEAN`` so a single five-star
+review does not outrank a long track record.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import LeaderboardEntry, Profile, Rating
+
+DEFAULTS = {
+    'PRIOR_MEAN': 3.5,
+    'PRIOR_WEIGHT': 5,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'LEADERBOARDS', {}).get(name, DEFAULTS[name])
+
+
+def bayesian_score(rating_sum, rating_count):
+    weight = get_setting('PRIOR_WEIGHT')
+    return (weight * get_setting('PRIOR_MEAN') + rating_sum) / (weight + rating_count)
+
+
+def rating_totals(user_id):
+    """``(rating_sum, rating_count)`` from the user's denormalized profile counters."""
+    totals = Profile.objects.filter(user_id=user_id).values_list('rating_sum', 'rating_count').first()
+    return totals or (0, 0)
+
+
+def record_completion(user_id, board, category):
+    """Count one more completed job for the user on the given board."""
+    updated = LeaderboardEntry.objects.filter(
+        board=board, category=category, user_id=user_id
+    ).update(completed=F('completed') + 1)
+    if updated:
+        return
+    rating_sum, rating_count = rating_totals(user_id)
+    try:
+        with transaction.atomic():
+            LeaderboardEntry.objects.create(
+                board=board,
+                category=category,
+                user_id=user_id,
+                completed=1,
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                score=bayesian_score(rating_sum, rating_count),
+            )
+    except IntegrityError:
+        # Created concurrently by another request
+        LeaderboardEntry.objects.filter(
+            board=board, category=category, user_id=user_id
+        ).update(completed=F('completed') + 1)
+
+
+def remove_completion(user_id, board, category):
+    """Take back a completed job that was reopened or deleted; entries left with none are dropped."""
+    entries = LeaderboardEntry.objects.filter(board=board, category=category, user_id=user_id)
+    with transaction.atomic():
+        entries.filter(completed__gt=0).update(completed=F('completed') - 1)
+        entries.filter(completed=0).delete()
+
+
+def refresh_ratings(user_id):
+    """Re-score every board entry of the user after their ratings changed."""
+    rating_sum, rating_count = rating_totals(user_id)
+    LeaderboardEntry.objects.filter(user_id=user_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        score=bayesian_score(rating_sum, rating_count),
+    )
+
+
+def rebuild():
+    """Recompute every board from completed questions, repairs and ratings."""
+    from academics.models import AcademicQuestion
+    from repairs.models import RepairRequest
+
+    completions = []
+    sessions = AcademicQuestion.objects.filter(
+        teacher__isnull=False, status__in=['answered', 'closed']
+    ).values_list('teacher', 'subject').annotate(completed=Count('pk'))
+    completions.extend(('subject', category, user_id, count) for user_id, category, count in sessions)
+    repairs = RepairRequest.objects.filter(
+        technician__isnull=False, status='completed'
+    ).values_list('technician', 'device_type').annotate(completed=Count('pk'))
+    completions.extend(('device', category, user_id, count) for user_id, category, count in repairs)
+
+    totals = {
+        row['user']: (row['total'] or 0, row['count'])
+        for row in Rating.objects.values('user').annotate(count=Count('pk'), total=Sum('rating'))
+    }
+    entries = []
+    for board, category, user_id, completed in completions:
+        rating_sum, rating_count = totals.get(user_id, (0, 0))
+        entries.append(LeaderboardEntry(
+            board=board,
+            category=category,
+            user_id=user_id,
+            completed=completed,
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            score=bayesian_score(rating_sum, rating_count),
+        ))
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
@@ -0,0 +1,59 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.provisioning import parse_rows, provision, write_report
+
+
+class Command(BaseCommand):
+    help = 'Create users and profiles in bulk from a CSV file (email, full_name, role, password, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (defaults to the number of CPUs).')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without creating users.')
+        parser.add_argument('--report', help='Also write the report to this JSON file (jobs started by the API).')
+        parser.add_argument('--remove-file', action='store_true', help='Delete the CSV file when done.')
+
+    def handle(self, *args, **options):
+        if options['report'] is None:
+            self.run(options)
+            return
+        try:
+            report = self.run(options)
+        except Exception as exc:
+            write_report(options['report'], {'status': 'failed', 'error': str(exc)})
+            raise
+        write_report(options['report'], {'status': 'finished', **report})
+
+    def run(self, options):
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as f:
+                rows, errors = parse_rows(f)
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(exc)
+        finally:
+            if options['remove_file'] and os.path.exists(options['csv_file']):
+                os.remove(options['csv_file'])
+
+        for line, message in errors:
+            self.stderr.write(f"Line {line}: {message}")
+
+        report = provision(
+            rows, batch_size=options['batch_size'], workers=options['workers'], dry_run=options['dry_run']
+        )
+        report['errors'] = [{'line': line, 'error': message} for line, message in errors]
+        if options['dry_run']:
+            self.stdout.write(
+                f"{report['valid'] - report['skipped']} users would be created, "
+                f"{report['skipped']} already exist, {len(errors)} invalid rows."
+            )
+            return report
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users in {report['seconds']}s "
+            f"({report['users_per_second']} users/s); {report['skipped']} already existed, "
+            f"{len(errors)} invalid rows."
+        ))
+        return report
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.leaderboards import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute all teacher and technician leaderboards from scratch.'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} leaderboard entries."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the rating and completion counters of every profile.'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed counters for {count} profiles."))
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[("subject", "Subject"), ("device", "Device Category")],
+                        max_length=10,
+                    ),
+                ),
+                ("category", models.CharField(max_length=50)),
+                ("completed", models.PositiveIntegerField(default=0)),
+                ("rating_count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.PositiveIntegerField(default=0)),
+                ("score", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Leaderboard Entries",
+                "indexes": [
+                    models.Index(
+                        fields=["board", "category", "-score", "-completed", "id"],
+                        name="leaderboard_rank_idx",
+                    )
+                ],
+                "unique_together": {("board", "category", "user")},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Profile = apps.get_model("users", "Profile")
+    Rating = apps.get_model("users", "Rating")
+    RepairRequest = apps.get_model("repairs", "RepairRequest")
+    AcademicQuestion = apps.get_model("academics", "AcademicQuestion")
+
+    counters = {}
+    for row in Rating.objects.values("user", "rating").annotate(count=Count("pk")):
+        values = counters.setdefault(row["user"], {})
+        values[f"rating_{row['rating']}_count"] = row["count"]
+        values["rating_count"] = values.get("rating_count", 0) + row["count"]
+        values["rating_sum"] = (
+            values.get("rating_sum", 0) + row["count"] * row["rating"]
+        )
+    repairs = RepairRequest.objects.filter(technician__isnull=False, status="completed")
+    for user_id, count in repairs.values_list("technician").annotate(count=Count("pk")):
+        counters.setdefault(user_id, {})["completed_repairs"] = count
+    sessions = AcademicQuestion.objects.filter(
+        teacher__isnull=False, status__in=["answered", "closed"]
+    )
+    for user_id, count in sessions.values_list("teacher").annotate(count=Count("pk")):
+        counters.setdefault(user_id, {})["completed_sessions"] = count
+
+    for user_id, values in counters.items():
+        Profile.objects.filter(user_id=user_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_leaderboard_entry"),
+        ("repairs", "0004_repair_thread_versions"),
+        ("academics", "0005_unique_accepted_answer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="completed_repairs",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="completed_sessions",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
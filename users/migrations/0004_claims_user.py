@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:04
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_profile_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClaimsUser",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("users.user",),
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:11
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def backfill_skills(apps, schema_editor):
+    Profile = apps.get_model("users", "Profile")
+    ProfileSkill = apps.get_model("users", "ProfileSkill")
+
+    skills = []
+    for profile_id, expertise in Profile.objects.exclude(expertise="").values_list(
+        "pk", "expertise"
+    ):
+        names = {" ".join(item.split()).lower()[:100] for item in expertise.split(",")}
+        skills.extend(
+            ProfileSkill(profile_id=profile_id, name=name) for name in names if name
+        )
+    ProfileSkill.objects.bulk_create(skills, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0004_claims_user"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileSkill",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(fields=["hourly_rate"], name="profile_hourly_rate_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                models.F("role"),
+                django.db.models.functions.text.Lower("full_name"),
+                name="user_role_name_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Lower("full_name"),
+                name="user_full_name_lower_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="profileskill",
+            name="profile",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="skills",
+                to="users.profile",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="profileskill",
+            index=models.Index(fields=["name"], name="profile_skill_name_idx"),
+        ),
+        migrations.AlterUniqueTogether(
+            name="profileskill",
+            unique_together={("profile", "name")},
+        ),
+        migrations.RunPython(backfill_skills, migrations.RunPython.noop),
+    ]
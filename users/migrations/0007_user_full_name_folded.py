@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+def fold_names(apps, schema_editor):
+    """Case-fold existing names, and skill names that were only lower-cased."""
+    User = apps.get_model("users", "User")
+    ProfileSkill = apps.get_model("users", "ProfileSkill")
+    users = list(User.objects.only("full_name"))
+    for user in users:
+        user.full_name_folded = user.full_name.casefold()[:255]
+    User.objects.bulk_update(users, ["full_name_folded"], batch_size=1000)
+    for skill in ProfileSkill.objects.all():
+        folded = skill.name.casefold()[:100]
+        if skill.name != folded:
+            if ProfileSkill.objects.filter(profile_id=skill.profile_id, name=folded).exists():
+                skill.delete()
+            else:
+                skill.name = folded
+                skill.save(update_fields=["name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0006_user_email_lower_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="user",
+            name="user_role_name_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="user",
+            name="user_full_name_lower_idx",
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="full_name_folded",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(fold_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["role", "full_name_folded"], name="user_role_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["full_name_folded"], name="user_full_name_folded_idx"
+            ),
+        ),
+    ]
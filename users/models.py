@@ -1,8 +1,17 @@
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
+FOLDED_NAME_MAX_LENGTH = 255
+
+
+def fold_name(name):
+    """Form of a name that case-insensitive sorting and searching compare."""
+    # Folding can lengthen a name ("ß" -> "ss"); keep it within the column
+    return (name or '').casefold()[:FOLDED_NAME_MAX_LENGTH]
+
 
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
@@ -51,6 +60,9 @@ class User(AbstractUser):
     username = None
     email = models.EmailField(_('email address'), unique=True)
     full_name = models.CharField(_('full name'), max_length=255)
+    # Case-folded by Python on save (database LOWER() is ASCII-only on SQLite);
+    # the user directory sorts and prefix-searches on it
+    full_name_folded = models.CharField(max_length=FOLDED_NAME_MAX_LENGTH, editable=False, default='')
     role = models.CharField(_('role'), max_length=20, choices=ROLE_CHOICES, default='student')
     
     USERNAME_FIELD = 'email'
@@ -58,8 +70,44 @@ class User(AbstractUser):
     
     objects = UserManager()
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The user directory filters by role and sorts and prefix-searches
+            # case-insensitively by name
+            models.Index(fields=['role', 'full_name_folded'], name='user_role_name_idx'),
+            models.Index(fields=['full_name_folded'], name='user_full_name_folded_idx'),
+            # Case-insensitive lookups of existing emails when provisioning
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+    
     def __str__(self):
         return self.email
+    
+    def save(self, *args, **kwargs):
+        self.full_name_folded = fold_name(self.full_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'full_name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'full_name_folded'}
+        super().save(*args, **kwargs)
+
+
+class ClaimsUser(User):
+    """
+    Read-only user built from access-token claims by
+    ``users.authentication.ClaimsJWTAuthentication`` without a database query.
+    It compares equal to, and can be assigned to foreign keys like, the real
+    ``User`` row, but only ``id``, ``role``, ``is_staff`` and ``full_name`` are
+    populated, so it refuses to be saved.
+    """
+    
+    class Meta:
+        proxy = True
+    
+    def save(self, *args, **kwargs):
+        raise TypeError("ClaimsUser is built from token claims and cannot be saved; load the User instead.")
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError("ClaimsUser is built from token claims and cannot be deleted; load the User instead.")
 
 
 class Profile(models.Model):
@@ -73,8 +121,66 @@ class Profile(models.Model):
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     total_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     
+    # Denormalized counters, kept up to date by users.stats from rating and
+    # workflow signals so dashboards never aggregate over related tables
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_repairs = models.PositiveIntegerField(default=0, editable=False)
+    completed_sessions = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Only ever changed with F() updates, so a save() of an instance loaded
+    # before one of them must not write its stale values back
+    COUNTER_FIELDS = (
+        'total_earnings', 'rating_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count', 'completed_repairs', 'completed_sessions',
+    )
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['hourly_rate'], name='profile_hourly_rate_idx'),
+        ]
+    
     def __str__(self):
         return f"Profile of {self.user.email}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+    
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+
+class ProfileSkill(models.Model):
+    """One entry of a profile's comma-separated expertise, normalized for indexed lookups"""
+    
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='skills')
+    name = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ('profile', 'name')
+        indexes = [
+            models.Index(fields=['name'], name='profile_skill_name_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
 
 
 class Rating(models.Model):
@@ -91,3 +197,31 @@ class Rating(models.Model):
     
     def __str__(self):
         return f"{self.rated_by.full_name} rated {self.user.full_name}: {self.rating}/5"
+
+
+class LeaderboardEntry(models.Model):
+    """Precomputed standing of a teacher in a subject or a technician in a device category"""
+    
+    BOARD_CHOICES = (
+        ('subject', 'Subject'),
+        ('device', 'Device Category'),
+    )
+    
+    board = models.CharField(max_length=10, choices=BOARD_CHOICES)
+    category = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    completed = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('board', 'category', 'user')
+        indexes = [
+            models.Index(fields=['board', 'category', '-score', '-completed', 'id'], name='leaderboard_rank_idx'),
+        ]
+        verbose_name_plural = "Leaderboard Entries"
+    
+    def __str__(self):
+        return f"{self.user.full_name} in {self.board} {self.category}: {self.score:.2f}"
@@ -0,0 +1,199 @@
+"""
+Bulk creation of users (and their profiles) from a CSV file.
+
+Password hashing is deliberately slow, so it runs in a process pool while the
+main process inserts the previous batch; users and profiles are then written
+with one ``bulk_create`` per batch instead of two ``INSERT`` statements per
+user. ``bulk_create`` sends no ``post_save`` signals: the academic dispatcher
+picks up new teachers at its next resync.
+
+The API does not provision inside the request: ``start_job`` stores the CSV
+and runs the ``provision_users`` command on it in a separate process, which
+writes its report to a JSON file read back by ``job_report``.
+
+Expected columns: ``email``, ``full_name`` and optionally ``role`` (defaults
+to ``student``), ``password`` (users without one get an unusable password),
+``phone_number``, ``expertise`` and ``bio``.
+"""
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .directory import skills_for
+from .models import Profile, ProfileSkill, User, fold_name
+
+PROFILE_FIELDS = ('phone_number', 'expertise', 'bio')
+ROLES = dict(User.ROLE_CHOICES)
+
+DEFAULTS = {
+    # Where uploaded cohort files and job reports are kept, relative to BASE_DIR
+    'JOB_DIR': 'provisioning_jobs',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'USER_PROVISIONING', {}).get(name, DEFAULTS[name])
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'repairportal.settings')
+        django.setup()
+
+
+def _hash(password):
+    return make_password(password or None)
+
+
+def parse_rows(lines):
+    """
+    Validate CSV rows. Returns ``(rows, errors)`` where ``rows`` are dicts
+    ready to provision and ``errors`` are ``(line number, message)`` pairs.
+    """
+    reader = csv.DictReader(lines)
+    missing = {'email', 'full_name'} - set(reader.fieldnames or ())
+    if missing:
+        return [], [(1, f"Missing column(s): {', '.join(sorted(missing))}")]
+
+    rows, errors, seen = [], [], set()
+    for line, record in enumerate(reader, start=2):
+        email = User.objects.normalize_email((record.get('email') or '').strip())
+        full_name = (record.get('full_name') or '').strip()
+        role = (record.get('role') or 'student').strip().lower()
+        if not email or '@' not in email:
+            errors.append((line, "Invalid email"))
+        elif not full_name:
+            errors.append((line, "Missing full_name"))
+        elif role not in ROLES:
+            errors.append((line, f"Unknown role '{role}'"))
+        elif email.lower() in seen:
+            errors.append((line, f"Duplicate email {email}"))
+        else:
+            seen.add(email.lower())
+            rows.append({
+                'email': email,
+                'full_name': full_name,
+                'role': role,
+                'password': record.get('password') or '',
+                'profile': {field: (record.get(field) or '').strip() for field in PROFILE_FIELDS},
+            })
+    return rows, errors
+
+
+def existing_emails(emails, batch_size=1000):
+    """Lowercased ``emails`` that are already registered, compared case-insensitively."""
+    emails = list({email.lower() for email in emails})
+    found = set()
+    for start in range(0, len(emails), batch_size):
+        found.update(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails[start:start + batch_size])
+            .values_list('email_lower', flat=True)
+        )
+    return found
+
+
+def provision(rows, batch_size=500, workers=None, dry_run=False):
+    """
+    Create users and profiles for parsed ``rows``, skipping emails that are
+    already registered. Returns a report with counts and timings.
+    """
+    started = time.perf_counter()
+    taken = existing_emails(row['email'] for row in rows)
+    report = {'valid': len(rows), 'created': 0, 'skipped': len(taken), 'dry_run': dry_run}
+    rows = [row for row in rows if row['email'].lower() not in taken]
+
+    if rows and not dry_run:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, min(64, len(rows) // (workers * 4) or 1))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # Results arrive in order while later passwords are still being hashed
+            hashes = pool.map(_hash, (row['password'] for row in rows), chunksize=chunksize)
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                created = _insert_batch(batch, list(islice(hashes, len(batch))))
+                report['created'] += created
+                report['skipped'] += len(batch) - created
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['users_per_second'] = round(report['created'] / report['seconds'], 1) if report['seconds'] else None
+    return report
+
+
+def _insert_batch(rows, hashes):
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    email=row['email'], full_name=row['full_name'], full_name_folded=fold_name(row['full_name']),
+                    role=row['role'], password=password,
+                )
+                for row, password in zip(rows, hashes)
+            ])
+            profiles = Profile.objects.bulk_create(
+                Profile(user=user, **row['profile']) for user, row in zip(users, rows)
+            )
+            ProfileSkill.objects.bulk_create(skills_for(profiles))
+        return len(users)
+    except IntegrityError:
+        # Someone registered one of these emails since the upfront check
+        taken = existing_emails(row['email'] for row in rows)
+        remaining = [(row, password) for row, password in zip(rows, hashes) if row['email'].lower() not in taken]
+        if len(remaining) == len(rows):
+            raise
+        return _insert_batch([row for row, _ in remaining], [password for _, password in remaining])
+
+
+def _job_path(job_id, extension):
+    return os.path.join(settings.BASE_DIR, get_setting('JOB_DIR'), f'{job_id.hex}.{extension}')
+
+
+def write_report(path, report):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f)
+    os.replace(tmp_path, path)
+
+
+def start_job(upload):
+    """
+    Store ``upload`` and provision it with the ``provision_users`` command in
+    a new process, which deletes the file once done; returns the job id.
+    """
+    job_id = uuid.uuid4()
+    csv_path, report_path = _job_path(job_id, 'csv'), _job_path(job_id, 'json')
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    with open(csv_path, 'wb') as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    write_report(report_path, {'status': 'running'})
+    # A fresh interpreter rather than a fork of a threaded web worker
+    subprocess.Popen(
+        [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'provision_users', csv_path,
+         '--report', report_path, '--remove-file'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    return job_id
+
+
+def job_report(job_id):
+    """The report of a provisioning job, or ``None`` if there is no such job."""
+    try:
+        with open(_job_path(job_id, 'json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
@@ -1,20 +1,22 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Profile, Rating
+from repairportal.fieldsets import FieldsetSerializerMixin
+from .models import Profile, Rating, LeaderboardEntry
 
 User = get_user_model()
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['profile_picture', 'bio', 'phone_number', 'expertise', 'hourly_rate', 'total_earnings']
         read_only_fields = ['total_earnings']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(required=False)
+    select_related_fields = {'profile': 'profile'}
     
     class Meta:
         model = User
@@ -82,9 +84,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class RatingSerializer(serializers.ModelSerializer):
+class RatingSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     rated_by_name = serializers.ReadOnlyField(source='rated_by.full_name')
     user_name = serializers.ReadOnlyField(source='user.full_name')
+    select_related_fields = {'rated_by_name': 'rated_by', 'user_name': 'user'}
     
     class Meta:
         model = Rating
@@ -103,30 +106,57 @@ class RatingSerializer(serializers.ModelSerializer):
 
 
 class UserDashboardSerializer(serializers.ModelSerializer):
+    """Reads the denormalized counters on the profile, so it needs no queries beyond the user row"""
     profile = ProfileSerializer()
-    average_rating = serializers.SerializerMethodField()
+    average_rating = serializers.ReadOnlyField(source='profile.average_rating')
+    rating_count = serializers.ReadOnlyField(source='profile.rating_count')
+    rating_histogram = serializers.ReadOnlyField(source='profile.rating_histogram')
     completed_repairs = serializers.SerializerMethodField()
     completed_academic_sessions = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ['id', 'email', 'full_name', 'role', 'profile', 'average_rating', 
-                 'completed_repairs', 'completed_academic_sessions']
-    
-    def get_average_rating(self, obj):
-        ratings = obj.received_ratings.all()
-        if not ratings:
-            return None
-        return sum(r.rating for r in ratings) / len(ratings)
+        fields = ['id', 'email', 'full_name', 'role', 'profile', 'average_rating', 'rating_count',
+                 'rating_histogram', 'completed_repairs', 'completed_academic_sessions']
     
     def get_completed_repairs(self, obj):
-        from repairs.models import RepairRequest
-        if obj.role == 'technician':
-            return RepairRequest.objects.filter(technician=obj, status='completed').count()
+        if obj.role == 'technician' and hasattr(obj, 'profile'):
+            return obj.profile.completed_repairs
         return 0
     
     def get_completed_academic_sessions(self, obj):
-        from academics.models import AcademicQuestion
-        if obj.role == 'teacher':
-            return AcademicQuestion.objects.filter(teacher=obj, status='answered').count()
+        if obj.role == 'teacher' and hasattr(obj, 'profile'):
+            return obj.profile.completed_sessions
         return 0
+
+
+class DirectoryEntrySerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
+    """Public directory card; everything comes from the user row and its joined profile"""
+    profile_picture = serializers.ImageField(source='profile.profile_picture', read_only=True)
+    expertise = serializers.ReadOnlyField(source='profile.expertise')
+    hourly_rate = serializers.DecimalField(
+        source='profile.hourly_rate', max_digits=10, decimal_places=2, read_only=True
+    )
+    average_rating = serializers.ReadOnlyField(source='profile.average_rating')
+    rating_count = serializers.ReadOnlyField(source='profile.rating_count')
+    
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'role', 'profile_picture', 'expertise', 'hourly_rate',
+                 'average_rating', 'rating_count']
+
+
+class LeaderboardEntrySerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
+    user_name = serializers.ReadOnlyField(source='user.full_name')
+    select_related_fields = {'user_name': 'user'}
+    average_rating = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['user', 'user_name', 'board', 'category', 'score', 'average_rating',
+                 'rating_count', 'completed']
+    
+    def get_average_rating(self, obj):
+        if not obj.rating_count:
+            return None
+        return obj.rating_sum / obj.rating_count
@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from . import caching, leaderboards, stats
+from .authentication import revoke_user
+from .directory import sync_skills
+from .models import Profile, Rating
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    """Keep the stored value of an edited rating so its counters can be moved"""
+    if raw or instance.pk is None:
+        return
+    instance._previous_rating = Rating.objects.filter(pk=instance.pk).values_list('user_id', 'rating').first()
+
+
+@receiver(post_save, sender=Rating)
+def count_saved_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous_rating', None)
+    if previous is None:
+        stats.rating_added(instance.user_id, instance.rating)
+    elif previous[0] != instance.user_id:
+        stats.rating_removed(*previous)
+        stats.rating_added(instance.user_id, instance.rating)
+    else:
+        stats.rating_changed(instance.user_id, previous[1], instance.rating)
+
+
+@receiver(post_delete, sender=Rating)
+def count_deleted_rating(sender, instance, **kwargs):
+    stats.rating_removed(instance.user_id, instance.rating)
+
+
+@receiver([post_save, post_delete], sender=Rating)
+def rescore_leaderboards(sender, instance, raw=False, **kwargs):
+    """Ratings feed the Bayesian score of every board the rated user is on"""
+    if raw:
+        return
+    leaderboards.refresh_ratings(instance.user_id)
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is not None and previous[0] != instance.user_id:
+        leaderboards.refresh_ratings(previous[0])
+
+
+@receiver(post_save, sender=Profile)
+def index_profile_skills(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_skills(instance)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile_responses(sender, instance, raw=False, **kwargs):
+    """Profile edits; counters changed with ``update()`` bump the user themselves"""
+    if not raw:
+        caching.bump_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_user(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_claims(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_claims = User.objects.filter(pk=instance.pk).values_list(
+        'is_active', 'role', 'is_staff', 'full_name'
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_stale_tokens(sender, instance, created, raw=False, **kwargs):
+    """Access tokens carry role, staff and name claims; deactivation or a change of any revokes them"""
+    previous = getattr(instance, '_previous_claims', None)
+    if raw or created or previous is None:
+        return
+    if not instance.is_active or previous != (instance.is_active, instance.role, instance.is_staff, instance.full_name):
+        revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user(instance.pk)
@@ -0,0 +1,93 @@
+"""
+Denormalized per-user counters stored on ``Profile``.
+
+Rating totals, the rating histogram and completed repairs/sessions are
+updated with single ``UPDATE ... SET x = x + n`` statements from rating and
+workflow signals, so concurrent events never lose increments and reading a
+user's dashboard is one row fetch whatever the number of ratings.
+``rebuild()`` recomputes every counter from the source tables.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import caching
+from .models import Profile, Rating
+
+FINISHED_SESSION_STATUSES = ('answered', 'closed')
+
+
+def _histogram_field(rating):
+    return f'rating_{rating}_count'
+
+
+def _adjust(user_id, **deltas):
+    Profile.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items() if delta}
+    )
+    caching.bump_user(user_id)
+
+
+def rating_added(user_id, rating):
+    _adjust(user_id, rating_count=1, rating_sum=rating, **{_histogram_field(rating): 1})
+
+
+def rating_removed(user_id, rating):
+    _adjust(user_id, rating_count=-1, rating_sum=-rating, **{_histogram_field(rating): -1})
+
+
+def rating_changed(user_id, old_rating, new_rating):
+    if old_rating == new_rating:
+        return
+    _adjust(
+        user_id,
+        rating_sum=new_rating - old_rating,
+        **{_histogram_field(old_rating): -1, _histogram_field(new_rating): 1},
+    )
+
+
+def repair_status_changed(technician_id, old_status, new_status):
+    if technician_id is None or (old_status == 'completed') == (new_status == 'completed'):
+        return
+    _adjust(technician_id, completed_repairs=1 if new_status == 'completed' else -1)
+
+
+def question_status_changed(teacher_id, old_status, new_status):
+    was_finished = old_status in FINISHED_SESSION_STATUSES
+    if teacher_id is None or was_finished == (new_status in FINISHED_SESSION_STATUSES):
+        return
+    _adjust(teacher_id, completed_sessions=-1 if was_finished else 1)
+
+
+def rebuild():
+    """Recompute the counters of every profile from ratings, repairs and questions."""
+    from academics.models import AcademicQuestion
+    from repairs.models import RepairRequest
+
+    counters = {}
+
+    def row(user_id):
+        return counters.setdefault(user_id, {})
+
+    for values in Rating.objects.values('user', 'rating').annotate(count=Count('pk')):
+        counters_row = row(values['user'])
+        counters_row[_histogram_field(values['rating'])] = values['count']
+        counters_row['rating_count'] = counters_row.get('rating_count', 0) + values['count']
+        counters_row['rating_sum'] = counters_row.get('rating_sum', 0) + values['count'] * values['rating']
+    repairs = RepairRequest.objects.filter(technician__isnull=False, status='completed')
+    for user_id, count in repairs.values_list('technician').annotate(count=Count('pk')):
+        row(user_id)['completed_repairs'] = count
+    sessions = AcademicQuestion.objects.filter(teacher__isnull=False, status__in=FINISHED_SESSION_STATUSES)
+    for user_id, count in sessions.values_list('teacher').annotate(count=Count('pk')):
+        row(user_id)['completed_sessions'] = count
+
+    fields = ['rating_count', 'rating_sum', 'completed_repairs', 'completed_sessions']
+    fields += [_histogram_field(rating) for rating in range(1, 6)]
+    profiles = list(Profile.objects.only('pk', 'user_id', *fields))
+    for profile in profiles:
+        values = counters.get(profile.user_id, {})
+        for field in fields:
+            setattr(profile, field, values.get(field, 0))
+    with transaction.atomic():
+        Profile.objects.bulk_update(profiles, fields, batch_size=1000)
+        caching.bump_all()
+    return len(profiles)
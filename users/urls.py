@@ -2,16 +2,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import UserRegistrationView, UserViewSet, ProfileViewSet, RatingViewSet
+from .views import (
+    UserRegistrationView, UserViewSet, ProfileViewSet, RatingViewSet, LeaderboardViewSet, CohortProvisioningView,
+    DirectoryViewSet,
+)
 
 router = DefaultRouter()
 router.register('user', UserViewSet)
 router.register('profile', ProfileViewSet)
 router.register('ratings', RatingViewSet)
+router.register('leaderboards', LeaderboardViewSet, basename='leaderboard')
+router.register('directory', DirectoryViewSet, basename='directory')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', UserRegistrationView.as_view(), name='register'),
+    path('provision/', CohortProvisioningView.as_view(), name='provision'),
+    path('provision/<uuid:job_id>/', CohortProvisioningView.as_view(), name='provision-job'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
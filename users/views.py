@@ -1,11 +1,25 @@
-from rest_framework import viewsets, generics, permissions, status
+import io
+
+from rest_framework import viewsets, generics, mixins, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.decorators import action
 from django.contrib.auth import get_user_model
-from .models import Profile, Rating
-from .serializers import UserSerializer, UserRegistrationSerializer, ProfileSerializer, RatingSerializer, UserDashboardSerializer
+from django.http import Http404
+from django_filters.rest_framework import DjangoFilterBackend
+from repairportal.fieldsets import FieldsetViewMixin
+from repairportal.sqlite.writer import QueuedWritesMixin
+from .caching import cached_user_response, metrics
+from .filters import UserDirectoryFilter
+from .models import Profile, Rating, LeaderboardEntry
+from .serializers import (
+    UserSerializer, UserRegistrationSerializer, ProfileSerializer, RatingSerializer, UserDashboardSerializer,
+    LeaderboardEntrySerializer, DirectoryEntrySerializer,
+)
+from .provisioning import job_report, parse_rows, provision, start_job
 from .permissions import IsOwnerOrReadOnly, IsAdminUser, IsSameUserOrReadOnly
 
 User = get_user_model()
@@ -17,11 +31,62 @@ class UserRegistrationView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
+class CohortProvisioningView(APIView):
+    """
+    Admin endpoint to onboard a cohort from an uploaded CSV (``file``), see
+    ``users.provisioning``. ``?dry_run=1`` only validates the file; otherwise
+    the file is validated and provisioned by a background job (202), whose
+    report is read from ``provision/<job>/``.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": "Upload a CSV file."}, status=status.HTTP_400_BAD_REQUEST)
+        text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            rows, errors = parse_rows(text)
+        except UnicodeDecodeError:
+            return Response({"file": "The CSV file must be UTF-8 encoded."}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            # Leave the upload open for start_job
+            text.detach()
+        errors = [{'line': line, 'error': message} for line, message in errors]
+        
+        if request.query_params.get('dry_run'):
+            report = provision(rows, dry_run=True)
+            report['errors'] = errors
+            return Response(report, status=status.HTTP_200_OK)
+        if not rows:
+            return Response({"file": "The CSV file has no valid rows.", "errors": errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        upload.seek(0)
+        job_id = start_job(upload)
+        return Response(
+            {'job': job_id, 'status': 'running', 'valid': len(rows), 'errors': errors},
+            status=status.HTTP_202_ACCEPTED
+        )
+    
+    def get(self, request, job_id=None):
+        """Report of a provisioning job"""
+        report = job_report(job_id) if job_id is not None else None
+        if report is None:
+            raise Http404
+        return Response({'job': job_id, **report})
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsSameUserOrReadOnly]
     
+    def get_queryset(self):
+        # Profiles carry the dashboard counters; join them into the user row
+        return User.objects.select_related('profile')
+    
     def get_serializer_class(self):
         if self.action == 'dashboard':
             return UserDashboardSerializer
@@ -29,17 +94,30 @@ class UserViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def dashboard(self, request, pk=None):
-        user = self.get_object()
-        serializer = self.get_serializer(user)
-        return Response(serializer.data)
+        try:
+            user_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        return cached_user_response(
+            request, 'dashboard', user_id, lambda: self.get_serializer(self.get_object()).data
+        )
         
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Returns the authenticated user's profile
         """
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        def build():
+            user = self.get_queryset().get(pk=request.user.pk)
+            # Cached for every query string, so always the full representation
+            return self.get_serializer(user, context={**self.get_serializer_context(), 'sparse_fieldsets': False}).data
+        
+        return cached_user_response(request, 'me', request.user.pk, build)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
+    def cache_stats(self, request):
+        """Hit ratio of the dashboard/me response cache across all workers"""
+        return Response(metrics.snapshot())
 
 
 class ProfileViewSet(viewsets.ModelViewSet):
@@ -51,7 +129,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
         return Profile.objects.filter(user=self.request.user)
 
 
-class RatingViewSet(viewsets.ModelViewSet):
+class RatingViewSet(QueuedWritesMixin, FieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -69,3 +147,42 @@ class RatingViewSet(viewsets.ModelViewSet):
         if self.request.user.is_staff:
             return Rating.objects.all()
         return Rating.objects.filter(user=self.request.user) | Rating.objects.filter(rated_by=self.request.user)
+
+
+class DirectoryViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Searchable user directory, e.g. ``?role=technician&expertise=soldering&max_rate=30``
+    or ``?q=phy`` (prefix of the name or of a skill). Every page is a single
+    query over indexed columns.
+    """
+    serializer_class = DirectoryEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('full_name_folded', 'id')
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = UserDirectoryFilter
+    
+    def get_queryset(self):
+        return User.objects.filter(is_active=True, profile__isnull=False).select_related('profile').only(
+            'id', 'full_name', 'full_name_folded', 'role', 'profile__profile_picture', 'profile__expertise', 'profile__hourly_rate',
+            'profile__rating_count', 'profile__rating_sum',
+        )
+
+
+class LeaderboardViewSet(FieldsetViewMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Best teachers per subject (``?board=subject&category=physics``) or
+    technicians per device category (``?board=device&category=smartphone``),
+    read straight from the precomputed leaderboard index.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-score', '-completed', 'id')
+    
+    def get_queryset(self):
+        board = self.request.query_params.get('board')
+        category = self.request.query_params.get('category')
+        if board not in dict(LeaderboardEntry.BOARD_CHOICES):
+            raise ValidationError({"board": f"Choose from {', '.join(dict(LeaderboardEntry.BOARD_CHOICES))}"})
+        if not category:
+            raise ValidationError({"category": "This query parameter is required."})
+        return LeaderboardEntry.objects.filter(board=board, category=category)